@@ -0,0 +1,97 @@
+import argparse
+import os
+
+import numpy as np
+
+from processing.batch import run_batch
+from utils import tracing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Classificação em lote (sem interface): %Planta, %Palha e %Solo por imagem.")
+    parser.add_argument("paths", nargs="+", help="Imagens ou pastas (percorridas recursivamente)")
+    parser.add_argument("-o", "--output", default="resultados.csv",
+                        help="Arquivo de saída: .csv ou .jsonl (padrão: resultados.csv)")
+    parser.add_argument("--sens-planta", type=float, default=0.5, help="Sensibilidade da planta (0–1)")
+    parser.add_argument("--bias-palha", type=float, default=0.5, help="Viés da palha (0–1.5)")
+    parser.add_argument("--limpeza", type=float, default=1, help="Intensidade da limpeza (1–3)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: núcleos da máquina)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads por imagem, em faixas de linhas (ex.: --workers 1 --threads 8 "
+                             "para poucas imagens muito grandes)")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocessa tudo, ignorando a saída existente")
+    parser.add_argument("--tiled", metavar="PASTA_MAPAS", default=None,
+                        help="Processa por tiles (imagens maiores que a memória) e grava os mapas de classes "
+                             "<nome>_<ext>_classes.npy nesta pasta. Lê só .npy (H, W, 3) uint8 e TIFF RGB de "
+                             "8 bits (pacote tifffile); JPEG, PNG e BMP precisam ser convertidos antes")
+    parser.add_argument("--memory-budget", type=int, default=512,
+                        help="Orçamento de memória por processo no modo por tiles, em MB (padrão: 512)")
+    parser.add_argument("--grid", metavar="LINHASxCOLUNAS", default=None,
+                        help="Cobertura também por célula de uma grade (ex.: 10x10), gravada em <saída>_grade.*")
+    parser.add_argument("--sweep", metavar="SENSxBIAS", default=None,
+                        help="Superfície planta/palha/solo (antes da limpeza) numa grade de SENS x BIAS valores "
+                             "dos sliders (ex.: 21x31), gravada em <saída>_varredura.*")
+    parser.add_argument("--superpixels", type=int, default=None, metavar="N",
+                        help="Classifica por regiões (cerca de N superpixels) em vez de pixel a pixel")
+    parser.add_argument("--labels", metavar="PASTA", default=None,
+                        help="Grava o mapa de classes de cada imagem nesta pasta (<nome>_<ext>_classes.png de 2 bits "
+                             "+ .json com parâmetros e percentuais, nas mesmas subpastas das entradas)")
+    parser.add_argument("--from-labels", action="store_true",
+                        help="As entradas são mapas de classes exportados: recalcula percentuais (e --grid) "
+                             "sem reprocessar as fotos")
+    parser.add_argument("--scale", type=int, default=1, choices=(1, 2, 4, 8),
+                        help="Resolução de trabalho 1/SCALE, reduzida já na decodificação dos JPEGs "
+                             "(mais imagens/s, menos detalhe; padrão: 1)")
+    parser.add_argument("--lut-bits", type=int, default=None, choices=range(1, 9), metavar="BITS",
+                        help="Avalia os scores uma vez por cor distinta, com BITS por canal "
+                             "(8 = exato; 6 = mais rápido, erro de quantização pequeno)")
+    parser.add_argument("--cache", metavar="PASTA", default=None,
+                        help="Guarda os scores em disco: reexecuções com outros parâmetros não os recalculam")
+    parser.add_argument("--cache-max-gb", type=float, default=2,
+                        help="Tamanho máximo do cache; as entradas usadas há mais tempo são apagadas (padrão: 2)")
+    parser.add_argument("--trace", metavar="ARQUIVO.json", default=None,
+                        help="Grava os tempos por etapa no formato Chrome trace (chrome://tracing)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Com --trace, registra também os bytes alocados por etapa (mais lento)")
+    args = parser.parse_args(argv)
+    grid = tuple(int(v) for v in args.grid.lower().split("x")) if args.grid else None
+    tiled = None
+    if args.tiled:
+        os.makedirs(args.tiled, exist_ok=True)
+        tiled = (args.tiled, args.memory_budget * 1024 ** 2)
+
+    if args.labels:
+        os.makedirs(args.labels, exist_ok=True)
+
+    sweep = None
+    if args.sweep:
+        n_sens, n_bias = (int(v) for v in args.sweep.lower().split("x"))
+        sweep = (np.linspace(0.0, 1.0, n_sens), np.linspace(0.0, 1.5, n_bias))
+    cache = (args.cache, int(args.cache_max_gb * 1024 ** 3)) if args.cache else None
+
+    def report(record):
+        status = f"ERRO: {record['erro']}" if record["erro"] else (
+            f"planta {record['planta_%']}% | palha {record['palha_%']}% | solo {record['solo_%']}%")
+        print(f"{record['arquivo']}: {status} ({record['tempo_s']} s)", flush=True)
+
+    try:
+        summary = run_batch(args.paths, args.output,
+                            sens_planta=args.sens_planta, bias_palha=args.bias_palha, limpeza=args.limpeza,
+                            workers=args.workers, resume=not args.no_resume, on_result=report, tiled=tiled, grid=grid,
+                            trace=bool(args.trace), trace_memory=args.trace_memory,
+                            lut_bits=args.lut_bits, cache=cache, scale=args.scale, sweep=sweep,
+                            threads=args.threads, superpixels=args.superpixels,
+                            labels=args.labels, from_labels=args.from_labels)
+    except ValueError as exc:  # saída incompatível
+        raise SystemExit(str(exc))
+    print(f"{summary['processadas']} imagens em {summary['tempo_s']} s "
+          f"({summary['imagens_por_s']} imagens/s, {summary['workers']} processos); "
+          f"{summary['puladas']} já processadas, {summary['falhas']} falhas.")
+    if args.trace:
+        count = tracing.export_chrome_trace(args.trace)
+        print(f"Trace com {count} eventos gravado em {args.trace}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compara os scores avaliados por cor distinta (processing.color_lut) com o
+cálculo exato por pixel: tempo até os scores e erro por nível de quantização
+(diferença máx./média dos scores, pixels com classe diferente e diferença
+nas porcentagens após a segmentação completa).
+
+    python -m benchmarks.bench_color_lut --size 4000x3000 --bits 8 7 6 5
+    python -m benchmarks.bench_color_lut --image foto.jpg
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_postprocessing import best_time
+from benchmarks.synthetic import synthetic_canopy
+from processing.color_lut import lut_scores
+from processing.indices import compute_all_indices
+from processing.session import SegmentationSession
+from utils.metrics import compare_percentages, label_agreement
+
+
+def exact_scores(img):
+    session = SegmentationSession(img, compute_all_indices(img))
+    return session.veg_score, session.straw_score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4000x3000", help="LARGURAxALTURA da imagem sintética")
+    parser.add_argument("--image", default=None, help="Usa esta foto em vez da imagem sintética")
+    parser.add_argument("--bits", type=int, nargs="+", default=[8, 7, 6, 5])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sens-planta", type=float, default=0.5)
+    parser.add_argument("--bias-palha", type=float, default=0.5)
+    parser.add_argument("--limpeza", type=float, default=1)
+    args = parser.parse_args(argv)
+    if args.image:
+        img = cv2.imread(args.image)
+        if img is None:
+            raise SystemExit(f"Não foi possível ler {args.image}")
+    else:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+        img, _ = synthetic_canopy(width, height)
+    params = (args.sens_planta, args.bias_palha, args.limpeza)
+
+    veg, straw = exact_scores(img)
+    exact_map, exact_metrics = SegmentationSession.from_scores(img, veg, straw).segment(*params)
+    t_exact = best_time(lambda: exact_scores(img), args.repeat)
+    print(f"Imagem {img.shape[1]}x{img.shape[0]} ({img.shape[0] * img.shape[1] / 1e6:.1f} MP), "
+          f"melhor de {args.repeat}; exato: {t_exact * 1000:.1f} ms")
+    print(f"{'bits':>4} {'tempo':>10} {'ganho':>6} {'erro veg máx/méd':>20} "
+          f"{'erro palha máx/méd':>20} {'pixels ≠':>9} {'% máx':>6}")
+    for bits in args.bits:
+        t_lut = best_time(lambda: lut_scores(img, bits), args.repeat)
+        lut_veg, lut_straw = lut_scores(img, bits)
+        seg_map, metrics = SegmentationSession.from_scores(img, lut_veg, lut_straw).segment(*params)
+        err_veg, err_straw = np.abs(lut_veg - veg), np.abs(lut_straw - straw)
+        print(f"{bits:>4} {t_lut * 1000:8.1f} ms {t_exact / t_lut:5.1f}x "
+              f"{err_veg.max():9.5f}/{err_veg.mean():.5f} {err_straw.max():9.5f}/{err_straw.mean():.5f} "
+              f"{1 - label_agreement(seg_map, exact_map):9.5f} "
+              f"{compare_percentages(metrics, exact_metrics)['max']:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Exportação (processing.export): imagem com rodapé montada no quadro
+pré-alocado x overlay + np.vstack da implementação anterior (tempo e pico
+de memória), e o mapa de classes em PNG de paleta de 2 bits x PNG de 8 bits
+e .npy (tamanho, gravação e leitura). Mostra também o tempo de recalcular os
+percentuais do mapa exportado x reprocessar a foto.
+
+    python -m benchmarks.bench_export --size 4000x3000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_postprocessing import best_time
+from benchmarks.synthetic import synthetic_canopy
+from processing.export import draw_footer, footer_height, load_label_map, render_result, save_label_map
+from processing.indices import compute_all_indices
+from processing.rendering import render_overlay
+from processing.session import SegmentationSession
+from utils.metrics import calculate_percentages
+
+
+def legacy_result(img, seg_map, metrics):
+    """Implementação anterior: overlay numa imagem nova e rodapé empilhado com np.vstack."""
+    overlay = render_overlay(img, seg_map)
+    h, w = overlay.shape[:2]
+    footer = np.full((footer_height(h), w, 3), 255, dtype=np.uint8)
+    final_img = np.vstack((overlay, footer))
+    return draw_footer(final_img, h, metrics)
+
+
+def peak_bytes(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4000x3000", help="LARGURAxALTURA da imagem sintética")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    img, _ = synthetic_canopy(width, height)
+    (seg_map, metrics), t_process = timed(lambda: SegmentationSession(img, compute_all_indices(img)).segment())
+    mb = 1024 ** 2
+
+    new, old = render_result(img, seg_map, metrics), legacy_result(img, seg_map, metrics)
+    print(f"Imagem {width}x{height}; rodapé idêntico: {'sim' if np.array_equal(new, old) else 'NÃO'}")
+    for name, fn in (("quadro pré-alocado", lambda: render_result(img, seg_map, metrics)),
+                     ("overlay + vstack", lambda: legacy_result(img, seg_map, metrics))):
+        print(f"  {name:>20}: {best_time(fn, args.repeat) * 1000:7.1f} ms, pico {peak_bytes(fn) / mb:6.1f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {name: os.path.join(tmp, f"mapa{ext}") for name, ext in
+                 (("PNG 2 bits + JSON", ".png"), ("PNG 8 bits", "_8.png"), (".npy", ".npy"))}
+        writers = {
+            "PNG 2 bits + JSON": lambda p: save_label_map(p, seg_map, metrics, (0.5, 0.5, 1)),
+            "PNG 8 bits": lambda p: cv2.imwrite(p, seg_map),
+            ".npy": lambda p: np.save(p, seg_map),
+        }
+        readers = {
+            "PNG 2 bits + JSON": lambda p: load_label_map(p)[0],
+            "PNG 8 bits": lambda p: cv2.imread(p, cv2.IMREAD_UNCHANGED),
+            ".npy": np.load,
+        }
+        print(f"Mapa de classes ({seg_map.nbytes / mb:.1f} MB em memória):")
+        for name, path in paths.items():
+            t_write = best_time(lambda: writers[name](path), args.repeat)
+            t_read = best_time(lambda: readers[name](path), args.repeat)
+            same = np.array_equal(readers[name](path), seg_map)
+            print(f"  {name:>20}: {os.path.getsize(path) / 1024:9.1f} KB, grava {t_write * 1000:6.1f} ms, "
+                  f"lê {t_read * 1000:6.1f} ms, idêntico {'sim' if same else 'NÃO'}")
+
+        label_path = paths["PNG 2 bits + JSON"]
+        (reloaded, _), t_reload = timed(lambda: load_label_map(label_path))
+        recomputed, t_count = timed(lambda: calculate_percentages(reloaded))
+        print(f"Percentuais do mapa exportado: {(t_reload + t_count) * 1000:.1f} ms "
+              f"(reprocessando a foto: {t_process * 1000:.0f} ms); iguais: {'sim' if recomputed == metrics else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compara a renderização atual (paleta via LUT + mistura uint8) com a anterior
+(cópia float32 da imagem e mistura mascarada por classe).
+
+    python -m benchmarks.bench_rendering --size 4000x3000 --repeat 5
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.bench_postprocessing import best_time
+from benchmarks.synthetic import synthetic_canopy
+from processing.rendering import Renderer
+
+_COLORS = {0: (42, 42, 165), 1: (0, 255, 255), 2: (0, 200, 0)}
+
+
+def legacy_create_overlay(img, seg_map, alpha=0.4):
+    """Implementação anterior, mantida aqui só como referência."""
+    overlay = img.copy().astype(np.float32)
+    for cls, color in _COLORS.items():
+        mask = (seg_map == cls)
+        overlay[mask] = overlay[mask] * (1 - alpha) + np.array(color, np.float32) * alpha
+    return np.clip(overlay, 0, 255).astype(np.uint8)
+
+
+def legacy_class_map(seg_map):
+    h, w = seg_map.shape
+    mapa = np.zeros((h, w, 3), np.uint8)
+    for cls, color in _COLORS.items():
+        mapa[seg_map == cls] = color
+    return mapa
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4000x3000", help="LARGURAxALTURA da imagem sintética")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    img, seg_map = synthetic_canopy(width, height)
+    renderer = Renderer()
+
+    print(f"Imagem {width}x{height} ({width * height / 1e6:.1f} MP), melhor de {args.repeat}")
+    t_old = best_time(lambda: legacy_create_overlay(img, seg_map), args.repeat)
+    t_new = best_time(lambda: renderer.overlay(img, seg_map), args.repeat)
+    diff = np.abs(legacy_create_overlay(img, seg_map).astype(np.int16) - renderer.overlay(img, seg_map)).max()
+    print(f"overlay: anterior {t_old * 1000:7.1f} ms | atual {t_new * 1000:7.1f} ms | "
+          f"{t_old / t_new:5.1f}x | diferença máx. {diff} nível")
+    t_old = best_time(lambda: legacy_class_map(seg_map), args.repeat)
+    t_new = best_time(lambda: renderer.class_map(seg_map), args.repeat)
+    same = np.array_equal(legacy_class_map(seg_map), renderer.class_map(seg_map))
+    print(f"mapa:    anterior {t_old * 1000:7.1f} ms | atual {t_new * 1000:7.1f} ms | "
+          f"{t_old / t_new:5.1f}x | idêntico: {same}")
+
+
+if __name__ == "__main__":
+    main()
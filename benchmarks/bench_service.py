@@ -0,0 +1,128 @@
+"""
+Serviço HTTP local (server.py / processing.service): latência e vazão com
+processos aquecidos para várias quantidades de clientes simultâneos, x o
+custo de subir um processo novo por imagem (python batch.py, a alternativa
+sem o serviço). Mostra também o tamanho médio dos lotes e os pedidos
+recusados pela fila.
+
+    python -m benchmarks.bench_service --size 2000x1500 --clients 1 4 16 --requests 32
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import synthetic_canopy
+from processing.service import QUEUE_SIZE, ClassificationService
+from server import make_handler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def post_image(url, data):
+    """(status HTTP, segundos) de um POST /classify."""
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "image/jpeg"}, method="POST")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        exc.read()
+        status = exc.code
+    return status, time.perf_counter() - start
+
+
+def load(url, data, clients, requests):
+    """`requests` pedidos divididos entre `clients` threads; devolve (latências dos 200, recusados, segundos)."""
+    latencies, rejected, lock = [], [0], threading.Lock()
+    per_client = [requests // clients + (i < requests % clients) for i in range(clients)]
+
+    def client(n):
+        for _ in range(n):
+            status, seconds = post_image(url, data)
+            with lock:
+                if status == 200:
+                    latencies.append(seconds)
+                else:
+                    rejected[0] += 1
+    threads = [threading.Thread(target=client, args=(n,)) for n in per_client]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, rejected[0], time.perf_counter() - start
+
+
+def cold_start(path, runs):
+    """Segundos por imagem subindo um processo novo a cada uma (python batch.py)."""
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "batch.py", path, "-o", os.path.join(tmp, f"r{i}.csv"), "--workers", "1"],
+                           cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="2000x1500", help="LARGURAxALTURA da imagem sintética")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Pedidos por rodada")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--cold-runs", type=int, default=3)
+    args = parser.parse_args(argv)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    img, _ = synthetic_canopy(width, height)
+    data = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "foto.jpg")
+        with open(path, "wb") as f:
+            f.write(data)
+        t_cold = cold_start(path, args.cold_runs)
+
+    start = time.perf_counter()
+    with ClassificationService(args.workers, args.queue) as service:
+        t_warm = time.perf_counter() - start
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service, 1 << 30, 300))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/classify"
+        try:
+            print(f"Imagem {width}x{height} (JPEG, {len(data) / 1024:.0f} KB); {service.workers} processos, "
+                  f"aquecidos em {t_warm:.2f} s; fila de {args.queue}")
+            print(f"Processo novo por imagem (batch.py): {t_cold * 1000:.0f} ms")
+            print(f"{'clientes':>8} {'p50':>8} {'p95':>8} {'vazão':>12} {'lote médio':>10} {'recusados':>9}")
+            for clients in args.clients:
+                before = service.stats.snapshot()
+                latencies, rejected, elapsed = load(url, data, clients, args.requests)
+                after = service.stats.snapshot()
+                batches = after["lotes"] - before["lotes"]
+                mean_batch = (after["concluidos"] + after["erros"] - before["concluidos"] - before["erros"]) / max(1, batches)
+                p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+                print(f"{clients:>8} {p50:5.0f} ms {p95:5.0f} ms {len(latencies) / elapsed:6.2f} img/s "
+                      f"{mean_batch:10.2f} {rejected:>9}")
+            print("Contadores:", json.dumps(service.stats.snapshot(), ensure_ascii=False))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Classificação por superpixels (processing.superpixels) x por pixels:
+custo único da sobressegmentação, tempo por movimento de slider (só os
+percentuais e com o mapa de classes) e erro em relação ao caminho por pixels
+(diferença mediana e máx. nos percentuais e fração de pixels com classe diferente, sobre
+várias posições dos sliders), por método, número de superpixels e nível de
+limpeza (0 = sem limpeza; nos demais a limpeza por regiões é comparada com o
+filtro de maioria por pixels). Na imagem sintética mostra também o erro dos
+dois caminhos em relação às classes verdadeiras, com os sliders no padrão.
+
+    python -m benchmarks.bench_superpixels --size 4000x3000 --segments 1000 4000 16000 --limpeza 0 1 3
+    python -m benchmarks.bench_superpixels --image foto.jpg --methods numpy
+"""
+import argparse
+import statistics
+import time
+
+import cv2
+
+from benchmarks.synthetic import synthetic_canopy
+from processing.indices import compute_all_indices
+from processing.session import SegmentationSession
+from processing.superpixels import SLIC_METHODS, SuperpixelSession
+from utils.metrics import calculate_percentages, compare_percentages, label_agreement
+
+# Posições dos sliders conferidas (sens_planta, bias_palha)
+SLIDER_POINTS = [(s, b) for s in (0.3, 0.5, 0.7) for b in (0.3, 0.75, 1.2)]
+DEFAULT_POINT = (0.5, 0.5)
+
+
+def mean_time(fn, points):
+    """Tempo médio de fn(sens, bias) sobre as posições de slider."""
+    start = time.perf_counter()
+    for sens, bias in points:
+        fn(sens, bias)
+    return (time.perf_counter() - start) / len(points)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4000x3000", help="LARGURAxALTURA da imagem sintética")
+    parser.add_argument("--image", default=None, help="Usa esta foto em vez da imagem sintética")
+    parser.add_argument("--segments", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--methods", nargs="+", default=["numpy", "skimage"],
+                        choices=[m for m in SLIC_METHODS if m != "auto"])
+    parser.add_argument("--limpeza", type=float, nargs="+", default=[0, 1, 3])
+    args = parser.parse_args(argv)
+    truth = None
+    if args.image:
+        img = cv2.imread(args.image)
+        if img is None:
+            raise SystemExit(f"Não foi possível ler {args.image}")
+    else:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+        img, labels = synthetic_canopy(width, height)
+        truth = calculate_percentages(labels)
+
+    def truth_error(session, limpeza):
+        if truth is None:
+            return "     -"
+        return f"{compare_percentages(session.segment(*DEFAULT_POINT, limpeza)[1], truth)['max']:6.2f}"
+
+    pixels = SegmentationSession(img, compute_all_indices(img))
+    pixels.products()
+    references = {}
+    for limpeza in args.limpeza:
+        for point in SLIDER_POINTS:
+            seg_map, metrics = pixels.segment(*point, limpeza)
+            references[limpeza, point] = (seg_map.copy(), metrics)
+
+    # Por pixels: classificação + limpeza + contagem a cada movimento (sessão sem o cache da etapa)
+    limpeza = max(args.limpeza)
+
+    def pixel_update(sens, bias):
+        session = SegmentationSession.from_scores(img, pixels.veg_score, pixels.straw_score,
+                                                  t_veg_base=pixels.t_veg_base, joint_hist=pixels.joint_hist)
+        session.segment(sens, bias, limpeza)
+    t_pixel = mean_time(pixel_update, SLIDER_POINTS)
+    print(f"Imagem {img.shape[1]}x{img.shape[0]} ({img.shape[0] * img.shape[1] / 1e6:.1f} MP); "
+          f"por pixels (limpeza={limpeza:g}): {t_pixel * 1000:.1f} ms por movimento")
+    print(f"{'método':>8} {'pedidos':>7} {'regiões':>7} {'carga':>8} {'limpeza':>7} {'percentuais':>12} "
+          f"{'com mapa':>10} {'ganho':>7} {'% med':>6} {'% máx':>6} {'pixels ≠':>9} {'verdade':>7} {'px verd.':>8}")
+    for method in args.methods:
+        for n_segments in args.segments:
+            start = time.perf_counter()
+            try:
+                regions = SuperpixelSession.build(pixels, n_segments, method=method)
+            except ImportError:
+                print(f"{method:>8} não instalado")
+                break
+            t_build = time.perf_counter() - start
+
+            for limpeza in args.limpeza:
+                def pct_update(sens, bias):
+                    regions._cache.clear()
+                    regions.percentages(sens, bias, limpeza)
+
+                def map_update(sens, bias):
+                    regions._cache.clear()
+                    regions.segment(sens, bias, limpeza)
+                t_pct, t_map = mean_time(pct_update, SLIDER_POINTS), mean_time(map_update, SLIDER_POINTS)
+
+                errors, disagree = [], 0.0
+                for point in SLIDER_POINTS:
+                    ref_map, ref_metrics = references[limpeza, point]
+                    seg_map, metrics = regions.segment(*point, limpeza)
+                    errors.append(compare_percentages(metrics, ref_metrics)["max"])
+                    disagree = max(disagree, 1 - label_agreement(seg_map, ref_map))
+                print(f"{method:>8} {n_segments:>7} {regions.n_regions:>7} {t_build:6.2f} s {limpeza:>7g} "
+                      f"{t_pct * 1000:9.2f} ms {t_map * 1000:7.1f} ms {t_pixel / t_pct:6.0f}x "
+                      f"{statistics.median(errors):6.2f} {max(errors):6.2f} {disagree:9.4f} "
+                      f"{truth_error(regions, limpeza):>7} {truth_error(pixels, limpeza):>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compara a varredura vetorizada dos sliders (processing.sweep) com a
+classificação ponto a ponto: tempo da grade inteira, tempo por ponto
+reclassificando os pixels e erro dos percentuais (antes da limpeza) e dos
+limiares nos pontos conferidos.
+
+    python -m benchmarks.bench_sweep --size 4000x3000 --grid 41x61 --check 9x9
+    python -m benchmarks.bench_sweep --image foto.jpg
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_postprocessing import best_time
+from benchmarks.synthetic import synthetic_canopy
+from processing.indices import compute_all_indices
+from processing.session import SegmentationSession
+from processing.sweep import session_sweep
+from utils.metrics import calculate_percentages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4000x3000", help="LARGURAxALTURA da imagem sintética")
+    parser.add_argument("--image", default=None, help="Usa esta foto em vez da imagem sintética")
+    parser.add_argument("--grid", default="41x61", help="Pontos da varredura: SENSxBIAS")
+    parser.add_argument("--check", default="9x9", help="Pontos conferidos com a classificação: SENSxBIAS")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    if args.image:
+        img = cv2.imread(args.image)
+        if img is None:
+            raise SystemExit(f"Não foi possível ler {args.image}")
+    else:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+        img, _ = synthetic_canopy(width, height)
+
+    session = SegmentationSession(img, compute_all_indices(img))
+    session.products()
+    n_sens, n_bias = (int(v) for v in args.grid.lower().split("x"))
+    sens_values, bias_values = np.linspace(0, 1, n_sens), np.linspace(0, 1.5, n_bias)
+    t_sweep = best_time(lambda: session_sweep(session, sens_values, bias_values), args.repeat)
+
+    c_sens, c_bias = (int(v) for v in args.check.lower().split("x"))
+    check_sens, check_bias = np.linspace(0, 1, c_sens), np.linspace(0, 1.5, c_bias)
+    surface = session_sweep(session, check_sens, check_bias)
+    err_pct, err_t = 0.0, 0.0
+    start = time.perf_counter()
+    for i, sens in enumerate(check_sens):
+        for j, bias in enumerate(check_bias):
+            t_veg, t_straw = session.thresholds(sens, bias)
+            metrics = calculate_percentages(session.classify(sens, bias))
+            err_t = max(err_t, abs(t_veg - surface["t_veg"][i]), abs(t_straw - surface["t_straw"][i, j]))
+            err_pct = max(err_pct, *(abs(metrics[k] - surface[k][i, j]) for k in metrics))
+    t_point = (time.perf_counter() - start) / (c_sens * c_bias)
+
+    points = n_sens * n_bias
+    print(f"Imagem {img.shape[1]}x{img.shape[0]} ({img.shape[0] * img.shape[1] / 1e6:.1f} MP)")
+    print(f"Varredura {n_sens}x{n_bias} ({points} pontos): {t_sweep * 1000:.1f} ms "
+          f"({t_sweep / points * 1e6:.1f} µs/ponto)")
+    print(f"Classificação por ponto: {t_point * 1000:.1f} ms → ganho {t_point * points / t_sweep:.0f}x na grade")
+    print(f"Erro em {c_sens * c_bias} pontos: limiares {err_t:.2g}, percentuais {err_pct:.3f} p.p.")
+
+
+if __name__ == "__main__":
+    main()
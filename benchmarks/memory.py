@@ -0,0 +1,116 @@
+"""
+Contabilidade de memória da sessão de segmentação (tracemalloc), em bytes
+por megapixel:
+
+    carga      pico durante o cálculo de índices, scores e histogramas
+    residente  memória retida pela sessão depois da carga e de um movimento
+               (índices, scores, histograma, buffers da arena, do Renderer e
+               dos quadros exibidos)
+    pico/mov.  pico acima do residente num movimento de slider já aquecido
+               (classificação + limpeza + contagens + overlay + níveis do zoom)
+
+O movimento é medido sem e com a arena (processing.arena; para o quadro
+exibido, ui.viewport.FrameBuffers). Com ela, as arenas não podem criar
+buffers depois do aquecimento e o pico por movimento não
+deve chegar perto do tamanho da imagem (1 byte/pixel = 1 MB/MP).
+
+    python -m benchmarks.memory --sizes 1 12 --ticks 20
+    python -m benchmarks.memory --sizes 12 --threads 4
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import size_for_megapixels, synthetic_canopy
+from processing.arena import BufferArena
+from processing.indices import compute_all_indices
+from processing.parallel import BandPool
+from processing.rendering import Renderer
+from processing.session import SegmentationSession
+from ui.viewport import FrameBuffers, ViewSource
+
+MB = 1024 ** 2
+
+
+def slider_points(ticks):
+    """Posições de arraste (sens_planta e bias_palha mudam a cada movimento)."""
+    return [(float(s), float(b)) for s, b in zip(np.linspace(0.3, 0.7, ticks), np.linspace(0.4, 0.9, ticks))]
+
+
+def measure(img, arena, ticks, limpeza, pool=None):
+    """Medidas (bytes e segundos) de carga, residência e movimento com ou sem arena."""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        session = SegmentationSession(img, compute_all_indices(img))
+        session.products()
+        load_peak = tracemalloc.get_traced_memory()[1] - base
+
+        session.pool = pool
+        session.arena = BufferArena() if arena else None
+        renderer = Renderer(pool=pool)
+        frames = FrameBuffers() if arena else None
+
+        def show(seg_map):
+            # Como ControlsFrame._render_frame + CanvasView.show_frame (o quadro sai da tela no seguinte)
+            if frames is None:
+                return ViewSource(renderer.overlay(img, seg_map))
+            slot = frames.take()
+            frame = frames.prepare(renderer.overlay(img, seg_map, out=frames.frame(slot, seg_map.shape)), slot)
+            frames.shown(frame)
+            return frame
+
+        shown = show(session.segment(0.5, 0.5, limpeza)[0])  # aquecimento
+        shown = show(session.segment(0.5, 0.5, limpeza)[0])
+        warm_allocations = session.arena.allocations + frames.arena.allocations if arena else 0
+
+        tick_peak, seconds = 0, 0.0
+        for sens, bias in slider_points(ticks):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            start = time.perf_counter()
+            seg_map, _ = session.segment(sens, bias, limpeza)
+            shown = show(seg_map)
+            seconds += time.perf_counter() - start
+            tick_peak = max(tick_peak, tracemalloc.get_traced_memory()[1] - current)
+            del seg_map
+        resident = tracemalloc.get_traced_memory()[0] - base
+        new_buffers = session.arena.allocations + frames.arena.allocations - warm_allocations if arena else None
+        return {"carga": load_peak, "residente": resident, "pico_tick": tick_peak,
+                "tick_s": seconds / ticks, "buffers_novos": new_buffers}
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 12], help="Megapixels das imagens sintéticas")
+    parser.add_argument("--ticks", type=int, default=20, help="Movimentos de slider medidos")
+    parser.add_argument("--limpeza", type=float, default=1)
+    parser.add_argument("--threads", type=int, default=None, help="Classificação e limpeza por faixas (BandPool)")
+    args = parser.parse_args(argv)
+    pool = BandPool(args.threads) if args.threads else None
+    print(f"{'imagem':>8} {'arena':>5} {'carga':>12} {'residente':>12} {'pico/mov.':>12} "
+          f"{'mov.':>8} {'buffers novos':>13}")
+    try:
+        for mp in args.sizes:
+            width, height = size_for_megapixels(mp)
+            img, _ = synthetic_canopy(width, height)
+            megapixels = width * height / 1e6
+            for arena in (False, True):
+                m = measure(img, arena, args.ticks, args.limpeza, pool)
+                per_mp = {k: m[k] / megapixels / MB for k in ("carga", "residente", "pico_tick")}
+                new = "-" if m["buffers_novos"] is None else m["buffers_novos"]
+                print(f"{megapixels:6.1f}MP {'sim' if arena else 'não':>5} {per_mp['carga']:7.1f} MB/MP "
+                      f"{per_mp['residente']:7.1f} MB/MP {per_mp['pico_tick']:7.3f} MB/MP "
+                      f"{m['tick_s'] * 1000:5.0f} ms {new:>13}")
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Suíte de benchmarks por etapa do pipeline sobre imagens sintéticas.
+
+Mede, por tamanho de imagem e etapa: tempo de parede (melhor de N),
+vazão (MP/s) e pico de memória alocada (tracemalloc, medido numa execução
+separada para não distorcer o tempo). Compara com uma linha de base salva
+em benchmarks/baselines/<nome>.json e falha (código 1) se alguma etapa ficar
+mais lenta que a base além do limite.
+
+    python -m benchmarks.run --sizes 1 12 --save-baseline minha_maquina
+    python -m benchmarks.run --sizes 1 12 --compare minha_maquina --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import SIZES_MP, size_for_megapixels, synthetic_canopy
+from processing.arena import BufferArena
+from processing.indices import compute_all_indices
+from processing.postprocessing import apply_postprocessing
+from processing.realtime_adjust import adjust_segmentation, create_overlay
+from processing.segmentation import segment_image
+from processing.session import SegmentationSession
+from ui.canvas_view import VIEW_SIZE, prepare_frame
+from ui.viewport import Viewport
+from utils.metrics import calculate_percentages
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def _stages(img):
+    """Etapas na ordem do pipeline; cada uma recebe o contexto com os produtos anteriores."""
+    ctx = {"img": img}
+    ctx["indices"] = compute_all_indices(img)
+    ctx["seg_map"], _ = adjust_segmentation(img, ctx["indices"])
+    session = SegmentationSession(img, ctx["indices"])
+    session.arena = BufferArena()  # como na interface
+    session.segment(0.5, 0.5, 1)
+    ticks = iter(np.linspace(0.3, 0.7, 10_000))
+    frame, viewport = prepare_frame(img), Viewport()
+    return ctx, [
+        ("compute_all_indices", lambda: compute_all_indices(img)),
+        ("adjust_segmentation", lambda: adjust_segmentation(img, ctx["indices"])),
+        # Movimento de slider com a sessão já aquecida (só o que depende do slider)
+        ("session_tick", lambda: session.segment(next(ticks), 0.5, 1)),
+        ("segment_image", lambda: segment_image(img, ctx["indices"])),
+        ("apply_postprocessing", lambda: apply_postprocessing(ctx["seg_map"], 3)),
+        ("create_overlay", lambda: create_overlay(img, ctx["seg_map"])),
+        ("calculate_percentages", lambda: calculate_percentages(ctx["seg_map"])),
+        ("canvas_display", lambda: prepare_frame(img)),
+        # Quadro na tela com o quadro já preparado (não deve depender do tamanho da imagem)
+        ("viewport_render", lambda: frame.render(viewport, VIEW_SIZE)),
+    ]
+
+
+def _best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_bytes(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(sizes=SIZES_MP, repeat=3, stages=None, on_result=None):
+    """Roda as etapas para cada tamanho; devolve {"<mp>MP": {etapa: medidas}}."""
+    results = {}
+    for mp in sizes:
+        width, height = size_for_megapixels(mp)
+        img, _ = synthetic_canopy(width, height)
+        ctx, all_stages = _stages(img)
+        key = f"{mp}MP"
+        results[key] = {}
+        for name, fn in all_stages:
+            if stages and name not in stages:
+                continue
+            seconds = _best_time(fn, repeat)
+            entry = {
+                "segundos": round(seconds, 5),
+                "mp_por_s": round(width * height / 1e6 / seconds, 2),
+                "pico_mb": round(_peak_bytes(fn) / 1024 ** 2, 1),
+            }
+            results[key][name] = entry
+            if on_result is not None:
+                on_result(key, name, entry)
+        del ctx, img
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Lista as regressões: etapas com tempo > base * (1 + threshold)."""
+    regressions = []
+    for size, stages in results.items():
+        for name, entry in stages.items():
+            base = baseline.get("resultados", {}).get(size, {}).get(name)
+            if base is None:
+                continue
+            ratio = entry["segundos"] / base["segundos"]
+            if ratio > 1 + threshold:
+                regressions.append((size, name, base["segundos"], entry["segundos"], ratio))
+    return regressions
+
+
+def _baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=list(SIZES_MP), help="Tamanhos em MP")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições por etapa (vale a melhor)")
+    parser.add_argument("--stages", nargs="+", default=None, help="Só estas etapas")
+    parser.add_argument("--output", default=None, help="Grava os resultados neste JSON")
+    parser.add_argument("--save-baseline", metavar="NOME", default=None, help="Salva como linha de base")
+    parser.add_argument("--compare", metavar="NOME", default=None, help="Compara com a linha de base")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Regressão tolerada (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+    sizes = [int(s) if float(s).is_integer() else s for s in args.sizes]
+
+    def report(size, name, entry):
+        print(f"{size:>6} {name:<22} {entry['segundos'] * 1000:10.1f} ms "
+              f"{entry['mp_por_s']:9.1f} MP/s {entry['pico_mb']:9.1f} MB", flush=True)
+
+    print(f"{'tamanho':>6} {'etapa':<22} {'tempo':>13} {'vazão':>14} {'pico':>12}")
+    results = run_suite(sizes, args.repeat, args.stages, on_result=report)
+    document = {
+        "maquina": {"plataforma": platform.platform(), "processador": platform.processor(),
+                    "nucleos": os.cpu_count(), "python": platform.python_version(),
+                    "numpy": np.__version__},
+        "repeticoes": args.repeat,
+        "resultados": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(_baseline_path(args.save_baseline), "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+        print(f"Linha de base salva em {_baseline_path(args.save_baseline)}")
+    if args.compare:
+        with open(_baseline_path(args.compare), encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for size, name, old, new, ratio in regressions:
+            print(f"REGRESSÃO {size} {name}: {old * 1000:.1f} ms → {new * 1000:.1f} ms ({ratio:.2f}x)")
+        if regressions:
+            raise SystemExit(1)
+        print(f"Sem regressões acima de {args.threshold:.0%} em relação a '{args.compare}'.")
+
+
+if __name__ == "__main__":
+    main()
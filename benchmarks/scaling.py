@@ -0,0 +1,73 @@
+"""
+Escalabilidade da execução por faixas (processing.parallel) numa imagem grande:
+tempo por etapa com 1, 2, 4, 8 e 16 threads, aceleração e eficiência
+(aceleração / threads) em relação a uma thread. Confere também que o mapa
+de classes e os percentuais são idênticos aos do caminho sem threads.
+
+    python -m benchmarks.scaling --size-mp 50 --workers 1 4 8 16
+"""
+import argparse
+import os
+
+import numpy as np
+
+from benchmarks.bench_postprocessing import best_time
+from benchmarks.synthetic import size_for_megapixels, synthetic_canopy
+from processing.indices import compute_all_indices
+from processing.parallel import BandPool, parallel_session
+from processing.rendering import Renderer
+from processing.session import SegmentationSession
+
+STAGES = ("sessão", "segmentação", "overlay")
+
+
+def measure(img, workers, params, repeat):
+    """Tempos (s) de cada etapa com `workers` threads, e o resultado para conferência."""
+    with BandPool(workers) as pool:
+        renderer = Renderer(pool=pool)
+        times = {"sessão": best_time(lambda: parallel_session(img, pool, keep_indices=False), repeat)}
+        session = parallel_session(img, pool, keep_indices=False)
+
+        # Cada repetição com uma sessão nova: a sessão devolveria a segmentação do cache
+        def segment():
+            fresh = SegmentationSession.from_scores(img, session.veg_score, session.straw_score,
+                                                    t_veg_base=session.t_veg_base, joint_hist=session.joint_hist)
+            fresh.pool = pool
+            return fresh.segment(*params)
+        times["segmentação"] = best_time(segment, repeat)
+        seg_map, metrics = segment()
+        times["overlay"] = best_time(lambda: renderer.overlay(img, seg_map), repeat)
+    return times, seg_map, metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mp", type=float, default=50, help="Megapixels da imagem sintética")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--limpeza", type=float, default=1)
+    args = parser.parse_args(argv)
+    width, height = size_for_megapixels(args.size_mp)
+    img, _ = synthetic_canopy(width, height)
+    params = (0.5, 0.5, args.limpeza)
+
+    reference_map, reference = SegmentationSession(img, compute_all_indices(img)).segment(*params)
+    cores = os.cpu_count() or 1
+    print(f"Imagem {width}x{height} ({width * height / 1e6:.1f} MP), {cores} núcleos, melhor de {args.repeat}")
+    print(f"{'threads':>7} " + " ".join(f"{name:>12}" for name in STAGES) +
+          f" {'total':>9} {'aceleração':>10} {'eficiência':>10} {'idêntico':>8}")
+    # A referência da aceleração é sempre a execução com uma thread
+    base = None
+    for workers in sorted(set(args.workers) | {1}):
+        times, seg_map, metrics = measure(img, workers, params, args.repeat)
+        total = sum(times.values())
+        base = base or total
+        speedup = base / total
+        same = np.array_equal(seg_map, reference_map) and metrics == reference
+        note = " (mais threads que núcleos)" if workers > cores else ""
+        print(f"{workers:>7} " + " ".join(f"{times[name] * 1000:9.0f} ms" for name in STAGES) +
+              f" {total:7.2f} s {speedup:9.2f}x {speedup / workers:9.0%} {'sim' if same else 'NÃO':>8}{note}")
+
+
+if __name__ == "__main__":
+    main()
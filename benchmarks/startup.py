@@ -0,0 +1,94 @@
+"""
+Tempo de início a frio da interface e do lote, cada medida num processo
+Python novo (mediana de N execuções), com orçamento: sai com código 1 se
+algum ponto de entrada passar do limite.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 7 --budget-gui 0.4 --budget-headless 0.8 --detail 10
+
+"gui (janela)" mede o que roda antes de a janela aparecer; "gui (conteúdo)"
+inclui os imports pesados feitos depois dela; com display, "gui (desenho)"
+mede até o primeiro desenho da janela.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ponto de entrada → (código medido, orçamento: "gui" ou "headless")
+ENTRY_POINTS = {
+    "gui (janela)": ("import ui.app_window", "gui"),
+    "gui (conteúdo)": ("import ui.app_window, ui.controls_frame", None),
+    "gui (desenho)": ("import ui.app_window\napp = ui.app_window.AppWindow()\napp.update()\napp.destroy()", "gui"),
+    "lote": ("import batch, processing.batch", "headless"),
+}
+
+_TEMPLATE = """
+import time
+_start = time.perf_counter()
+{code}
+print(time.perf_counter() - _start)
+"""
+
+
+def measure(code, repeat=5):
+    """Mediana (s) do tempo de `code` em processos novos; None se falhar (ex.: sem display)."""
+    times = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _TEMPLATE.format(code=code)],
+                              cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "erro"
+        times.append(float(proc.stdout.strip().splitlines()[-1]))
+    return statistics.median(times), ""
+
+
+def slowest_imports(code, top=10):
+    """Módulos com maior tempo acumulado de import (python -X importtime)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-gui", type=float, default=0.5, help="Limite (s) até a janela aparecer")
+    parser.add_argument("--budget-headless", type=float, default=1.0, help="Limite (s) do import do lote")
+    parser.add_argument("--detail", type=int, default=0, metavar="N",
+                        help="Mostra os N imports mais lentos de cada ponto de entrada")
+    args = parser.parse_args(argv)
+    budgets = {"gui": args.budget_gui, "headless": args.budget_headless}
+
+    over = []
+    for name, (code, budget_key) in ENTRY_POINTS.items():
+        seconds, error = measure(code, args.repeat)
+        if seconds is None:
+            print(f"{name:<16} não medido ({error})")
+            continue
+        budget = budgets.get(budget_key)
+        status = ""
+        if budget is not None:
+            ok = seconds <= budget
+            status = f"(orçamento {budget:.2f} s: {'ok' if ok else 'ESTOUROU'})"
+            if not ok:
+                over.append(name)
+        print(f"{name:<16} {seconds * 1000:8.1f} ms {status}")
+        if args.detail:
+            for cumulative, module in slowest_imports(code, args.detail):
+                print(f"    {cumulative / 1000:8.1f} ms  {module}")
+    if over:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Imagens sintéticas determinísticas de dossel (solo, palha e planta) para os
+benchmarks. Mesma semente → mesma imagem, em qualquer máquina.
+"""
+import math
+
+import cv2
+import numpy as np
+
+# Tamanhos padrão da suíte, em megapixels
+SIZES_MP = (1, 12, 48, 200)
+# Cobertura esperada por classe (solo, palha, planta)
+COVER = (0.3, 0.3, 0.4)
+# Cores BGR médias por classe
+CLASS_COLORS = np.array([
+    (40, 60, 110),    # solo
+    (120, 190, 210),  # palha
+    (40, 160, 50),    # planta
+], dtype=np.uint8)
+# Linhas por bloco ao aplicar o ruído (limita os temporários nas imagens grandes)
+NOISE_CHUNK_ROWS = 1024
+
+
+def size_for_megapixels(mp, aspect=4 / 3):
+    """(largura, altura) com a proporção dada e ~mp megapixels."""
+    height = int(round(math.sqrt(mp * 1e6 / aspect)))
+    return int(round(height * aspect)), height
+
+
+def synthetic_labels(width, height, seed=0, cover=COVER, noise=0.0):
+    """
+    Mapa de classes com manchas suaves (proporções `cover`) e, opcionalmente,
+    uma fração `noise` de pixels isolados com classe aleatória.
+    O campo é gerado a 1/4 da resolução e ampliado, para caber nas imagens grandes.
+    """
+    rng = np.random.default_rng(seed)
+    sw, sh = max(2, math.ceil(width / 4)), max(2, math.ceil(height / 4))
+    coarse = rng.random((max(2, sh // 16), max(2, sw // 16)), dtype=np.float32)
+    field = cv2.resize(coarse, (sw, sh), interpolation=cv2.INTER_CUBIC)
+    cuts = np.quantile(field, np.cumsum(cover)[:2])
+    small = np.digitize(field, cuts).astype(np.uint8)
+    labels = cv2.resize(small, (width, height), interpolation=cv2.INTER_NEAREST)
+    if noise > 0:
+        for y in range(0, height, NOISE_CHUNK_ROWS):
+            band = labels[y:y + NOISE_CHUNK_ROWS]
+            flip = rng.random(band.shape, dtype=np.float32) < noise
+            band[flip] = rng.integers(0, 3, int(flip.sum()), dtype=np.uint8)
+    return labels
+
+
+def synthetic_canopy(width, height, seed=0, cover=COVER, texture=24):
+    """Imagem BGR uint8 e o mapa de classes verdadeiro que a gerou."""
+    labels = synthetic_labels(width, height, seed, cover)
+    lut = np.zeros((256, 1, 3), dtype=np.uint8)
+    lut[:len(CLASS_COLORS), 0] = CLASS_COLORS
+    img = cv2.applyColorMap(labels, lut)
+    rng = np.random.default_rng(seed + 1)
+    for y in range(0, height, NOISE_CHUNK_ROWS):
+        band = img[y:y + NOISE_CHUNK_ROWS]
+        noisy = band.astype(np.int16)
+        noisy += rng.integers(-texture, texture + 1, band.shape, dtype=np.int16)
+        np.clip(noisy, 0, 255, out=noisy)
+        band[...] = noisy
+    return img, labels
@@ -1,5 +1,15 @@
+import argparse
+import os
+
 from ui.app_window import AppWindow
 
+# Variável de ambiente que liga os tempos por etapa desde o início (ex.: EASY_IOP_TRACE=1)
+TRACE_ENV = "EASY_IOP_TRACE"
+
 if __name__ == "__main__":
-    app = AppWindow()
+    parser = argparse.ArgumentParser(description="Interface gráfica do Easy IOP.")
+    parser.add_argument("--trace", action="store_true",
+                        help=f"Liga os tempos por etapa na barra de status (ou {TRACE_ENV}=1)")
+    args = parser.parse_args()
+    app = AppWindow(trace=args.trace or os.environ.get(TRACE_ENV, "") not in ("", "0"))
     app.mainloop()
@@ -0,0 +1,40 @@
+"""
+Arena de buffers de trabalho de uma sessão.
+
+Cada movimento de slider refaz classificação, limpeza e contagens sobre a
+imagem inteira. Sem a arena, cada etapa aloca seus arrays de resolução
+total a cada atualização (mapa de classes, máscaras, mapa limpo); com ela,
+os buffers são alocados no primeiro uso e reaproveitados via `out=`, e um
+movimento de slider em regime não aloca nada do tamanho da imagem.
+"""
+import numpy as np
+
+
+class BufferArena:
+    """
+    Buffers nomeados, um por (nome, forma, tipo), alocados no primeiro
+    pedido e devolvidos de novo nos seguintes. O conteúdo de um buffer vale
+    até a próxima etapa que o use: quem precisar guardar um resultado além
+    disso deve copiá-lo.
+    """
+    def __init__(self):
+        self._buffers = {}
+        self.allocations = 0  # buffers criados (não cresce em regime)
+
+    def get(self, name, shape, dtype=np.uint8):
+        key = (name, tuple(shape), np.dtype(dtype))
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buf
+            self.allocations += 1
+        return buf
+
+    @property
+    def nbytes(self):
+        """Memória ocupada pelos buffers."""
+        return sum(buf.nbytes for buf in self._buffers.values())
+
+    def clear(self):
+        """Libera os buffers (ao trocar de imagem)."""
+        self._buffers.clear()
@@ -0,0 +1,380 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import cv2
+import numpy as np
+
+from processing.color_lut import lut_scores
+from processing.export import load_label_map, save_label_map
+from processing.indices import compute_all_indices
+from processing.parallel import BandPool, parallel_session
+from processing.session import SegmentationSession, cached_session
+from processing.superpixels import SuperpixelSession
+from processing.sweep import SWEEP_FIELDS, session_sweep, sweep_rows
+from processing.tiled import TILED_EXTENSIONS, process_tiled
+from utils import tracing
+from utils.cache import ProductCache
+from utils.file_utils import load_image
+from utils.metrics import CoverageAccumulator
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp")
+
+# Opções que mudam o resultado, com o valor padrão: vão em cada linha e na chave da retomada
+RESULT_OPTIONS = {"scale": 1, "lut_bits": None, "superpixels": None, "tiled": 0}
+# Colunas dos resultados (CSV e JSON Lines)
+FIELDS = ["arquivo", "largura", "altura", "planta_%", "palha_%", "solo_%",
+          "sens_planta", "bias_palha", "limpeza", *RESULT_OPTIONS, "tempo_s", "erro"]
+# Colunas da cobertura por célula da grade (arquivo <saída>_grade.*)
+GRID_FIELDS = ["arquivo", "linha", "coluna", "solo_%", "palha_%", "planta_%", "pixels"]
+# Colunas da varredura dos sliders por imagem (arquivo <saída>_varredura.*)
+SWEEP_OUTPUT_FIELDS = ["arquivo"] + SWEEP_FIELDS
+
+
+def find_images(paths, recursive=True, extensions=IMAGE_EXTENSIONS):
+    """
+    Lista (ordenada) as imagens dos arquivos e pastas informados; das pastas
+    entram só os arquivos com uma das `extensions`.
+    """
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(os.path.abspath(path))
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            found.extend(os.path.abspath(os.path.join(root, f)) for f in sorted(files)
+                         if f.lower().endswith(extensions))
+            if not recursive:
+                break
+    return sorted(set(found))
+
+
+def images_root(images):
+    """Pasta comum das imagens: as saídas por imagem repetem as subpastas a partir dela."""
+    return os.path.commonpath([os.path.dirname(p) for p in images]) if images else None
+
+
+def result_name(path, root=None, suffix="_classes.png"):
+    """
+    Caminho (relativo à pasta de saída) do arquivo gerado para `path`: as
+    subpastas em relação a `root` e o nome com a extensão de origem, para que
+    a.jpg, a.png e sub/a.jpg não gravem no mesmo arquivo.
+    """
+    rel = os.path.relpath(path, root or os.path.dirname(path))
+    stem, ext = os.path.splitext(rel)
+    return stem + (f"_{ext[1:]}" if ext else "") + suffix
+
+
+def _output_path(folder, path, root, suffix):
+    out = os.path.join(folder, result_name(path, root, suffix))
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    return out
+
+
+def process_image(path, sens_planta=0.5, bias_palha=0.5, limpeza=1, tiled=None, grid=None,
+                  lut_bits=None, cache=None, scale=1, sweep=None, threads=None, superpixels=None,
+                  labels=None, from_labels=False, output_root=None):
+    """
+    Roda o pipeline completo em uma imagem e devolve a linha de resultado.
+    tiled: None (imagem inteira na memória) ou (pasta dos mapas, orçamento em bytes)
+    para o processamento por tiles, que lê só .npy e TIFF (processing.tiled.open_source)
+    e grava o mapa de classes em <nome>_<ext>_classes.npy.
+    grid: (linhas, colunas) para incluir a cobertura por célula em record["grade"].
+    lut_bits: avalia os scores por cor distinta (processing.color_lut) com esses
+    bits por canal em vez do cálculo por pixel (não se aplica ao modo por tiles).
+    cache: (pasta, tamanho máximo em bytes) do cache em disco dos scores;
+    uma reexecução com outros parâmetros começa direto nos limiares.
+    scale: resolução de trabalho 1/scale (1, 2, 4 ou 8; nos JPEGs reduzida já na
+    decodificação). A limpeza é dividida pelo mesmo fator, para valer a mesma
+    distância na foto; largura/altura saem na resolução de trabalho.
+    sweep: (valores de sens_planta, valores de bias_palha) para incluir em
+    record["varredura"] a superfície dos percentuais antes da limpeza
+    (processing.sweep; não se aplica ao modo por tiles).
+    threads: processa a imagem em faixas de linhas com esse número de threads
+    (processing.parallel; mesmo resultado, para poucas imagens muito grandes).
+    superpixels: classifica por regiões (processing.superpixels) com cerca de
+    esse número de superpixels em vez de pixel a pixel.
+    labels: pasta onde gravar o mapa de classes de cada imagem
+    (<nome>_<ext>_classes.png de 2 bits + .json, processing.export; não se
+    aplica ao modo por tiles, que já grava o seu .npy).
+    output_root: pasta das entradas a partir da qual as subpastas se repetem
+    nas pastas de saída (ver result_name; padrão: a pasta da própria imagem).
+    from_labels: `path` é um mapa de classes exportado; os percentuais (e a
+    grade) são recalculados dele, sem a foto, com os parâmetros do seu JSON.
+    Com o tracing ligado no processo, os eventos registrados vão em record["trace"].
+    """
+    start = time.perf_counter()
+    record = {"arquivo": path, "sens_planta": sens_planta, "bias_palha": bias_palha,
+              "limpeza": limpeza, **result_options(scale, lut_bits, superpixels, tiled), "erro": ""}
+    coverage = CoverageAccumulator(grid=grid)
+    try:
+        with tracing.span("process_image", arquivo=os.path.basename(path)):
+            if from_labels:
+                _labels_into(record, coverage)
+            else:
+                _segment_into(record, coverage, sens_planta, bias_palha, limpeza, tiled, lut_bits, cache, scale,
+                              sweep, threads, superpixels, labels, output_root)
+        if grid is not None:
+            record["grade"] = _grid_rows(path, coverage)
+    except Exception as exc:
+        record["erro"] = str(exc)
+    record["tempo_s"] = round(time.perf_counter() - start, 3)
+    if tracing.is_enabled():
+        record["trace"] = tracing.drain()
+    return record
+
+
+def _segment_into(record, coverage, sens_planta, bias_palha, limpeza, tiled, lut_bits, cache, scale,
+                  sweep=None, threads=None, superpixels=None, labels=None, output_root=None):
+    path = record["arquivo"]
+    if tiled is not None:
+        maps_dir, memory_budget = tiled
+        result = process_tiled(path, _output_path(maps_dir, path, output_root, "_classes.npy"), sens_planta,
+                               bias_palha, limpeza, memory_budget=memory_budget, coverage=coverage)
+        record["altura"], record["largura"] = np.load(result["output"], mmap_mode="r").shape
+    else:
+        with tracing.span("imread"):
+            img = load_image(path, scale)
+        limpeza = limpeza / scale
+        pool = BandPool(threads) if threads else None
+        try:
+            if lut_bits:
+                session = SegmentationSession.from_scores(img, *lut_scores(img, lut_bits))
+                session.pool = pool
+            elif cache is not None:
+                session = cached_session(img, ProductCache(*cache), pool=pool)
+            elif pool is not None:
+                session = parallel_session(img, pool, keep_indices=False)
+            else:
+                session = SegmentationSession(img, compute_all_indices(img))
+            regions = SuperpixelSession.build(session, superpixels) if superpixels else session
+            seg_map, metrics = regions.segment(sens_planta, bias_palha, limpeza)
+        finally:
+            if pool is not None:
+                pool.close()
+        coverage.add(seg_map)
+        if labels is not None:
+            save_label_map(_output_path(labels, path, output_root, "_classes.png"), seg_map, metrics,
+                           (sens_planta, bias_palha, record["limpeza"]),
+                           regions.thresholds(sens_planta, bias_palha), source=path)
+        if sweep is not None:
+            # O histograma conjunto já está na sessão: a grade inteira sai sem reclassificar
+            record["varredura"] = [{"arquivo": path, **row} for row in sweep_rows(session_sweep(session, *sweep))]
+        record["altura"], record["largura"] = img.shape[:2]
+    record.update(coverage.total())
+
+
+def _labels_into(record, coverage):
+    """Registro de um mapa de classes exportado: contagens do próprio mapa."""
+    seg_map, meta = load_label_map(record["arquivo"])
+    for key in ("sens_planta", "bias_palha", "limpeza"):
+        if key in meta:
+            record[key] = meta[key]
+    coverage.add(seg_map)
+    record["altura"], record["largura"] = seg_map.shape
+    record.update(coverage.total())
+
+
+def _grid_rows(path, coverage):
+    cols = coverage.grid[1]
+    pct = np.round(coverage.coverage(), 2)
+    pixels = coverage.counts.sum(axis=1)
+    return [{"arquivo": path, "linha": i // cols, "coluna": i % cols,
+             "solo_%": float(pct[i, 0]), "palha_%": float(pct[i, 1]), "planta_%": float(pct[i, 2]),
+             "pixels": int(pixels[i])} for i in range(len(pct))]
+
+
+def grid_output_path(output, suffix="grade"):
+    """resultados.csv → resultados_grade.csv (mesmo formato da saída principal)."""
+    stem, ext = os.path.splitext(output)
+    return f"{stem}_{suffix}{ext}"
+
+
+def _init_worker(trace=False, trace_memory=False):
+    # Um processo por núcleo: o OpenCV não deve abrir threads próprias
+    cv2.setNumThreads(1)
+    if trace:
+        tracing.enable(track_memory=trace_memory)
+
+
+class ResultWriter:
+    """
+    Grava os resultados à medida que chegam (CSV ou JSON Lines, pela extensão),
+    com flush a cada linha para que uma execução interrompida possa ser retomada.
+    append=False começa o arquivo do zero (truncando o existente).
+    """
+    def __init__(self, output, fields=FIELDS, append=True):
+        self.output = output
+        self.fields = fields
+        self.is_csv = output.lower().endswith(".csv")
+        exists = append and os.path.exists(output) and os.path.getsize(output) > 0
+        if exists and self.is_csv:
+            with open(output, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), [])
+            if header != list(fields):
+                raise ValueError(f"{output} tem outras colunas (gravado por outra versão); use outro arquivo de saída.")
+        self._file = open(output, "a" if append else "w", newline="", encoding="utf-8")
+        if self.is_csv:
+            self._csv = csv.DictWriter(self._file, fieldnames=fields, extrasaction="ignore")
+            if not exists:
+                self._csv.writeheader()
+
+    def write(self, record):
+        if self.is_csv:
+            self._csv.writerow(record)
+        else:
+            self._file.write(json.dumps({k: record.get(k) for k in self.fields}, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def result_options(scale=1, lut_bits=None, superpixels=None, tiled=None):
+    """Valores das RESULT_OPTIONS de uma execução, como vão nas linhas de resultado."""
+    return {"scale": scale, "lut_bits": lut_bits, "superpixels": superpixels, "tiled": int(tiled is not None)}
+
+
+def _option_value(value):
+    """Valor comparável de uma opção lida do CSV (texto) ou do JSON Lines."""
+    return None if value is None or value == "" else float(value)
+
+
+def _read_rows(output):
+    """Linhas de um arquivo de resultados (CSV ou JSON Lines); vazio se não existir."""
+    if not os.path.exists(output):
+        return
+    with open(output, newline="", encoding="utf-8") as f:
+        if output.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            yield from (json.loads(line) for line in f if line.strip())
+
+
+def _keys_by_path(output, fields):
+    """arquivo → conjunto das chaves (valores de `fields`) das suas linhas em `output`."""
+    keys = {}
+    for row in _read_rows(output):
+        keys.setdefault(row["arquivo"], set()).add(tuple(_option_value(row.get(k)) for k in fields))
+    return keys
+
+
+def completed_paths(output, sens_planta=0.5, bias_palha=0.5, limpeza=1, options=None,
+                    tiled=None, grid=None, sweep=None, labels=None, from_labels=False, output_root=None):
+    """
+    Arquivos já processados com sucesso, com os mesmos parâmetros e as
+    mesmas RESULT_OPTIONS (ver result_options), numa execução anterior.
+    Com saídas extras pedidas (tiled, grid, sweep, labels; ver process_image),
+    só conta como feito o arquivo que já tem todas elas: o mapa em disco e,
+    em <saída>_grade.* / <saída>_varredura.*, todas as células e pontos pedidos.
+    Os demais são reprocessados e ganham uma nova linha na saída.
+    """
+    if not os.path.exists(output):
+        return set()
+    options = {**RESULT_OPTIONS, **(options or {})}
+    key = tuple(_option_value(v) for v in (sens_planta, bias_palha, limpeza, *options.values()))
+    done = set()
+    for row in _read_rows(output):
+        values = [row.get(k) for k in ("sens_planta", "bias_palha", "limpeza")]
+        values += [row.get(k, default) for k, default in RESULT_OPTIONS.items()]
+        same = tuple(_option_value(v) for v in values) == key
+        if same and not row.get("erro"):
+            done.add(row["arquivo"])
+
+    maps = None
+    if tiled is not None:
+        maps = (tiled[0], "_classes.npy")
+    elif labels is not None and not from_labels:
+        maps = (labels, "_classes.png")
+    if maps is not None:
+        done = {p for p in done if os.path.exists(os.path.join(maps[0], result_name(p, output_root, maps[1])))}
+    if grid is not None:
+        cells = {(float(i), float(j)) for i in range(grid[0]) for j in range(grid[1])}
+        written = _keys_by_path(grid_output_path(output), ("linha", "coluna"))
+        done = {p for p in done if cells <= written.get(p, set())}
+    if sweep is not None and tiled is None and not from_labels:
+        points = {(round(float(s), 4), round(float(b), 4)) for s in sweep[0] for b in sweep[1]}
+        written = _keys_by_path(grid_output_path(output, "varredura"), ("sens_planta", "bias_palha"))
+        done = {p for p in done if points <= written.get(p, set())}
+    return done
+
+
+def run_batch(paths, output, sens_planta=0.5, bias_palha=0.5, limpeza=1,
+              workers=None, resume=True, on_result=None, tiled=None, grid=None,
+              trace=False, trace_memory=False, lut_bits=None, cache=None, scale=1, sweep=None,
+              threads=None, superpixels=None, labels=None, from_labels=False):
+    """
+    Processa as imagens num pool de processos (um por núcleo por padrão),
+    gravando cada resultado assim que fica pronto. Com resume=True pula o que
+    já está no arquivo de saída com as saídas extras pedidas (completed_paths).
+    Devolve o resumo com a vazão (imagens/s).
+    tiled: ver process_image (o orçamento de memória vale por processo).
+    grid: (linhas, colunas) grava também a cobertura por célula em <saída>_grade.*
+    trace: liga o tracing nos processos e junta os eventos no processo atual
+    (exportar depois com utils.tracing.export_chrome_trace); trace_memory
+    conta também os bytes alocados por etapa.
+    sweep: ver process_image; a superfície de cada imagem vai para <saída>_varredura.*
+    lut_bits, cache, scale, threads, superpixels, labels, from_labels: ver process_image
+    (threads vale por processo; com from_labels, `paths` são mapas de classes exportados).
+    """
+    images = find_images(paths, extensions=TILED_EXTENSIONS if tiled is not None else IMAGE_EXTENSIONS)
+    root = images_root(images)
+    options = result_options(scale, lut_bits, superpixels, tiled)
+    skipped = (completed_paths(output, sens_planta, bias_palha, limpeza, options, tiled, grid, sweep,
+                               labels, from_labels, root) if resume else set())
+    todo = [p for p in images if p not in skipped]
+    workers = workers or os.cpu_count() or 1
+
+    writer = ResultWriter(output)
+    grid_writer = ResultWriter(grid_output_path(output), GRID_FIELDS) if grid is not None else None
+    sweep_writer = (ResultWriter(grid_output_path(output, "varredura"), SWEEP_OUTPUT_FIELDS)
+                    if sweep is not None else None)
+    failed = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(trace, trace_memory)) as pool:
+            # Limita as tarefas em voo para não acumular resultados na memória
+            pending = set()
+            queue = iter(todo)
+            while True:
+                for path in queue:
+                    pending.add(pool.submit(process_image, path, sens_planta, bias_palha, limpeza,
+                                               tiled, grid, lut_bits, cache, scale, sweep, threads,
+                                               superpixels, labels, from_labels, root))
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    tracing.extend(record.pop("trace", ()))
+                    failed += bool(record["erro"])
+                    for row in record.pop("grade", ()):
+                        grid_writer.write(row)
+                    for row in record.pop("varredura", ()):
+                        sweep_writer.write(row)
+                    writer.write(record)
+                    if on_result is not None:
+                        on_result(record)
+    finally:
+        writer.close()
+        for extra in (grid_writer, sweep_writer):
+            if extra is not None:
+                extra.close()
+
+    elapsed = time.perf_counter() - start
+    processed = len(todo)
+    return {
+        "encontradas": len(images),
+        "processadas": processed,
+        "puladas": len(images) - processed,
+        "falhas": failed,
+        "workers": workers,
+        "tempo_s": round(elapsed, 2),
+        "imagens_por_s": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+    }
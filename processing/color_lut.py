@@ -0,0 +1,86 @@
+import numpy as np
+
+from processing.indices import compute_all_indices, raw_index_bounds
+from processing.session import compute_straw_score, compute_veg_score
+from utils.tracing import traced
+
+# Bits por canal aceitos (8 = cores exatas, sem quantização)
+LUT_BITS = range(1, 9)
+# Tabela densa sempre aceita (7 bits por canal: 2^21 cores, 18 MB)
+LUT_MAX_ENTRIES = 1 << 21
+# Memória da tabela por cor possível (scores veg e palha float32 + marca de presença)
+# e do cálculo por pixel (índices, scores e rascunhos; medido em 4000x3000)
+TABLE_BYTES_PER_ENTRY = 9
+EXACT_BYTES_PER_PIXEL = 40
+
+
+def colour_keys(img, bits=8):
+    """
+    Chave inteira de cada pixel: (B, G, R) com `bits` bits por canal,
+    empacotados em B << 2*bits | G << bits | R (uint32).
+    """
+    if img is None or len(img.shape) < 3:
+        raise ValueError("Imagem inválida ou não colorida.")
+    if bits not in LUT_BITS:
+        raise ValueError(f"Bits por canal fora do intervalo 1–8: {bits}")
+    shift = 8 - bits
+    keys = np.empty(img.shape[:2], dtype=np.uint32)
+    np.right_shift(img[:, :, 0], shift, out=keys)
+    for c in (1, 2):
+        np.left_shift(keys, bits, out=keys)
+        np.bitwise_or(keys, np.right_shift(img[:, :, c], shift), out=keys)
+    return keys
+
+
+def palette_colours(palette, bits=8):
+    """
+    Cores BGR (k, 1, 3) uint8 das chaves da paleta. Com quantização, cada cor
+    é o centro da sua célula (ex.: bits=6 → 4 níveis por célula, centro +2).
+    """
+    shift = 8 - bits
+    mask = (1 << bits) - 1
+    centre = (1 << shift) >> 1
+    colours = np.empty((len(palette), 1, 3), dtype=np.uint8)
+    for c in range(3):
+        channel = (palette >> (bits * (2 - c))) & mask
+        colours[:, 0, c] = (channel << shift) + centre
+    return colours
+
+
+@traced("lut_scores")
+def lut_scores(img, bits=8):
+    """
+    Scores de planta e de palha avaliados uma vez por cor distinta da imagem
+    (quantizada em `bits` bits por canal) e distribuídos aos pixels por consulta.
+
+    Os índices brutos, Cb/Cr e L dependem só da cor; a normalização min/máx da
+    imagem é recalculada sobre a paleta, que tem os mesmos extremos da imagem.
+    Com bits=8 o resultado é idêntico ao caminho exato; com menos bits o erro
+    vem só da quantização (ver benchmarks.bench_color_lut).
+    A tabela tem uma entrada por cor possível. Acima de LUT_MAX_ENTRIES, se
+    ela ocupar mais que o cálculo por pixel (só com bits=8, 151 MB, em
+    imagens abaixo de ~3,8 MP), os scores são calculados por pixel: mesmo
+    resultado, com memória proporcional à imagem.
+    Devolve (veg_score, straw_score) em float32, como a SegmentationSession.
+    """
+    keys = colour_keys(img, bits)
+    size = 1 << (3 * bits)
+    if size > LUT_MAX_ENTRIES and size * TABLE_BYTES_PER_ENTRY > keys.size * EXACT_BYTES_PER_PIXEL:
+        indices = compute_all_indices(img)
+        return compute_veg_score(indices), compute_straw_score(img, indices["StrawIndex"])
+    present = np.zeros(size, dtype=bool)
+    present[keys] = True
+    palette = np.flatnonzero(present).astype(np.uint32)
+
+    table = np.empty((2, len(present)), dtype=np.float32)
+    table[0, palette], table[1, palette] = score_tables(palette_colours(palette, bits))
+    return np.take(table[0], keys), np.take(table[1], keys)
+
+
+def score_tables(colours, bounds=None):
+    """
+    Scores (veg, straw) de cada cor de uma paleta (k, 1, 3), em float32.
+    bounds: limites dos índices brutos para a normalização (None = os da própria paleta).
+    """
+    indices = compute_all_indices(colours, bounds=bounds if bounds is not None else raw_index_bounds(colours))
+    return compute_veg_score(indices)[:, 0], compute_straw_score(colours, indices["StrawIndex"])[:, 0]
@@ -0,0 +1,177 @@
+"""
+Exportação dos resultados.
+
+    imagem com rodapé   overlay/mapa/original e os percentuais desenhados num
+                        quadro alocado uma vez com o espaço do rodapé (sem np.vstack)
+    mapa de classes     PNG de paleta com 2 bits por pixel (abre colorido em
+                        qualquer visualizador; os índices da paleta são as classes)
+                        e um JSON ao lado com parâmetros, limiares e percentuais
+
+Um mapa exportado volta com load_label_map e permite recalcular percentuais
+e grades (utils.metrics) sem reprocessar a foto. A codificação é a parte
+lenta: a interface e o lote a fazem fora da thread de processamento.
+"""
+import io
+import json
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from processing.rendering import OVERLAY_ALPHA, PALETTE, render_class_map
+from utils.metrics import N_CLASSES
+from utils.tracing import traced
+
+# Identificação do JSON que acompanha o mapa de classes
+LABEL_MAP_FORMAT = "easy_iop.mapa_classes"
+LABEL_MAP_VERSION = 1
+CLASS_NAMES = ["solo", "palha", "planta"]
+# Bits por pixel do PNG de paleta (3 classes cabem em 2)
+LABEL_MAP_BITS = 2
+
+FOOTER_MIN_HEIGHT = 60
+FOOTER_FRACTION = 0.08
+WATERMARK = "Thiagoscocco 2025"
+
+
+def footer_height(height):
+    """Altura do rodapé para uma imagem de `height` linhas."""
+    return max(FOOTER_MIN_HEIGHT, int(height * FOOTER_FRACTION))
+
+
+def draw_footer(canvas, height, metrics):
+    """
+    Desenha o rodapé (fundo branco, percentuais e marca d'água) nas linhas
+    de `canvas` abaixo de `height`, no próprio quadro.
+    """
+    footer_h, w = canvas.shape[0] - height, canvas.shape[1]
+    canvas[height:] = 255
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale = max(0.6, round(w / 1600.0, 2))
+    thickness = max(1, int(font_scale * 2))
+
+    sections = [
+        ("PLANTA", metrics["planta_%"]),
+        ("PALHA", metrics["palha_%"]),
+        ("SOLO", metrics["solo_%"]),
+    ]
+    section_width = w // len(sections)
+    baseline_y = height + (footer_h + cv2.getTextSize("A", font, font_scale, thickness)[0][1]) // 2
+
+    for idx, (label, value) in enumerate(sections):
+        value_str = f"{value:.2f}".rstrip("0").rstrip(".")
+        text = f"{label}: {value_str} %"
+        text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
+        center_x = int((idx + 0.5) * section_width)
+        text_x = max(10, center_x - text_size[0] // 2)
+        cv2.putText(canvas, text, (text_x, baseline_y), font, font_scale, (0, 0, 0), thickness, cv2.LINE_AA)
+
+    wm_scale = max(0.5, round(font_scale * 0.55, 2))
+    wm_thickness = max(1, int(wm_scale * 2))
+    wm_size = cv2.getTextSize(WATERMARK, font, wm_scale, wm_thickness)[0]
+    wm_x = max(10, w - wm_size[0] - int(w * 0.02))
+    wm_y = height + footer_h - int(footer_h * 0.2)
+    cv2.putText(canvas, WATERMARK, (wm_x, wm_y), font, wm_scale, (90, 90, 90), wm_thickness, cv2.LINE_AA)
+    return canvas
+
+
+@traced("render_result")
+def render_result(img, seg_map, metrics, mode="Overlay", alpha=OVERLAY_ALPHA):
+    """
+    Imagem final com rodapé. O quadro já nasce com as linhas do rodapé e a
+    visualização é renderizada direto nele: o overlay mistura a imagem com a
+    paleta no próprio quadro, sem buffer intermediário.
+    mode: "Overlay", "Mapa" ou "Original".
+    """
+    h, w = img.shape[:2]
+    canvas = np.empty((h + footer_height(h), w, 3), dtype=np.uint8)
+    body = canvas[:h]
+    if mode == "Original":
+        np.copyto(body, img)
+    else:
+        render_class_map(seg_map, out=body)
+        if mode != "Mapa":
+            cv2.addWeighted(img, 1.0 - alpha, body, alpha, 0, dst=body)
+    return draw_footer(canvas, h, metrics)
+
+
+def write_image(path, img):
+    """cv2.imwrite com erro em vez de retorno False."""
+    if not cv2.imwrite(path, img):
+        raise ValueError(f"Não foi possível gravar {path}.")
+
+
+def sidecar_path(path):
+    """mapa.png → mapa.json"""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def encode_label_map(seg_map):
+    """Bytes do PNG de paleta de 2 bits do mapa de classes (sem o JSON)."""
+    if seg_map is None or seg_map.ndim != 2:
+        raise ValueError("Mapa de classes inválido.")
+    image = Image.fromarray(np.ascontiguousarray(seg_map, dtype=np.uint8))
+    image.putpalette(PALETTE[:, ::-1].ravel().tolist())  # PALETTE é BGR
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", bits=LABEL_MAP_BITS)
+    return buffer.getvalue()
+
+
+@traced("save_label_map")
+def save_label_map(path, seg_map, metrics, params=None, thresholds=None, source=None):
+    """
+    Grava o mapa de classes em PNG de paleta de 2 bits e o JSON ao lado.
+    params: (sens_planta, bias_palha, limpeza); thresholds: (t_veg, t_straw);
+    source: caminho da foto de origem. Devolve o caminho do JSON.
+    """
+    with open(path, "wb") as f:
+        f.write(encode_label_map(seg_map))
+
+    h, w = seg_map.shape
+    meta = {
+        "formato": LABEL_MAP_FORMAT,
+        "versao": LABEL_MAP_VERSION,
+        "largura": w,
+        "altura": h,
+        "classes": CLASS_NAMES,
+        "imagem": source,
+        "percentuais": {key: float(value) for key, value in metrics.items()},
+    }
+    if params is not None:
+        meta["sens_planta"], meta["bias_palha"], meta["limpeza"] = (float(v) for v in params)
+    if thresholds is not None:
+        meta["t_veg"], meta["t_straw"] = (float(v) for v in thresholds)
+    meta_path = sidecar_path(path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta_path
+
+
+@traced("load_label_map")
+def load_label_map(path):
+    """
+    Lê um mapa exportado por save_label_map. Devolve (seg_map uint8, metadados);
+    os metadados vêm do JSON ao lado ({} se ele não existir).
+    """
+    meta = {}
+    meta_path = sidecar_path(path)
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("formato") != LABEL_MAP_FORMAT:
+            raise ValueError(f"{meta_path} não descreve um mapa de classes.")
+    try:
+        with Image.open(path) as image:
+            if image.mode != "P":
+                raise ValueError(f"{path} não é um mapa de classes (PNG de paleta).")
+            seg_map = np.asarray(image)
+    except OSError as exc:
+        raise ValueError(f"Mapa de classes ilegível: {path}") from exc
+    if meta and seg_map.shape != (meta["altura"], meta["largura"]):
+        raise ValueError(f"{path} não tem o tamanho registrado em {meta_path}.")
+    if seg_map.size and seg_map.max() >= N_CLASSES:
+        raise ValueError(f"{path} tem classes fora de 0–{N_CLASSES - 1}.")
+    return seg_map, meta
+
@@ -1,51 +1,179 @@
 import numpy as np
-import cv2
+from utils.tracing import traced
 
-def normalize(arr):
-    arr = arr.astype(np.float32)
-    min_val, max_val = np.nanmin(arr), np.nanmax(arr)
+# Nomes dos índices na ordem em que são calculados
+INDEX_NAMES = ("ExG", "ExGR", "CIVE", "NDI", "StrawIndex")
+
+# Modos de armazenamento aceitos por compute_all_indices.
+# "float32" → resultado idêntico ao cálculo original (diferença < 1e-6)
+# "float16" → metade da memória, erro absoluto ≤ 2.5e-4 (meio ULP em [0.5, 1))
+# "uint8"   → um quarto da memória, quantizado em 1/255, erro absoluto ≤ 2e-3 (~1/510)
+STORAGE_TOLERANCE = {
+    "float32": 1e-6,
+    "float16": 2.5e-4,
+    "uint8": 2e-3,
+}
+
+
+def normalize(arr, out=None, bounds=None):
+    """
+    Normaliza para 0–1 usando o mínimo e o máximo da própria matriz
+    (ou os limites globais `bounds=(min, max)`, no processamento por tiles).
+    Com out=arr a normalização é feita no lugar, sem cópias extras.
+    """
+    if out is None:
+        out = np.array(arr, dtype=np.float32)
+    elif out is not arr:
+        np.copyto(out, arr, casting="unsafe")
+    min_val, max_val = bounds if bounds is not None else (np.nanmin(out), np.nanmax(out))
     if max_val - min_val == 0:
-        return np.zeros_like(arr, dtype=np.float32)
-    norm = (arr - min_val) / (max_val - min_val)
-    return np.clip(norm, 0, 1)
+        out.fill(0)
+        return out
+    np.subtract(out, min_val, out=out)
+    np.divide(out, max_val - min_val, out=out)
+    np.clip(out, 0, 1, out=out)
+    return out
+
+
+def split_channels(img):
+    """Converte e separa os canais B, G, R em float32 (uma única vez)."""
+    if img is None or len(img.shape) < 3:
+        raise ValueError("Imagem inválida ou não colorida.")
+    return tuple(img[:, :, c].astype(np.float32) for c in range(3))
+
+
+# --- Núcleos dos índices (sem normalização) ---
+# Cada núcleo escreve em `out` e usa `tmp` como rascunho, sem alocar nada.
+
+def _exg(b, g, r, out, tmp):
+    np.multiply(g, 2, out=out)
+    np.subtract(out, r, out=out)
+    np.subtract(out, b, out=out)
+    return out
+
+def _exgr(b, g, r, out, tmp):
+    np.multiply(g, 3, out=out)
+    np.multiply(r, 2.4, out=tmp)
+    np.subtract(out, tmp, out=out)
+    np.subtract(out, b, out=out)
+    return out
+
+def _cive(b, g, r, out, tmp):
+    # Já devolve -CIVE, que é o que vai para a normalização
+    np.multiply(r, 0.441, out=out)
+    np.multiply(g, 0.811, out=tmp)
+    np.subtract(out, tmp, out=out)
+    np.multiply(b, 0.385, out=tmp)
+    np.add(out, tmp, out=out)
+    np.add(out, 18.787, out=out)
+    np.negative(out, out=out)
+    return out
+
+def _ndi(b, g, r, out, tmp):
+    np.subtract(g, r, out=out)
+    np.add(g, r, out=tmp)
+    np.add(tmp, 1e-6, out=tmp)
+    np.divide(out, tmp, out=out)
+    return out
+
+def _straw(b, g, r, out, tmp):
+    np.add(r, g, out=out)
+    np.multiply(out, 0.5, out=out)
+    np.subtract(out, b, out=out)
+    return out
+
+_KERNELS = {
+    "ExG": _exg,
+    "ExGR": _exgr,
+    "CIVE": _cive,
+    "NDI": _ndi,
+    "StrawIndex": _straw,
+}
+
+
+def _store(norm, storage):
+    """Converte um índice normalizado (float32) para o modo de armazenamento."""
+    if storage == "float16":
+        return norm.astype(np.float16)
+    # uint8: quantiza 0–1 em 0–255 com arredondamento
+    np.multiply(norm, 255.0, out=norm)
+    np.rint(norm, out=norm)
+    return norm.astype(np.uint8)
+
+
+def _single_index(img, name):
+    b, g, r = split_channels(img)
+    out = np.empty_like(g)
+    _KERNELS[name](b, g, r, out, np.empty_like(g))
+    return normalize(out, out=out)
+
 
 def calculate_exg(img):
-    b, g, r = cv2.split(img.astype(np.float32))
-    exg = 2 * g - r - b
-    return normalize(exg)
+    return _single_index(img, "ExG")
 
 def calculate_exgr(img):
-    b, g, r = cv2.split(img.astype(np.float32))
-    exgr = 3 * g - 2.4 * r - b
-    return normalize(exgr)
+    return _single_index(img, "ExGR")
 
 def calculate_cive(img):
-    b, g, r = cv2.split(img.astype(np.float32))
-    cive = 0.441 * r - 0.811 * g + 0.385 * b + 18.787
-    return normalize(-cive)
+    return _single_index(img, "CIVE")
 
 def calculate_ndi(img):
-    b, g, r = cv2.split(img.astype(np.float32))
-    ndi = (g - r) / (g + r + 1e-6)
-    return normalize(ndi)
+    return _single_index(img, "NDI")
 
 def calculate_straw_index(img):
-    b, g, r = cv2.split(img.astype(np.float32))
-    straw = ((r + g) / 2) - b
-    return normalize(straw)
+    return _single_index(img, "StrawIndex")
 
-def compute_all_indices(img):
-    if img is None or len(img.shape) < 3:
-        raise ValueError("Imagem inválida ou não colorida.")
-    exg = calculate_exg(img)
-    exgr = calculate_exgr(img)
-    cive = calculate_cive(img)
-    ndi = calculate_ndi(img)
-    straw = calculate_straw_index(img)
-    return {
-        "ExG": exg,
-        "ExGR": exgr,
-        "CIVE": cive,
-        "NDI": ndi,
-        "StrawIndex": straw
-    }
+
+def raw_index_bounds(img):
+    """
+    Mínimo e máximo de cada índice antes da normalização.
+    Os limites de vários tiles se combinam com merge_index_bounds.
+    """
+    b, g, r = split_channels(img)
+    out, tmp = np.empty_like(g), np.empty_like(g)
+    bounds = {}
+    for name in INDEX_NAMES:
+        _KERNELS[name](b, g, r, out, tmp)
+        bounds[name] = (float(np.nanmin(out)), float(np.nanmax(out)))
+    return bounds
+
+
+def merge_index_bounds(a, b):
+    """Combina os limites de dois tiles (None = vazio)."""
+    if a is None:
+        return b
+    return {name: (min(a[name][0], b[name][0]), max(a[name][1], b[name][1])) for name in a}
+
+
+@traced("compute_all_indices")
+def compute_all_indices(img, storage="float32", bounds=None):
+    """
+    Calcula todos os índices numa passada só: converte e separa os canais
+    uma vez e reaproveita um buffer de rascunho para todos os índices.
+
+    storage: "float32" (padrão), "float16" ou "uint8" (quantizado 0–255).
+    Os modos compactos reduzem a memória residente em 2x e 4x; a tolerância
+    de cada modo está em STORAGE_TOLERANCE. Use index_as_float para ler.
+    bounds: limites globais de raw_index_bounds (normalização por tiles).
+    """
+    if storage not in STORAGE_TOLERANCE:
+        raise ValueError(f"Modo de armazenamento desconhecido: {storage}")
+    b, g, r = split_channels(img)
+    tmp = np.empty_like(g)
+    # No modo compacto um único buffer float32 é reaproveitado por todos os índices
+    work = np.empty_like(g) if storage != "float32" else None
+
+    indices = {}
+    for name in INDEX_NAMES:
+        out = work if work is not None else np.empty_like(g)
+        _KERNELS[name](b, g, r, out, tmp)
+        normalize(out, out=out, bounds=None if bounds is None else bounds[name])
+        indices[name] = out if work is None else _store(out, storage)
+    return indices
+
+
+def index_as_float(arr):
+    """Devolve o índice normalizado em float32 (0–1), qualquer que seja o armazenamento."""
+    if arr.dtype == np.uint8:
+        return arr.astype(np.float32) * np.float32(1.0 / 255.0)
+    return arr.astype(np.float32, copy=False)
@@ -0,0 +1,199 @@
+"""
+Execução por faixas de linhas num pool de threads (uma imagem grande em vários núcleos).
+
+As etapas por pixel (índices, scores, comparações, limpeza, paleta e mistura
+do overlay) rodam em faixas horizontais; o NumPy e o OpenCV liberam o GIL
+nesses laços. As reduções globais são combinadas quando as faixas terminam:
+
+    limites dos índices        → merge_index_bounds
+    mín./máx. e histograma veg → somados (Otsu igual ao da imagem inteira)
+    histograma conjunto        → somado
+    contagens por classe       → somadas
+
+A limpeza lê cada faixa com cleaning_halo linhas de margem, então o mapa
+final é idêntico ao da imagem processada de uma vez (como em processing.tiled).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from processing.indices import INDEX_NAMES, compute_all_indices, merge_index_bounds, raw_index_bounds
+from processing.postprocessing import apply_postprocessing, cleaning_halo
+from processing.rendering import render_class_map, render_overlay
+from processing.session import (
+    SegmentationSession, classify_scores, compute_straw_score, compute_veg_score, joint_histogram,
+)
+from processing.thresholds import otsu_from_histogram, value_histogram
+from utils.metrics import class_counts
+from utils.tracing import span
+
+# Faixas por thread (mais faixas equilibram melhor a carga entre os núcleos)
+BANDS_PER_WORKER = 4
+# Altura mínima de uma faixa: abaixo disso a margem da limpeza pesa demais
+MIN_BAND_ROWS = 64
+# Tipo de cada modo de armazenamento dos índices (ver indices.STORAGE_TOLERANCE)
+_STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "uint8": np.uint8}
+
+
+def band_rows(height, bands, halo=0):
+    """
+    Divide as linhas em até `bands` faixas. Devolve (interno, externo): a
+    fatia de linhas da faixa e a lida com `halo` linhas de margem.
+    """
+    bands = max(1, min(bands, height // MIN_BAND_ROWS))
+    edges = np.linspace(0, height, bands + 1).astype(int)
+    return [(slice(y0, y1), slice(max(0, y0 - halo), min(height, y1 + halo)))
+            for y0, y1 in zip(edges[:-1], edges[1:])]
+
+
+def _crop(inner, outer):
+    """Fatia do interior da faixa dentro da região lida com margem."""
+    return slice(inner.start - outer.start, inner.stop - outer.start)
+
+
+class BandPool:
+    """
+    Pool de threads para as etapas por faixa. workers=1 roda tudo na thread
+    atual (mesmo resultado, sem threads). Use como gerenciador de contexto
+    ou chame close() ao terminar.
+    """
+    def __init__(self, workers=None, bands_per_worker=BANDS_PER_WORKER):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.bands_per_worker = bands_per_worker
+        self._executor = (ThreadPoolExecutor(self.workers, thread_name_prefix="band")
+                          if self.workers > 1 else None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def bands(self, height, halo=0):
+        return band_rows(height, self.workers * self.bands_per_worker, halo)
+
+    def map(self, fn, items):
+        """fn em cada item, em paralelo; devolve a lista dos resultados na ordem."""
+        if self._executor is None:
+            return [fn(item) for item in items]
+        return list(self._executor.map(fn, items))
+
+    # --- Etapas por faixa ---
+    def classify(self, veg_score, straw_score, t_veg, t_straw, out=None, mask=None):
+        """classify_scores por faixas (em `out` e com o buffer bool `mask`, se dados)."""
+        seg_map = np.empty(veg_score.shape, dtype=np.uint8) if out is None else out
+
+        def run(band):
+            rows = band[0]
+            classify_scores(veg_score[rows], straw_score[rows], t_veg, t_straw, out=seg_map[rows],
+                            mask=None if mask is None else mask[rows])
+        self.map(run, self.bands(seg_map.shape[0]))
+        return seg_map
+
+    def postprocess(self, seg_map, level=1, out=None, arena=None):
+        """
+        apply_postprocessing por faixas com margem, em `out` se dado (não
+        pode ser o próprio seg_map). Devolve (mapa limpo, contagens por classe).
+        arena: BufferArena opcional com os buffers de cada faixa (as margens se
+        sobrepõem, então cada faixa tem os seus) e a máscara das contagens.
+        """
+        if out is None:
+            out = np.empty_like(seg_map)
+        mask = None if arena is None else arena.get("mask", seg_map.shape, bool)
+
+        def run(item):
+            i, (inner, outer) = item
+            part = seg_map[outer]
+            if arena is None:
+                clean = apply_postprocessing(part, level=level)
+            else:
+                work = tuple(arena.get(f"band_{name}{i}", part.shape) for name in ("soil", "straw", "plant"))
+                clean = apply_postprocessing(part, level=level, out=arena.get(f"band_clean{i}", part.shape),
+                                             work=work)
+            out[inner] = clean[_crop(inner, outer)]
+            return class_counts(out[inner], mask=None if mask is None else mask[inner])[0]
+        counts = self.map(run, enumerate(self.bands(seg_map.shape[0], cleaning_halo(level))))
+        return out, np.sum(counts, axis=0)
+
+    def render_class_map(self, seg_map, out):
+        """render_class_map por faixas, em `out` (altura, largura, 3)."""
+        def run(band):
+            rows = band[0]
+            render_class_map(seg_map[rows], out=out[rows])
+        self.map(run, self.bands(seg_map.shape[0]))
+        return out
+
+    def render_overlay(self, img, seg_map, alpha, out, color_buffer):
+        """render_overlay por faixas, em `out` (color_buffer recebe a paleta)."""
+        def run(band):
+            rows = band[0]
+            render_overlay(img[rows], seg_map[rows], alpha, out=out[rows], color_buffer=color_buffer[rows])
+        self.map(run, self.bands(seg_map.shape[0]))
+        return out
+
+
+def parallel_session(img, pool, storage="float32", keep_indices=True):
+    """
+    SegmentationSession com índices, scores, limiar base e histograma
+    conjunto calculados por faixas no `pool`. Os produtos são idênticos aos de
+    SegmentationSession(img, compute_all_indices(img, storage)); a sessão
+    guarda o pool, e a classificação e a limpeza também rodam por faixas.
+    keep_indices=False descarta os índices (só os scores ficam na memória).
+    """
+    if img is None or len(img.shape) < 3:
+        raise ValueError("Imagem inválida ou não colorida.")
+    if storage not in _STORAGE_DTYPES:
+        raise ValueError(f"Modo de armazenamento desconhecido: {storage}")
+    shape = img.shape[:2]
+    bands = pool.bands(shape[0])
+
+    # Normalização pelos limites da imagem inteira
+    bounds = None
+    with span("parallel.bounds"):
+        for part in pool.map(lambda band: raw_index_bounds(img[band[0]]), bands):
+            bounds = merge_index_bounds(bounds, part)
+
+    veg_score = np.empty(shape, dtype=np.float32)
+    straw_score = np.empty(shape, dtype=np.float32)
+    indices = ({name: np.empty(shape, dtype=_STORAGE_DTYPES[storage]) for name in INDEX_NAMES}
+               if keep_indices else None)
+
+    def scores(band):
+        rows = band[0]
+        part = img[rows]
+        band_indices = compute_all_indices(part, storage=storage, bounds=bounds)
+        veg, straw = veg_score[rows], straw_score[rows]
+        veg[...] = compute_veg_score(band_indices)
+        straw[...] = compute_straw_score(part, band_indices["StrawIndex"])
+        if indices is not None:
+            for name in INDEX_NAMES:
+                indices[name][rows] = band_indices[name]
+        return joint_histogram(veg, straw), veg.min(), veg.max()
+
+    with span("parallel.scores"):
+        parts = pool.map(scores, bands)
+    joint = np.sum([p[0] for p in parts], axis=0)
+    lo, hi = min(p[1] for p in parts), max(p[2] for p in parts)
+
+    # Otsu do veg_score: histogramas das faixas sobre o mesmo [mín., máx.] da imagem
+    with span("parallel.otsu"):
+        if lo == hi:
+            t_veg_base = float(lo)
+        else:
+            hists = pool.map(lambda band: value_histogram(veg_score[band[0]], lo, hi), bands)
+            try:
+                t_veg_base = otsu_from_histogram(np.sum([c for c, _ in hists], axis=0), hists[0][1])
+            except ValueError:
+                t_veg_base = float(np.percentile(veg_score, 80))
+
+    session = SegmentationSession.from_scores(img, veg_score, straw_score, indices, t_veg_base=t_veg_base,
+                                              joint_hist=np.cumsum(joint, axis=0))
+    session.pool = pool
+    return session
@@ -1,24 +1,90 @@
+import math
 import cv2
 import numpy as np
+from utils.tracing import traced
+
+# Pesos da janela já montados, por nível de limpeza
+_WEIGHTS_CACHE = {}
+
+def cleaning_weights(level=1):
+    """
+    Pesos (1D, float32, soma 1) da janela da limpeza para um nível contínuo;
+    a janela 2D é o produto dos pesos nas linhas e nas colunas.
+    Nível inteiro n → janela quadrada (2n+1)x(2n+1) de pesos iguais.
+    Nível fracionário n+f → a janela de n com mais uma linha e uma coluna de
+    cada lado, de peso f: o filtro passa de forma contínua de n para n+1 e
+    custa o mesmo que o nível inteiro seguinte (janela do mesmo comprimento).
+    Devolve None para nível <= 0 (sem limpeza).
+    """
+    level = round(float(level), 2)
+    if level <= 0:
+        return None
+    weights = _WEIGHTS_CACHE.get(level)
+    if weights is None:
+        n, f = int(level), round(level - int(level), 2)
+        weights = np.ones(2 * n + 1 + (2 if f > 0 else 0), dtype=np.float64)
+        if f > 0:
+            weights[0] = weights[-1] = f
+        weights = (weights / weights.sum()).astype(np.float32)
+        _WEIGHTS_CACHE[level] = weights
+    return weights
+
+def cleaning_halo(level=1):
+    """
+    Alcance (em pixels) da limpeza: o raio da janela, ceil(level). Tiles com
+    essa margem não geram emendas.
+    """
+    return math.ceil(level)
+
+def _window_share(mask, weights, dst=None):
+    """Fração (0–255, uint8) da janela ponderada ocupada por `mask` (0/255) em cada pixel."""
+    return cv2.sepFilter2D(mask, -1, weights, weights, dst=dst)
 
 def clean_mask(mask, level=1):
     """
-    Aplica limpeza morfológica simples (abertura + fechamento).
-    level: intensidade (1 = leve, 2 = média, 3 = forte)
+    Limpeza de uma máscara binária pela maioria na janela do nível: fica
+    marcado o pixel com ao menos metade da janela marcada.
+    level: intensidade (1 = leve, 2 = média, 3 = forte; aceita frações)
     """
-    k = 2 * level + 1
-    kernel = np.ones((k, k), np.uint8)
-    cleaned = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-    cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_CLOSE, kernel)
-    return cleaned
+    weights = cleaning_weights(level)
+    if weights is None:
+        return mask.copy()
+    share = _window_share(cv2.compare(mask, 0, cv2.CMP_NE), weights)
+    cleaned = cv2.compare(share, 128, cv2.CMP_GE)
+    return (cleaned // 255 * mask.max()).astype(mask.dtype)
 
-def apply_postprocessing(seg_map, level=1):
+@traced("apply_postprocessing")
+def apply_postprocessing(seg_map, level=1, out=None, work=None):
     """
-    Limpa o mapa de segmentação classe por classe.
+    Limpa o mapa de segmentação numa passada: filtro de maioria (moda) na
+    janela do nível. Cada pixel fica com a classe de maior peso na janela;
+    em empate vale a prioridade planta > palha > solo.
+    O peso de cada classe sai de um filtro separável em uint8 (a fração da
+    janela em 1/255, ponto fixo do OpenCV): o custo não depende do nível
+    além do comprimento da janela. Nos níveis inteiros até 7 (janela de 15x15)
+    a contagem é exata; nos fracionários, diferenças de peso abaixo de 1/255
+    da janela contam como empate.
+    out: mapa de saída (não pode ser o próprio seg_map); work: três buffers
+    uint8 do mesmo tamanho para os pesos de solo, palha e planta.
     """
-    result = np.zeros_like(seg_map, dtype=np.uint8)
-    for cls in [0, 1, 2]:  # solo, palha, planta
-        mask = (seg_map == cls).astype(np.uint8)
-        cleaned = clean_mask(mask, level)
-        result[cleaned == 1] = cls
+    weights = cleaning_weights(level)
+    if weights is None:
+        if out is None:
+            return seg_map.copy()
+        np.copyto(out, seg_map)
+        return out
+    result = np.empty_like(seg_map, dtype=np.uint8) if out is None else out
+    soil, straw, plant = (np.empty_like(result) for _ in range(3)) if work is None else work
+    for cls, share in ((0, soil), (1, straw), (2, plant)):
+        cv2.compare(seg_map, cls, cv2.CMP_EQ, dst=result)
+        _window_share(result, weights, dst=share)
+    # Palha onde pesa ao menos o solo (1), senão solo (0)
+    cv2.compare(straw, soil, cv2.CMP_GE, dst=result)
+    cv2.bitwise_and(result, 1, dst=result)
+    # Planta onde pesa ao menos a palha e o solo (2), por cima
+    cv2.compare(plant, straw, cv2.CMP_GE, dst=straw)
+    cv2.compare(plant, soil, cv2.CMP_GE, dst=soil)
+    cv2.bitwise_and(soil, straw, dst=soil)
+    cv2.bitwise_and(soil, 2, dst=soil)
+    cv2.max(result, soil, dst=result)
     return result
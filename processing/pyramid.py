@@ -0,0 +1,42 @@
+import cv2
+
+# Tamanho da área de exibição do CanvasView (largura, altura)
+DISPLAY_SIZE = (600, 400)
+
+
+def build_pyramid(img, min_size=DISPLAY_SIZE, arena=None, name="pyramid"):
+    """
+    Monta a pirâmide da imagem (nível 0 = resolução original), reduzindo pela
+    metade a cada nível enquanto o próximo nível ainda cobrir min_size.
+    arena: processing.arena.BufferArena opcional; os níveis reduzidos são
+    escritos nos buffers <name>1, <name>2, ... dela em vez de alocados.
+    """
+    if img is None or len(img.shape) < 3:
+        raise ValueError("Imagem inválida ou não colorida.")
+    levels = [img]
+    min_w, min_h = min_size
+    while True:
+        h, w = levels[-1].shape[:2]
+        if w // 2 < min_w or h // 2 < min_h:
+            break
+        dst = None
+        if arena is not None:
+            dst = arena.get(f"{name}{len(levels)}", (h // 2, w // 2) + img.shape[2:], img.dtype)
+        levels.append(cv2.resize(levels[-1], (w // 2, h // 2), dst=dst, interpolation=cv2.INTER_AREA))
+    return levels
+
+
+def preview_level(levels):
+    """Nível mais reduzido da pirâmide (usado durante o arraste dos sliders)."""
+    return levels[-1]
+
+
+def level_scale(levels, level):
+    """Fator de escala do nível em relação à imagem original (largura)."""
+    return levels[level].shape[1] / levels[0].shape[1]
+
+
+def upsample_labels(seg_map, shape):
+    """Leva um mapa de classes para outra resolução (vizinho mais próximo)."""
+    h, w = shape[:2]
+    return cv2.resize(seg_map, (w, h), interpolation=cv2.INTER_NEAREST)
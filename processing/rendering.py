@@ -0,0 +1,77 @@
+import numpy as np
+import cv2
+from processing.arena import BufferArena
+from utils.tracing import traced
+
+# Paleta BGR por classe (índice = classe)
+PALETTE = np.array([
+    (42, 42, 165),   # 0: marrom (solo)
+    (0, 255, 255),   # 1: amarelo (palha)
+    (0, 200, 0),     # 2: verde (planta)
+], dtype=np.uint8)
+
+# LUT de 256 entradas no formato do cv2.applyColorMap (classes fora da paleta → preto)
+_PALETTE_LUT = np.zeros((256, 1, 3), dtype=np.uint8)
+_PALETTE_LUT[:len(PALETTE), 0] = PALETTE
+
+OVERLAY_ALPHA = 0.4
+
+
+@traced("render_class_map")
+def render_class_map(seg_map, out=None):
+    """Mapa de classes colorido com uma única consulta à paleta (LUT)."""
+    seg_map = np.ascontiguousarray(seg_map, dtype=np.uint8)
+    if out is None:
+        return cv2.applyColorMap(seg_map, _PALETTE_LUT)
+    return cv2.applyColorMap(seg_map, _PALETTE_LUT, dst=out)
+
+
+@traced("render_overlay")
+def render_overlay(img, seg_map, alpha=OVERLAY_ALPHA, out=None, color_buffer=None):
+    """
+    Sobreposição colorida do mapa de classes sobre a imagem, toda em uint8:
+    paleta via LUT e mistura com cv2.addWeighted (ponto fixo, arredondada).
+    Difere da mistura antiga em float32 em no máximo 1 nível por canal.
+    """
+    colors = render_class_map(seg_map, out=color_buffer)
+    if out is None:
+        return cv2.addWeighted(img, 1.0 - alpha, colors, alpha, 0)
+    return cv2.addWeighted(img, 1.0 - alpha, colors, alpha, 0, dst=out)
+
+
+class Renderer:
+    """
+    Renderizador da visualização que reaproveita os buffers de saída entre
+    quadros (um conjunto por tamanho de imagem: prévia e resolução total).
+    O array devolvido é sobrescrito no próximo quadro do mesmo tamanho; com
+    out= o resultado vai para o array do chamador (que fica com ele) e só o
+    rascunho da paleta do overlay vem da arena.
+    pool: processing.parallel.BandPool opcional (paleta e mistura por faixas).
+    """
+    def __init__(self, alpha=OVERLAY_ALPHA, pool=None):
+        self.alpha = alpha
+        self.pool = pool
+        self.arena = BufferArena()
+
+    def _buffer(self, name, shape):
+        return self.arena.get(name, shape + (3,))
+
+    def class_map(self, seg_map, out=None):
+        if out is None:
+            out = self._buffer("map", seg_map.shape)
+        if self.pool is not None:
+            return self.pool.render_class_map(seg_map, out)
+        return render_class_map(seg_map, out=out)
+
+    def overlay(self, img, seg_map, out=None):
+        shape = seg_map.shape
+        colors = self._buffer("map", shape)
+        if out is None:
+            out = self._buffer("overlay", shape)
+        if self.pool is not None:
+            return self.pool.render_overlay(img, seg_map, self.alpha, out, colors)
+        return render_overlay(img, seg_map, self.alpha, out=out, color_buffer=colors)
+
+    def clear(self):
+        """Libera os buffers (ao trocar de imagem)."""
+        self.arena.clear()
@@ -1,60 +1,52 @@
 import numpy as np
-import cv2
-from skimage.filters import threshold_otsu
-from utils.color_utils import rgb_to_lab, rgb_to_ycrcb
-
-def threshold_percentile(img, p=0.5):
-    flat = img.flatten()
-    flat = flat[~np.isnan(flat)]
-    if flat.size == 0:
-        return 0.5
-    return np.percentile(flat, p * 100)
+from processing.session import SegmentationSession, compute_straw_score, compute_veg_score
+from processing.thresholds import otsu_threshold
+from utils.tracing import traced
 
 def initial_plant_mask(indices):
-    exg = indices["ExG"]
-    exgr = indices["ExGR"]
-    cive = indices["CIVE"]
-    ndi = indices["NDI"]
-
-    veg_score = 0.4 * exg + 0.3 * exgr + 0.2 * ndi + 0.1 * (1 - cive)
+    """
+    Máscara de planta (uint8 0/1) a partir dos índices: Otsu exato do score
+    de vegetação (percentil 80 se o Otsu falhar).
+    """
+    veg_score = compute_veg_score(indices)
     try:
-        t = threshold_otsu(veg_score)
-    except:
-        t = threshold_percentile(veg_score, 0.8)
-    mask = veg_score >= t
-    return mask.astype(np.uint8)
+        t = otsu_threshold(veg_score)
+    except Exception:
+        t = np.percentile(veg_score, 80)
+    return (veg_score >= t).astype(np.uint8)
 
 def straw_soil_mask(img, indices, plant_mask):
-    straw = indices["StrawIndex"]
-    lab = rgb_to_lab(img)
-    ycrcb = rgb_to_ycrcb(img)
-
-    L = lab[:, :, 0]
-    Cb = ycrcb[:, :, 2]
-    Cr = ycrcb[:, :, 1]
-
-    straw_score = 0.4 * straw + 0.3 * (Cb / 255.0) - 0.3 * (Cr / 255.0) + 0.3 * (L / 255.0)
+    """
+    Máscaras de palha e solo (uint8 0/1) fora da planta: Otsu exato do score
+    de palha nos pixels sem planta (mediana se o Otsu falhar).
+    """
+    straw_score = compute_straw_score(img, indices["StrawIndex"])
+    nonplant = plant_mask == 0
     try:
-        t = threshold_otsu(straw_score[plant_mask == 0])
-    except:
-        t = threshold_percentile(straw_score[plant_mask == 0], 0.5)
-    mask_straw = (straw_score >= t) & (plant_mask == 0)
-    mask_soil = (straw_score < t) & (plant_mask == 0)
-
+        t = otsu_threshold(straw_score[nonplant])
+    except Exception:
+        t = np.median(straw_score[nonplant]) if nonplant.any() else 0.5
+    mask_straw = (straw_score >= t) & nonplant
+    mask_soil = (straw_score < t) & nonplant
     return mask_straw.astype(np.uint8), mask_soil.astype(np.uint8)
 
-def segment_image(img, indices):
-    plant = initial_plant_mask(indices)
-    straw, soil = straw_soil_mask(img, indices, plant)
-
-    seg_map = np.zeros_like(plant, dtype=np.uint8)
-    seg_map[soil == 1] = 0
-    seg_map[straw == 1] = 1
-    seg_map[plant == 1] = 2
+@traced("segment_image")
+def segment_image(img, indices, session=None):
+    """
+    Segmentação com os parâmetros neutros (sem ajuste dos sliders).
+    Usa o mesmo motor da SegmentationSession do ajuste em tempo real: o
+    limiar de palha sai do histograma conjunto de 512 bins (processing.session),
+    não dos valores exatos, e pode diferir em até um bin (1,3/512) do Otsu de
+    straw_soil_mask. initial_plant_mask e straw_soil_mask seguem recebendo os
+    arrays, para quem monta as máscaras fora da sessão.
+    """
+    if session is None:
+        session = SegmentationSession(img, indices)
+    seg_map = session.classify()
 
     return {
         "seg_map": seg_map,
-        "plant_mask": plant,
-        "straw_mask": straw,
-        "soil_mask": soil
+        "plant_mask": (seg_map == 2).astype(np.uint8),
+        "straw_mask": (seg_map == 1).astype(np.uint8),
+        "soil_mask": (seg_map == 0).astype(np.uint8)
     }
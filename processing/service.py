@@ -0,0 +1,325 @@
+"""
+Serviço local de classificação (usado por server.py).
+
+Os pedidos (bytes de uma imagem ou caminho no disco) entram numa fila
+limitada e um despachante os entrega em lotes a um pool de processos já
+aquecidos (bibliotecas importadas e o pipeline rodado uma vez em cada um):
+
+    HTTP ─→ fila limitada ─→ despachante ─→ lote ─→ processo aquecido
+             (cheia → recusa)   (um lote por processo livre)
+
+Cada processo roda compute_all_indices → limiares → classificação →
+apply_postprocessing → calculate_percentages (SegmentationSession.segment).
+O lote junta só o que já está na fila quando um processo fica livre, e é
+dividido entre os processos livres: com pouca carga cada pedido vai sozinho,
+com fila os pedidos dividem o custo de ida e volta ao processo.
+"""
+import base64
+import collections
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from processing.export import encode_label_map
+from processing.indices import compute_all_indices
+from processing.session import SegmentationSession
+from utils.file_utils import decode_image, load_image
+
+# Pedidos aguardando na fila; acima disso o serviço recusa (HTTP 503)
+QUEUE_SIZE = 32
+# Pedidos por lote enviado a um processo
+BATCH_SIZE = 8
+# Latências guardadas para os percentis
+LATENCY_WINDOW = 1000
+# Janela da vazão recente, em segundos
+THROUGHPUT_WINDOW = 60.0
+
+
+# Situação de cada pedido devolvida pelos processos
+OK, INVALID, FAILED = "ok", "invalido", "falha"
+
+
+class ServiceOverloaded(Exception):
+    """Fila cheia: o pedido foi recusado sem entrar no serviço."""
+
+
+class ServiceError(Exception):
+    """Falha do serviço ao processar um pedido válido (erro inesperado no processo)."""
+
+
+class ServiceUnavailable(ServiceError):
+    """Pool de processos quebrado (processo morto) ou encerrado: nenhum pedido é atendido."""
+
+
+def classify_request(request):
+    """
+    Pipeline completo de um pedido (roda nos processos do pool).
+    request: dict com "imagem" (bytes) ou "caminho", e opcionalmente
+    sens_planta, bias_palha, limpeza, scale e mapa (devolve o mapa de classes
+    em PNG de 2 bits, base64). Devolve o dict da resposta.
+    """
+    start = time.perf_counter()
+    scale = int(request.get("scale", 1))
+    if request.get("imagem") is not None:
+        img = decode_image(request["imagem"], scale)
+    elif request.get("caminho"):
+        img = load_image(request["caminho"], scale)
+    else:
+        raise ValueError("Pedido sem imagem nem caminho.")
+    sens_planta = float(request.get("sens_planta", 0.5))
+    bias_palha = float(request.get("bias_palha", 0.5))
+    limpeza = float(request.get("limpeza", 1))
+    session = SegmentationSession(img, compute_all_indices(img))
+    seg_map, metrics = session.segment(sens_planta, bias_palha, limpeza / scale)
+    result = {**metrics, "largura": img.shape[1], "altura": img.shape[0],
+              "sens_planta": sens_planta, "bias_palha": bias_palha, "limpeza": limpeza}
+    if request.get("mapa"):
+        result["mapa_png"] = base64.b64encode(encode_label_map(seg_map)).decode("ascii")
+    result["processamento_s"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def classify_batch(requests):
+    """
+    Lote de pedidos num processo: (OK, resposta), (INVALID, mensagem) se o
+    pedido for inválido (ValueError: imagem ilegível, parâmetro fora do
+    intervalo) ou (FAILED, mensagem) para qualquer outro erro, por pedido.
+    """
+    results = []
+    for request in requests:
+        try:
+            results.append((OK, classify_request(request)))
+        except ValueError as exc:
+            results.append((INVALID, str(exc)))
+        except Exception as exc:
+            results.append((FAILED, f"{type(exc).__name__}: {exc}"))
+    return results
+
+
+def _warm_worker():
+    """
+    Inicialização de cada processo: o OpenCV sem threads próprias (um processo
+    por núcleo) e uma passada do pipeline numa imagem pequena, para que o
+    primeiro pedido não pague importações, alocadores e tabelas.
+    """
+    cv2.setNumThreads(1)
+    warm = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    classify_request({"imagem": cv2.imencode(".png", warm)[1].tobytes(), "mapa": True})
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+class ServiceStats:
+    """Contadores do serviço (seguros entre threads)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.received = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched = 0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._waits = collections.deque(maxlen=LATENCY_WINDOW)
+        self._finished_at = collections.deque()
+
+    def request(self, accepted):
+        with self._lock:
+            self.received += 1
+            self.rejected += not accepted
+
+    def batch(self, size):
+        with self._lock:
+            self.batches += 1
+            self.batched += size
+
+    def done(self, ok, latency, wait):
+        now = time.time()
+        with self._lock:
+            self.completed += ok
+            self.failed += not ok
+            self._latencies.append(latency)
+            self._waits.append(wait)
+            self._finished_at.append(now)
+            while self._finished_at and self._finished_at[0] < now - THROUGHPUT_WINDOW:
+                self._finished_at.popleft()
+
+    @staticmethod
+    def _percentiles(values):
+        if not values:
+            return {"p50": None, "p95": None, "p99": None, "media": None}
+        ms = np.asarray(values) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        return {"p50": round(p50, 1), "p95": round(p95, 1), "p99": round(p99, 1), "media": round(ms.mean(), 1)}
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.time() - self.started
+            finished = self.completed + self.failed
+            recent = len(self._finished_at)
+            return {
+                "ativo_s": round(uptime, 1),
+                "recebidos": self.received,
+                "recusados": self.rejected,
+                "concluidos": self.completed,
+                "erros": self.failed,
+                "lotes": self.batches,
+                "tamanho_medio_lote": round(self.batched / self.batches, 2) if self.batches else 0.0,
+                "latencia_ms": self._percentiles(self._latencies),
+                "espera_fila_ms": self._percentiles(self._waits),
+                "vazao_req_s": round(finished / uptime, 2) if uptime > 0 else 0.0,
+                "vazao_recente_req_s": round(recent / min(uptime, THROUGHPUT_WINDOW), 2) if uptime > 0 else 0.0,
+            }
+
+
+class _Pending:
+    """Pedido na fila: os dados, o Future da resposta e o instante de chegada."""
+    __slots__ = ("request", "future", "arrived", "dispatched")
+
+    def __init__(self, request):
+        self.request = request
+        self.future = Future()
+        self.arrived = time.perf_counter()
+        self.dispatched = None
+
+
+class ClassificationService:
+    """
+    Pool de processos aquecidos com fila limitada e despacho em lotes.
+    submit(pedido) devolve um Future com a resposta (ver classify_request) ou
+    levanta ServiceOverloaded se a fila estiver cheia. O Future falha com
+    ValueError (pedido inválido), ServiceError ou ServiceUnavailable (ver _finish). Use como gerenciador
+    de contexto ou chame close() ao terminar.
+    """
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.batch_size = max(1, batch_size)
+        self.stats = ServiceStats()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._slots = threading.Semaphore(self.workers)
+        self._free = self.workers
+        self._free_lock = threading.Lock()
+        self._closed = False
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # Um pedido por processo ao mesmo tempo: todos sobem (e aquecem) antes do primeiro cliente
+        self.pids = sorted(set(f.result() for f in [self._pool.submit(_worker_pid) for _ in range(self.workers)]))
+        self._dispatcher = threading.Thread(target=self._dispatch, name="service-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @property
+    def queued(self):
+        return self._queue.qsize()
+
+    @property
+    def running(self):
+        with self._free_lock:
+            return self.workers - self._free
+
+    def submit(self, request):
+        if self._closed:
+            raise ServiceOverloaded("Serviço encerrado.")
+        pending = _Pending(request)
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            self.stats.request(accepted=False)
+            raise ServiceOverloaded(f"Fila cheia ({self._queue.maxsize} pedidos).") from None
+        self.stats.request(accepted=True)
+        return pending.future
+
+    def _take_batch(self):
+        """
+        Primeiro pedido da fila (espera por ele) e os que já estiverem nela,
+        divididos entre os processos livres. None quando o serviço fecha e a fila esvazia.
+        """
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self._closed:
+                    return None
+        with self._free_lock:
+            free = self._free
+        size = min(self.batch_size, max(1, math.ceil((1 + self._queue.qsize()) / max(1, free))))
+        batch = [first]
+        while len(batch) < size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self):
+        while True:
+            self._slots.acquire()
+            batch = self._take_batch()
+            if batch is None:
+                self._slots.release()
+                return
+            now = time.perf_counter()
+            for pending in batch:
+                pending.dispatched = now
+            with self._free_lock:
+                self._free -= 1
+            self.stats.batch(len(batch))
+            try:
+                future = self._pool.submit(classify_batch, [p.request for p in batch])
+            except RuntimeError as exc:  # pool encerrado
+                self._finish(batch, None, exc)
+                continue
+            future.add_done_callback(lambda f, batch=batch: self._finish(batch, f))
+
+    def _finish(self, batch, future, error=None):
+        """
+        Entrega as respostas do lote: ValueError para pedido inválido,
+        ServiceError para falha no processo e ServiceUnavailable se o pool
+        caiu (o lote inteiro se perde, sem culpa dos pedidos).
+        """
+        with self._free_lock:
+            self._free += 1
+        self._slots.release()
+        if error is None:
+            error = future.exception()
+        if error is None:
+            results = future.result()
+        else:
+            message = f"Pool de processos indisponível ({type(error).__name__}: {error})."
+            results = [(None, message)] * len(batch)
+        now = time.perf_counter()
+        for pending, (status, value) in zip(batch, results):
+            self.stats.done(status == OK, now - pending.arrived, pending.dispatched - pending.arrived)
+            if status == OK:
+                value["fila_s"] = round(pending.dispatched - pending.arrived, 4)
+                value["latencia_s"] = round(now - pending.arrived, 4)
+                pending.future.set_result(value)
+            elif status == INVALID:
+                pending.future.set_exception(ValueError(value))
+            elif status == FAILED:
+                pending.future.set_exception(ServiceError(value))
+            else:
+                pending.future.set_exception(ServiceUnavailable(value))
+
+    def close(self):
+        """Para de aceitar pedidos, termina os que já entraram e encerra os processos."""
+        if self._closed:
+            return
+        self._closed = True
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True)
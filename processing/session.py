@@ -0,0 +1,308 @@
+import numpy as np
+import cv2
+from processing.indices import compute_all_indices, index_as_float
+from processing.postprocessing import apply_postprocessing
+from processing.thresholds import histogram_otsu, otsu_threshold
+from utils.cache import content_key
+from utils.metrics import calculate_percentages, percentages_from_counts
+from utils.tracing import span
+
+# Faixas fixas dos scores (permitem histogramas com bins estáveis entre imagens)
+VEG_RANGE = (0.0, 1.0)      # 0.4 + 0.3 + 0.2 + 0.1 = 1
+STRAW_RANGE = (-0.3, 1.0)   # 0.4*straw + 0.3*Cb - 0.3*Cr + 0.3*L
+HIST_BINS = 512
+# Linhas por bloco ao montar o histograma conjunto (limita os temporários)
+HIST_CHUNK_ROWS = 256
+# Versão do cálculo dos índices e scores (e do conteúdo das entradas): incrementar invalida o cache em disco
+PIPELINE_VERSION = 2
+# Produtos da sessão que não dependem dos sliders (os que vão para o cache em disco)
+SESSION_PRODUCTS = ("veg_score", "straw_score", "t_veg_base", "joint_hist")
+
+
+def compute_veg_score(indices):
+    """Score de planta: 0.4*ExG + 0.3*ExGR + 0.2*NDI + 0.1*(1 - CIVE)."""
+    score = index_as_float(indices["ExG"]) * np.float32(0.4)
+    tmp = np.multiply(index_as_float(indices["ExGR"]), np.float32(0.3))
+    np.add(score, tmp, out=score)
+    np.multiply(index_as_float(indices["NDI"]), np.float32(0.2), out=tmp)
+    np.add(score, tmp, out=score)
+    np.subtract(1, index_as_float(indices["CIVE"]), out=tmp)
+    np.multiply(tmp, np.float32(0.1), out=tmp)
+    np.add(score, tmp, out=score)
+    return score
+
+
+def compute_straw_score(img, straw_index):
+    """Score de palha x solo: 0.4*Straw + 0.3*Cb - 0.3*Cr + 0.3*L (canais em 0–1)."""
+    with span("cvtColor.YCrCb"):
+        ycrcb = cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb)
+    with span("cvtColor.LAB"):
+        L = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)[:, :, 0]
+
+    score = index_as_float(straw_index) * np.float32(0.4)
+    tmp = np.multiply(ycrcb[:, :, 2], np.float32(0.3 / 255.0))   # Cb
+    np.add(score, tmp, out=score)
+    np.multiply(ycrcb[:, :, 1], np.float32(0.3 / 255.0), out=tmp)  # Cr
+    np.subtract(score, tmp, out=score)
+    np.multiply(L, np.float32(0.3 / 255.0), out=tmp)
+    np.add(score, tmp, out=score)
+    return score
+
+
+def _to_bins(values, value_range, bins=HIST_BINS):
+    lo, hi = value_range
+    idx = (values - np.float32(lo)) * np.float32(bins / (hi - lo))
+    np.clip(idx, 0, bins - 1, out=idx)
+    return idx.astype(np.intp)
+
+
+def joint_histogram(veg_score, straw_score, bins=HIST_BINS, weights=None):
+    """
+    Histograma conjunto (veg x straw) em bins fixos, montado por blocos de linhas.
+    É somável entre blocos/tiles e permite obter o histograma de palha dos
+    pixels não-planta para qualquer limiar de planta sem revisitar os pixels.
+    weights: contagem inteira de cada valor (ex.: pixels por cor de uma paleta).
+    """
+    hist = np.zeros(bins * bins, dtype=np.int64)
+    veg_score = veg_score.reshape(veg_score.shape[0], -1)
+    straw_score = straw_score.reshape(straw_score.shape[0], -1)
+    if weights is not None:
+        weights = weights.reshape(veg_score.shape)
+    for y in range(0, veg_score.shape[0], HIST_CHUNK_ROWS):
+        key = _to_bins(veg_score[y:y + HIST_CHUNK_ROWS], VEG_RANGE, bins) * bins
+        key += _to_bins(straw_score[y:y + HIST_CHUNK_ROWS], STRAW_RANGE, bins)
+        if weights is None:
+            hist += np.bincount(key.ravel(), minlength=bins * bins)
+        else:
+            hist += np.bincount(key.ravel(), weights=weights[y:y + HIST_CHUNK_ROWS].ravel(),
+                                minlength=bins * bins).astype(np.int64)
+    return hist.reshape(bins, bins)
+
+
+def bin_centers(value_range, bins=HIST_BINS):
+    lo, hi = value_range
+    width = (hi - lo) / bins
+    return lo + width * (np.arange(bins) + 0.5)
+
+
+def adjust_veg_threshold(t_veg_base, sens_planta=0.5):
+    # Ajuste do usuário → desloca o limiar de acordo com o slider
+    return float(np.clip(t_veg_base * (1.0 - (sens_planta - 0.5)), 0, 1))
+
+
+def nonplant_straw_histogram(cum_joint, t_veg):
+    """
+    Histograma do straw_score nos pixels não-planta (veg < t_veg), tirado do
+    histograma conjunto acumulado no eixo veg (erro máximo: um bin de veg).
+    """
+    lo, hi = VEG_RANGE
+    bins = cum_joint.shape[0]
+    b = int(round((t_veg - lo) / (hi - lo) * bins))
+    if b <= 0:
+        return np.zeros(cum_joint.shape[1], dtype=np.int64)
+    return cum_joint[min(b, bins) - 1]
+
+
+def straw_threshold_from_histogram(cum_joint, t_veg, bias_palha=0.5):
+    counts = nonplant_straw_histogram(cum_joint, t_veg)
+    t = histogram_otsu(counts, bin_centers(STRAW_RANGE, cum_joint.shape[1]))
+    # Ajuste do usuário → desloca o limiar
+    return float(np.clip(t * (1.0 - (bias_palha - 0.5)), 0, 1))
+
+
+def classify_scores(veg_score, straw_score, t_veg, t_straw, out=None, mask=None):
+    """
+    Mapa de classes a partir dos scores: 0 = solo, 1 = palha, 2 = planta.
+    out (uint8) e mask (bool), do tamanho dos scores, evitam as alocações.
+    """
+    mask = np.greater_equal(straw_score, t_straw, out=mask)
+    if out is None:
+        seg_map = mask.astype(np.uint8)
+    else:
+        seg_map = out
+        np.copyto(seg_map, mask)
+    np.greater_equal(veg_score, t_veg, out=mask)
+    np.copyto(seg_map, 2, where=mask)
+    return seg_map
+
+
+class SegmentationSession:
+    """
+    Sessão de segmentação de uma imagem.
+    Guarda em cache tudo que não depende dos sliders (scores, limiares de Otsu
+    base, histogramas) e só refaz as etapas que dependem do parâmetro alterado:
+
+        veg_score ─┬─ t_veg_base ─┬─ t_veg(sens_planta) ─┐
+        straw_score┴─ joint_hist ─┴─ t_straw(sens_planta, bias_palha) ─┴─ seg_map ─ limpeza ─ métricas
+
+    pool: processing.parallel.BandPool opcional; com ele classificação e
+    limpeza rodam por faixas de linhas em threads (mesmo resultado).
+    arena: processing.arena.BufferArena opcional; com ela classificação,
+    limpeza e contagens escrevem em buffers reaproveitados, e o mapa
+    devolvido por classify/segment é sobrescrito quando os parâmetros mudam.
+    """
+    def __init__(self, img, indices):
+        if img is None or len(img.shape) < 3:
+            raise ValueError("Imagem inválida ou não colorida.")
+        self.img = img
+        self.indices = indices
+        self.shape = img.shape[:2]
+        self.pool = None
+        self.arena = None
+        self._cache = {}
+
+    @classmethod
+    def from_scores(cls, img, veg_score, straw_score, indices=None, **products):
+        """
+        Sessão a partir de scores já calculados (ex.: processing.color_lut.lut_scores)
+        e, opcionalmente, dos demais SESSION_PRODUCTS (ex.: vindos do cache em disco).
+        """
+        session = cls(img, indices)
+        products.update(veg_score=veg_score, straw_score=straw_score)
+        for name, value in products.items():
+            if name not in SESSION_PRODUCTS:
+                raise ValueError(f"Produto de sessão desconhecido: {name}")
+            session._cache[name] = ((), value)
+        return session
+
+    def products(self):
+        """Produtos independentes dos sliders (calcula os que faltarem)."""
+        return {name: getattr(self, name) for name in SESSION_PRODUCTS}
+
+    def _stage(self, name, key, compute):
+        """Devolve o produto da etapa, recalculando só se a chave mudou."""
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with span(f"session.{name}"):
+            value = compute()
+        self._cache[name] = (key, value)
+        return value
+
+    # --- Etapas independentes dos sliders ---
+    def _require_indices(self):
+        # Sessões do cache em disco ou da LUT não têm índices: sem os scores, não há o que recalcular
+        if self.indices is None:
+            raise ValueError("Sessão sem índices: os scores deveriam vir prontos (cache ou LUT).")
+        return self.indices
+
+    @property
+    def veg_score(self):
+        return self._stage("veg_score", (), lambda: compute_veg_score(self._require_indices()))
+
+    @property
+    def straw_score(self):
+        return self._stage("straw_score", (),
+                           lambda: compute_straw_score(self.img, self._require_indices()["StrawIndex"]))
+
+    @property
+    def t_veg_base(self):
+        def compute():
+            veg_score = self.veg_score
+            try:
+                with span("threshold_otsu"):
+                    return otsu_threshold(veg_score)
+            except Exception:
+                return float(np.percentile(veg_score, 80))
+        return self._stage("t_veg_base", (), compute)
+
+    @property
+    def joint_hist(self):
+        """Histograma conjunto acumulado no eixo veg: linha b = pixels com veg no bin < b+1."""
+        return self._stage("joint_hist", (),
+                           lambda: np.cumsum(joint_histogram(self.veg_score, self.straw_score), axis=0))
+
+    # --- Etapas dependentes dos sliders ---
+    def veg_threshold(self, sens_planta=0.5):
+        return self._stage("t_veg", (sens_planta,),
+                           lambda: adjust_veg_threshold(self.t_veg_base, sens_planta))
+
+    def straw_threshold(self, sens_planta=0.5, bias_palha=0.5):
+        return self._stage("t_straw", (sens_planta, bias_palha),
+                           lambda: straw_threshold_from_histogram(
+                               self.joint_hist, self.veg_threshold(sens_planta), bias_palha))
+
+    def thresholds(self, sens_planta=0.5, bias_palha=0.5):
+        return self.veg_threshold(sens_planta), self.straw_threshold(sens_planta, bias_palha)
+
+    def classify(self, sens_planta=0.5, bias_palha=0.5):
+        """Mapa de classes antes da limpeza: 0 = solo, 1 = palha, 2 = planta."""
+        t_veg, t_straw = self.thresholds(sens_planta, bias_palha)
+
+        def compute():
+            veg_score, straw_score = self.veg_score, self.straw_score
+            if self.pool is not None:
+                return self.pool.classify(veg_score, straw_score, t_veg, t_straw,
+                                          out=self._buffer("seg_map"), mask=self._buffer("mask", bool))
+            return classify_scores(veg_score, straw_score, t_veg, t_straw,
+                                   out=self._buffer("seg_map"), mask=self._buffer("mask", bool))
+        return self._stage("seg_map", (t_veg, t_straw), compute)
+
+    def segment(self, sens_planta=0.5, bias_palha=0.5, limpeza=1):
+        """Segmentação completa (classificação + limpeza + métricas)."""
+        t_veg, t_straw = self.thresholds(sens_planta, bias_palha)
+        key = (t_veg, t_straw, round(float(limpeza), 2))
+
+        def compute():
+            seg_map = self.classify(sens_planta, bias_palha)
+            out = self._buffer("seg_map_clean")
+            if self.pool is not None:
+                seg_map_clean, counts = self.pool.postprocess(seg_map, level=limpeza, out=out, arena=self.arena)
+                return seg_map_clean, percentages_from_counts(counts)
+            work = None if self.arena is None else tuple(self._buffer(f"clean_{name}")
+                                                         for name in ("soil", "straw", "plant"))
+            seg_map_clean = apply_postprocessing(seg_map, level=limpeza, out=out, work=work)
+            return seg_map_clean, calculate_percentages(seg_map_clean, mask=self._buffer("mask", bool))
+        return self._stage("segment", key, compute)
+
+    def _buffer(self, name, dtype=np.uint8):
+        """Buffer de trabalho do tamanho da imagem (None sem arena: a etapa aloca)."""
+        if self.arena is None:
+            return None
+        return self.arena.get(name, self.shape, dtype)
+
+
+def cached_session(img, cache, storage="float32", pool=None):
+    """
+    Sessão da imagem usando o cache em disco (utils.cache.ProductCache).
+    Imagem já vista: scores, limiar base e histograma vêm do disco, mapeados
+    em memória, e a sessão vai direto para os limiares.
+    Imagem nova: calcula tudo e grava só esses produtos (os índices servem
+    apenas para chegar aos scores e não vão para o disco).
+    Só os scores são guardados: nos dois casos a sessão devolvida tem
+    session.indices = None e nunca recalcula os índices; quem precisar deles
+    (ex.: para exibi-los) chama compute_all_indices à parte.
+    storage="float16" grava os scores com metade do tamanho; a sessão nova já
+    usa os scores arredondados (e o limiar e o histograma deles), então a
+    imagem classifica igual com ou sem o cache.
+    pool: BandPool opcional (cálculo e segmentação por faixas, ver processing.parallel).
+    """
+    if storage not in ("float32", "float16"):
+        raise ValueError(f"Modo de armazenamento do cache desconhecido: {storage}")
+    key = content_key(img, PIPELINE_VERSION, storage)
+    hit = cache.load(key)
+    if hit is not None:
+        arrays, meta = hit
+        veg_score, straw_score = arrays["veg_score"], arrays["straw_score"]
+        if storage != "float32":
+            veg_score, straw_score = index_as_float(veg_score), index_as_float(straw_score)
+        session = SegmentationSession.from_scores(img, veg_score, straw_score,
+                                                  t_veg_base=meta["t_veg_base"],
+                                                  joint_hist=arrays["joint_hist"])
+        session.pool = pool
+        return session
+
+    if pool is not None:
+        from processing.parallel import parallel_session  # depende deste módulo
+        session = parallel_session(img, pool, storage, keep_indices=False)
+    else:
+        session = SegmentationSession(img, compute_all_indices(img, storage=storage))
+    veg_score, straw_score = session.veg_score, session.straw_score
+    if storage != "float32":
+        veg_score, straw_score = veg_score.astype(storage), straw_score.astype(storage)
+        session = SegmentationSession.from_scores(img, index_as_float(veg_score), index_as_float(straw_score))
+        session.pool = pool
+    session.indices = None
+    arrays = {"veg_score": veg_score, "straw_score": straw_score, "joint_hist": session.joint_hist}
+    cache.store(key, arrays, {"t_veg_base": session.t_veg_base})
+    return session
@@ -0,0 +1,228 @@
+"""
+Segmentação contínua de vídeo ou sequência de imagens.
+
+Os quadros vêm de uma thread leitora por uma fila limitada (contrapressão:
+a leitura espera o processamento, ou descarta os quadros mais antigos numa
+fonte ao vivo). Cada quadro é classificado por consulta numa tabela de
+classes por cor (processing.color_lut): limites de normalização e limiares
+de Otsu só são recalculados a cada `refresh` quadros, a partir do
+histograma de cores do quadro, e suavizados entre as atualizações.
+"""
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from processing.batch import IMAGE_EXTENSIONS, find_images
+from processing.color_lut import colour_keys, palette_colours, score_tables
+from processing.indices import INDEX_NAMES, raw_index_bounds
+from processing.postprocessing import apply_postprocessing
+from processing.session import adjust_veg_threshold, classify_scores, joint_histogram, straw_threshold_from_histogram
+from processing.thresholds import otsu_threshold
+from utils.metrics import calculate_percentages
+
+# Colunas da série temporal
+STREAM_FIELDS = ["quadro", "tempo_s", "planta_%", "palha_%", "solo_%", "t_veg", "t_straw", "processamento_ms"]
+
+_END = object()
+
+
+class FrameReader:
+    """
+    Lê os quadros (índice, tempo em s, imagem BGR) numa thread própria.
+    source: arquivo de vídeo, número da câmera, pasta de imagens ou lista de arquivos.
+    skip: pula `skip` quadros entre dois processados (no vídeo sem decodificá-los).
+    drop: fila cheia descarta o quadro mais antigo em vez de esperar (fonte ao vivo).
+    """
+    def __init__(self, source, skip=0, queue_size=8, drop=False, fps=None):
+        self.source = source
+        self.skip = skip
+        self.drop = drop
+        self.fps = fps
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="frame-reader", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self._stop.set()
+        # Libera a leitora se estiver esperando espaço na fila
+        while self._thread.is_alive():
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                self._thread.join(0.05)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _put(self, item):
+        if self.drop and item is not _END:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        try:
+            for item in self._frames():
+                if self._stop.is_set():
+                    break
+                self._put(item)
+        except Exception as exc:
+            self._put(exc)
+        self._put(_END)
+
+    def _frames(self):
+        step = self.skip + 1
+        if _is_sequence(self.source):
+            paths = self.source if isinstance(self.source, (list, tuple)) else find_images([self.source])
+            fps = self.fps or 1.0
+            for index in range(0, len(paths), step):
+                img = cv2.imread(paths[index])
+                if img is None:
+                    raise ValueError(f"Imagem inválida ou ilegível: {paths[index]}")
+                yield index, index / fps, img
+            return
+
+        capture = cv2.VideoCapture(int(self.source) if str(self.source).isdigit() else self.source)
+        if not capture.isOpened():
+            raise ValueError(f"Não foi possível abrir o vídeo: {self.source}")
+        fps = self.fps or capture.get(cv2.CAP_PROP_FPS) or 30.0
+        try:
+            index = 0
+            while not self._stop.is_set():
+                if index % step == 0:
+                    ok, img = capture.read()
+                    if not ok:
+                        break
+                    yield index, index / fps, img
+                elif not capture.grab():
+                    break
+                index += 1
+        finally:
+            capture.release()
+
+
+def _is_sequence(source):
+    if isinstance(source, (list, tuple)):
+        return True
+    source = str(source)
+    return os.path.isdir(source) or source.lower().endswith(IMAGE_EXTENSIONS)
+
+
+class StreamSegmenter:
+    """
+    Classificação quadro a quadro com limiares reaproveitados entre quadros.
+
+    A cada `refresh` quadros: contagem de pixels por cor (quantizada em `bits`
+    por canal) → limites dos índices e limiares de Otsu no espaço de cores,
+    suavizados por média móvel exponencial (`smoothing` = peso da nova medida),
+    → tabela de classe por cor. Nos demais quadros: uma consulta por pixel na
+    tabela, limpeza e percentuais.
+    """
+    def __init__(self, sens_planta=0.5, bias_palha=0.5, limpeza=1, bits=6, refresh=15, smoothing=0.3):
+        if not 1 <= bits <= 7:
+            raise ValueError(f"Bits por canal fora do intervalo 1–7: {bits}")
+        self.sens_planta = sens_planta
+        self.bias_palha = bias_palha
+        self.limpeza = limpeza
+        self.bits = bits
+        self.refresh = max(1, int(refresh))
+        self.smoothing = smoothing
+        self._colours = palette_colours(np.arange(1 << (3 * bits), dtype=np.uint32), bits)
+        self._bounds = None
+        self._thresholds = None
+        self._class_table = None
+        self._frames = 0
+
+    @property
+    def thresholds(self):
+        """(t_veg, t_straw) em uso (suavizados)."""
+        return self._thresholds
+
+    def _smooth(self, old, new):
+        if old is None:
+            return new
+        return old + self.smoothing * (new - old)
+
+    def _update(self, keys):
+        counts = np.bincount(keys.ravel(), minlength=len(self._colours))
+        present = np.flatnonzero(counts)
+        bounds = raw_index_bounds(self._colours[present])
+        if self._bounds is not None:
+            bounds = {name: tuple(self._smooth(np.array(self._bounds[name]), np.array(bounds[name])))
+                      for name in INDEX_NAMES}
+        self._bounds = bounds
+
+        veg, straw = score_tables(self._colours, bounds)
+        weights = counts[present]
+        t_veg = adjust_veg_threshold(otsu_threshold(veg[present], weights=weights), self.sens_planta)
+        joint = joint_histogram(veg[present], straw[present], weights=weights)
+        t_straw = straw_threshold_from_histogram(np.cumsum(joint, axis=0), t_veg, self.bias_palha)
+        old = self._thresholds
+        self._thresholds = (self._smooth(None if old is None else old[0], t_veg),
+                            self._smooth(None if old is None else old[1], t_straw))
+        self._class_table = classify_scores(veg, straw, *self._thresholds)
+
+    def process(self, frame):
+        """Mapa de classes limpo e percentuais de um quadro BGR."""
+        keys = colour_keys(frame, self.bits)
+        if self._frames % self.refresh == 0:
+            self._update(keys)
+        self._frames += 1
+        seg_map = apply_postprocessing(np.take(self._class_table, keys), level=self.limpeza)
+        return seg_map, calculate_percentages(seg_map)
+
+
+def stream_percentages(source, sens_planta=0.5, bias_palha=0.5, limpeza=1, bits=6, refresh=15,
+                       smoothing=0.3, skip=0, queue_size=8, drop=False, scale=1, fps=None, on_map=None):
+    """
+    Gerador da série temporal: um dicionário (colunas STREAM_FIELDS) por quadro processado.
+    scale: processa em 1/scale da resolução (limpeza ajustada na mesma proporção).
+    on_map(índice, mapa de classes): opcional, para gravar ou exibir os mapas.
+    """
+    segmenter = StreamSegmenter(sens_planta, bias_palha, limpeza / scale, bits, refresh, smoothing)
+    with FrameReader(source, skip, queue_size, drop, fps) as reader:
+        for index, timestamp, frame in reader:
+            start = time.perf_counter()
+            if scale != 1:
+                frame = cv2.resize(frame, (frame.shape[1] // scale, frame.shape[0] // scale),
+                                   interpolation=cv2.INTER_AREA)
+            seg_map, metrics = segmenter.process(frame)
+            if on_map is not None:
+                on_map(index, seg_map)
+            t_veg, t_straw = segmenter.thresholds
+            yield {"quadro": index, "tempo_s": round(timestamp, 3), **metrics,
+                   "t_veg": round(t_veg, 4), "t_straw": round(t_straw, 4),
+                   "processamento_ms": round((time.perf_counter() - start) * 1000, 1),
+                   "descartados": reader.dropped}
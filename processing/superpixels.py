@@ -0,0 +1,318 @@
+"""
+Classificação por superpixels.
+
+A imagem é sobressegmentada uma vez (SLIC) e os scores são agregados por
+região: um histograma conjunto veg x straw grosso (REGION_BINS²) acumulado,
+junto com a área e o grafo de adjacência. Ao mover os sliders só as k
+regiões (alguns milhares) são reclassificadas e limpas: as contagens de
+planta/palha/solo de cada região saem de quatro consultas no acumulado, e a
+região fica com a classe da maioria dos seus pixels somados aos votos das
+vizinhas pela fronteira (a limpeza, ver clean_regions). Os percentuais saem das
+áreas das regiões e o mapa de classes de uma única consulta (np.take) na
+imagem de rótulos.
+
+O SLIC do scikit-image é usado se estiver instalado; senão, uma versão em
+NumPy (k-médias local em Lab + posição). Nos dois casos a sobressegmentação
+roda numa cópia reduzida (lado máximo SLIC_MAX_SIDE): o mapa de classes é
+montado nessa resolução e ampliado por vizinho mais próximo, o mesmo que
+consultar a imagem de rótulos ampliada, com uma fração do custo.
+"""
+import copy
+import math
+
+import cv2
+import numpy as np
+
+from processing.session import STRAW_RANGE, VEG_RANGE
+from utils.metrics import N_CLASSES, percentages_from_counts
+from utils.tracing import span, traced
+
+# Número padrão de superpixels e peso da distância espacial no SLIC
+SUPERPIXELS = 4000
+COMPACTNESS = 10.0
+SLIC_ITERATIONS = 5
+# Lado máximo da cópia reduzida sobressegmentada
+SLIC_MAX_SIDE = 1600
+SLIC_METHODS = ("auto", "skimage", "numpy")
+# Bins por eixo do histograma conjunto de cada região (contagens interpoladas dentro do bin)
+REGION_BINS = 32
+# Linhas por bloco ao montar os histogramas das regiões (limita os temporários)
+REGION_CHUNK_ROWS = 512
+
+
+def _slic_skimage(img, n_segments, compactness):
+    from skimage.segmentation import slic
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return slic(rgb, n_segments=n_segments, compactness=compactness, start_label=0, channel_axis=-1)
+
+
+def _cluster_means(features, labels, k):
+    """Média de cada canal de `features` (h, w, c) por rótulo; rótulos vazios → NaN."""
+    flat = labels.ravel()
+    count = np.bincount(flat, minlength=k).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.stack([np.bincount(flat, weights=features[:, :, c].ravel(), minlength=k) / count
+                         for c in range(features.shape[2])], axis=1).astype(np.float32)
+
+
+def _slic_numpy(img, n_segments, compactness, iterations=SLIC_ITERATIONS):
+    """
+    SLIC simplificado: centros numa grade regular; a cada iteração cada pixel
+    vai para o centro mais próximo entre os das 3x3 células vizinhas
+    (distância Lab + (compactness/passo)² * distância espacial) e os centros
+    são recalculados como médias. Processado por faixa de células: o centro
+    candidato de cada coluna vale para todas as linhas da faixa.
+    """
+    h, w = img.shape[:2]
+    lab = cv2.cvtColor(img.astype(np.float32) * np.float32(1.0 / 255.0), cv2.COLOR_BGR2Lab)
+    step = max(1.0, math.sqrt(h * w / n_segments))
+    gy, gx = max(1, round(h / step)), max(1, round(w / step))
+    cell_y = (np.arange(h) * gy // h).astype(np.intp)
+    cell_x = (np.arange(w) * gx // w).astype(np.intp)
+    labels = (cell_y[:, None] * gx + cell_x[None, :]).astype(np.int32)
+    ys = np.arange(h, dtype=np.float32)
+    xs = np.arange(w, dtype=np.float32)
+    spatial = np.float32((compactness / step) ** 2)
+    features = np.dstack([lab, np.broadcast_to(ys[:, None], (h, w)), np.broadcast_to(xs[None, :], (h, w))])
+    planes = [np.ascontiguousarray(lab[:, :, c]) for c in range(3)]
+    band_start = np.searchsorted(cell_y, np.arange(gy + 1))
+    offsets = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+    for _ in range(iterations):
+        # Centros numa grade com borda vazia (distância infinita fora da imagem)
+        grid = np.full((gy + 2, gx + 2, 5), np.inf, dtype=np.float32)
+        grid[1:-1, 1:-1] = _cluster_means(features, labels, gy * gx).reshape(gy, gx, 5)
+        for j in range(gy):
+            rows = slice(band_start[j], band_start[j + 1])
+            band = [p[rows] for p in planes]
+            dist = np.empty((len(offsets), rows.stop - rows.start, w), dtype=np.float32)
+            for n, (dy, dx) in enumerate(offsets):
+                centre = grid[j + 1 + dy][cell_x + 1 + dx]   # (w, 5): L, a, b, y, x
+                d = dist[n]
+                with np.errstate(invalid="ignore"):
+                    np.subtract(band[0], centre[:, 0], out=d)
+                    np.square(d, out=d)
+                    for c in (1, 2):
+                        d += np.square(band[c] - centre[:, c])
+                    d += spatial * np.square(ys[rows, None] - centre[:, 3])
+                    d += spatial * np.square(xs - centre[:, 4])
+            # Centros vazios (NaN) nunca são escolhidos
+            np.nan_to_num(dist, copy=False, nan=np.inf)
+            best = np.argmin(dist, axis=0)
+            labels[rows] = (j + best // 3 - 1) * gx + cell_x[None, :] + best % 3 - 1
+    return labels
+
+
+@traced("oversegment")
+def oversegment(img, n_segments=SUPERPIXELS, compactness=COMPACTNESS, method="auto", max_side=SLIC_MAX_SIDE):
+    """
+    Imagem de rótulos (int32, 0..k-1 consecutivos) com cerca de n_segments
+    superpixels, na resolução de trabalho (lado máximo max_side; amplie com
+    cv2.resize INTER_NEAREST). method: "skimage", "numpy" ou "auto"
+    (scikit-image se instalado). Devolve (rótulos, k).
+    """
+    if img is None or len(img.shape) < 3:
+        raise ValueError("Imagem inválida ou não colorida.")
+    if method not in SLIC_METHODS:
+        raise ValueError(f"Método de superpixels desconhecido: {method}")
+    if method == "auto":
+        try:
+            import skimage.segmentation  # noqa: F401
+            method = "skimage"
+        except ImportError:
+            method = "numpy"
+
+    h, w = img.shape[:2]
+    factor = min(1.0, max_side / max(h, w))
+    small = img if factor == 1.0 else cv2.resize(img, (max(1, round(w * factor)), max(1, round(h * factor))),
+                                                 interpolation=cv2.INTER_AREA)
+    if method == "skimage":
+        labels = _slic_skimage(small, n_segments, compactness)
+    else:
+        labels = _slic_numpy(small, n_segments, compactness)
+
+    # Rótulos consecutivos (o SLIC pode deixar ids sem pixels)
+    present = np.bincount(labels.ravel()) > 0
+    remap = np.cumsum(present, dtype=np.int32) - 1
+    return remap[labels], int(present.sum())
+
+
+def region_adjacency(labels, k):
+    """
+    Pares de regiões vizinhas (a < b) e o comprimento da fronteira comum em
+    pixels, a partir das vizinhanças horizontais e verticais.
+    """
+    codes = []
+    for a, b in ((labels[:, :-1], labels[:, 1:]), (labels[:-1], labels[1:])):
+        differ = a != b
+        lo = np.minimum(a[differ], b[differ]).astype(np.int64)
+        hi = np.maximum(a[differ], b[differ]).astype(np.int64)
+        codes.append(lo * k + hi)
+    codes, border = np.unique(np.concatenate(codes), return_counts=True)
+    return np.stack([codes // k, codes % k], axis=1), border
+
+
+def _bin_index(values, value_range, bins):
+    lo, hi = value_range
+    idx = (values - np.float32(lo)) * np.float32(bins / (hi - lo))
+    np.clip(idx, 0, bins - 1, out=idx)
+    return idx.astype(np.intp)
+
+
+def region_histograms(labels, veg_score, straw_score, k, bins=REGION_BINS):
+    """
+    Histograma conjunto veg x straw de cada região, acumulado nos dois eixos
+    com uma borda de zeros: C[r, i, j] = pixels da região r com veg no bin < i
+    e straw no bin < j. Devolve um array (k, bins + 1, bins + 1) float32.
+    """
+    size = k * bins * bins
+    counts = np.zeros(size, dtype=np.int64)
+    for y in range(0, labels.shape[0], REGION_CHUNK_ROWS):
+        rows = slice(y, y + REGION_CHUNK_ROWS)
+        key = labels[rows].astype(np.intp) * (bins * bins)
+        key += _bin_index(veg_score[rows], VEG_RANGE, bins) * bins
+        key += _bin_index(straw_score[rows], STRAW_RANGE, bins)
+        counts += np.bincount(key.ravel(), minlength=size)
+    cum = np.zeros((k, bins + 1, bins + 1), dtype=np.float32)
+    cum[:, 1:, 1:] = counts.reshape(k, bins, bins).cumsum(axis=1).cumsum(axis=2)
+    return cum
+
+
+def _edge_position(value, value_range, bins):
+    """Posição contínua do limiar nas bordas dos bins: (índice, fração)."""
+    lo, hi = value_range
+    pos = min(max((value - lo) / (hi - lo) * bins, 0.0), float(bins))
+    index = min(int(pos), bins - 1)
+    return index, pos - index
+
+
+def region_class_counts(cum, t_veg, t_straw):
+    """
+    Contagens (k, 3) de solo, palha e planta em cada região para os limiares,
+    interpoladas dentro dos bins (distribuição uniforme no bin).
+    """
+    bins = cum.shape[1] - 1
+    i, fi = _edge_position(t_veg, VEG_RANGE, bins)
+    j, fj = _edge_position(t_straw, STRAW_RANGE, bins)
+    # Não-planta (veg < t_veg): linha i interpolada com a i + 1
+    rows = cum[:, i] + fi * (cum[:, i + 1] - cum[:, i])
+    nonplant = rows[:, -1]
+    solo = rows[:, j] + fj * (rows[:, j + 1] - rows[:, j])
+    return np.stack([solo, nonplant - solo, cum[:, -1, -1] - nonplant], axis=1)
+
+
+def clean_regions(counts, pairs, border, area, level=1):
+    """
+    Classe de cada região (0 = solo, 1 = palha, 2 = planta) com a limpeza no
+    grafo de regiões, na escala do filtro de maioria por pixels: a janela de
+    raio `level` dos pixels da região alcança `level` pixels além de cada
+    fronteira, então cada vizinha vota com a sua composição (contagens por
+    classe / área) vezes fronteira x level, somada às contagens da própria
+    região; fica a classe com mais votos. Sem limpeza (level <= 0), a classe
+    da maioria dos pixels da região.
+    """
+    classes = np.argmax(counts, axis=1).astype(np.uint8)
+    if level <= 0 or len(pairs) == 0:
+        return classes
+    a, b = pairs[:, 0], pairs[:, 1]
+    k = len(counts)
+    share = counts / np.maximum(area, 1)[:, None]
+    reach = border * float(level)
+    votes = np.array(counts, dtype=np.float64)
+    for c in range(N_CLASSES):
+        votes[:, c] += np.bincount(a, weights=reach * share[b, c], minlength=k)
+        votes[:, c] += np.bincount(b, weights=reach * share[a, c], minlength=k)
+    return np.argmax(votes, axis=1).astype(np.uint8)
+
+
+class SuperpixelSession:
+    """
+    Segmentação por superpixels sobre uma SegmentationSession (`pixels`),
+    de onde vêm os limiares (histogramas dos pixels). Cada região recebe a
+    classe da maioria dos seus pixels e dos votos das vizinhas. Mesma interface de
+    segment(sens_planta, bias_palha, limpeza) → (mapa de classes, métricas).
+    labels: rótulos das regiões, na resolução da imagem ou reduzidos (oversegment).
+    arena: processing.arena.BufferArena opcional para o mapa devolvido por
+    segment (sobrescrito quando os parâmetros mudam), como na SegmentationSession.
+    """
+    def __init__(self, pixels, labels, n_regions=None):
+        self.pixels = pixels
+        self.img = pixels.img
+        self.labels = labels
+        self.shape = pixels.shape
+        self.arena = None
+        k = n_regions or int(labels.max()) + 1
+        # Estatísticas e fronteiras sempre sobre os pixels em resolução total
+        full = labels if labels.shape == self.shape else self._resize(labels, self.shape)
+        flat = full.ravel()
+        with span("superpixel.stats"):
+            self.area = np.bincount(flat, minlength=k)
+            self.hist = region_histograms(full, pixels.veg_score, pixels.straw_score, k)
+            self.pairs, self.border = region_adjacency(full, k)
+        self._cache = {}
+
+    @classmethod
+    def build(cls, pixels, n_segments=SUPERPIXELS, compactness=COMPACTNESS, method="auto"):
+        """Sobressegmenta a imagem da sessão e agrega os scores por região."""
+        labels, k = oversegment(pixels.img, n_segments, compactness, method)
+        return cls(pixels, labels, k)
+
+    @staticmethod
+    def _resize(arr, shape):
+        return cv2.resize(arr, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+
+    @property
+    def n_regions(self):
+        return len(self.area)
+
+    def view(self, shape):
+        """
+        A mesma segmentação entregue em outro tamanho (ex.: a prévia). Regiões,
+        áreas, percentuais e limpeza continuam os da resolução total.
+        """
+        other = copy.copy(self)
+        other.shape = tuple(shape[:2])
+        other.arena = None
+        other._cache = {}
+        return other
+
+    def thresholds(self, sens_planta=0.5, bias_palha=0.5):
+        return self.pixels.thresholds(sens_planta, bias_palha)
+
+    def region_classes(self, sens_planta=0.5, bias_palha=0.5, limpeza=1):
+        """Classe de cada região (0 = solo, 1 = palha, 2 = planta), já limpa."""
+        t_veg, t_straw = self.thresholds(sens_planta, bias_palha)
+        key = (t_veg, t_straw, round(float(limpeza), 2))
+        cached = self._cache.get("classes")
+        if cached is None or cached[0] != key:
+            counts = region_class_counts(self.hist, t_veg, t_straw)
+            cached = (key, clean_regions(counts, self.pairs, self.border, self.area, limpeza))
+            self._cache["classes"] = cached
+        return cached[1]
+
+    def percentages(self, sens_planta=0.5, bias_palha=0.5, limpeza=1):
+        """Percentuais pelas áreas das regiões (sem passar pelos pixels)."""
+        classes = self.region_classes(sens_planta, bias_palha, limpeza)
+        return percentages_from_counts(np.bincount(classes, weights=self.area, minlength=N_CLASSES))
+
+    def segment(self, sens_planta=0.5, bias_palha=0.5, limpeza=1):
+        """Mapa de classes (uma consulta na tabela das regiões por rótulo) e percentuais."""
+        classes = self.region_classes(sens_planta, bias_palha, limpeza)
+        cached = self._cache.get("segment")
+        if cached is None or cached[0] is not classes:
+            with span("superpixel.gather"):
+                seg_map = self._gather(classes)
+            cached = (classes, seg_map, self.percentages(sens_planta, bias_palha, limpeza))
+            self._cache["segment"] = cached
+        return cached[1], cached[2]
+
+    def _gather(self, classes):
+        """Classe de cada pixel: consulta nos rótulos reduzidos e ampliação (nos buffers da arena, se houver)."""
+        if self.arena is None:
+            seg_map = np.take(classes, self.labels)
+            return seg_map if seg_map.shape == self.shape else self._resize(seg_map, self.shape)
+        small = np.take(classes, self.labels, out=self.arena.get("superpixel_small", self.labels.shape), mode="clip")
+        if small.shape == self.shape:
+            return small
+        out = self.arena.get("superpixel_map", self.shape)
+        return cv2.resize(small, (self.shape[1], self.shape[0]), dst=out, interpolation=cv2.INTER_NEAREST)
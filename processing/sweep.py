@@ -0,0 +1,104 @@
+"""
+Varredura dos sliders sem reclassificar pixels.
+
+Antes da limpeza, os percentuais dependem só de onde os limiares caem nas
+distribuições dos scores: planta = pixels com veg >= t_veg; palha = pixels
+não-planta com straw >= t_straw. Com o histograma conjunto acumulado no eixo
+veg (SegmentationSession.joint_hist), a superfície planta/palha/solo de uma
+grade inteira de (sens_planta, bias_palha) sai de operações sobre os bins:
+
+    t_veg(sens)          → linha interpolada do acumulado = histograma de straw dos não-planta
+    Otsu de cada linha   → t_straw(sens, bias) (o mesmo da sessão)
+    acumulado em straw   → palha acima de t_straw, interpolada dentro do bin
+
+O erro em relação ao mapa de classes vem só da posição do limiar dentro do
+bin (a distribuição é tomada como uniforme no bin). A limpeza não entra.
+"""
+import numpy as np
+
+from processing.session import STRAW_RANGE, VEG_RANGE, adjust_veg_threshold, bin_centers
+from processing.thresholds import histogram_otsu_rows
+
+# Grade padrão: a faixa dos sliders da interface
+SENS_GRID = np.linspace(0.0, 1.0, 41)
+BIAS_GRID = np.linspace(0.0, 1.5, 61)
+# Colunas da superfície exportada (uma linha por ponto da grade)
+SWEEP_FIELDS = ["sens_planta", "bias_palha", "t_veg", "t_straw", "planta_%", "palha_%", "solo_%"]
+
+
+def _edge_cumulative(counts, axis):
+    """Acumulado nas bordas dos bins: posição k = soma dos bins < k (k = 0..bins)."""
+    shape = list(counts.shape)
+    shape[axis] = 1
+    return np.concatenate([np.zeros(shape), np.cumsum(counts, axis=axis, dtype=np.float64)], axis=axis)
+
+
+def _edge_position(values, value_range, bins):
+    """Posição contínua dos valores em bins (0..bins), separada em índice e fração."""
+    lo, hi = value_range
+    pos = np.clip((np.asarray(values, dtype=np.float64) - lo) / (hi - lo) * bins, 0, bins)
+    index = np.minimum(pos.astype(np.intp), bins - 1)
+    return index, pos - index
+
+
+def sweep_percentages(cum_joint, t_veg_base, sens_values=SENS_GRID, bias_values=BIAS_GRID):
+    """
+    Superfície dos percentuais antes da limpeza para a grade sens_values x bias_values.
+    cum_joint: histograma conjunto acumulado no eixo veg (SegmentationSession.joint_hist).
+    Devolve um dicionário com os eixos, t_veg (S,) e t_straw, planta_%, palha_%,
+    solo_% como arrays (S, B).
+    """
+    sens_values = np.atleast_1d(np.asarray(sens_values, dtype=np.float64))
+    bias_values = np.atleast_1d(np.asarray(bias_values, dtype=np.float64))
+    veg_bins, straw_bins = cum_joint.shape
+    total = float(cum_joint[-1].sum())
+    if total == 0:
+        raise ValueError("Histograma conjunto vazio.")
+
+    t_veg = np.array([adjust_veg_threshold(t_veg_base, s) for s in sens_values])
+
+    # Limiar de palha: Otsu das mesmas linhas do acumulado usadas pela sessão
+    rows = np.rint((t_veg - VEG_RANGE[0]) / (VEG_RANGE[1] - VEG_RANGE[0]) * veg_bins).astype(np.intp)
+    hists = np.where(rows[:, None] > 0, cum_joint[np.clip(rows, 1, veg_bins) - 1], 0)
+    t_straw_base = histogram_otsu_rows(hists, bin_centers(STRAW_RANGE, straw_bins))
+    t_straw = np.clip(t_straw_base[:, None] * (1.0 - (bias_values[None, :] - 0.5)), 0, 1)
+
+    # Não-planta: linha do acumulado interpolada na posição exata de t_veg
+    edges = np.concatenate([np.zeros((1, straw_bins)), cum_joint.astype(np.float64)])
+    k, frac = _edge_position(t_veg, VEG_RANGE, veg_bins)
+    nonplant = edges[k] + frac[:, None] * (edges[k + 1] - edges[k])
+
+    # Palha: não-planta com straw >= t_straw
+    straw_edges = _edge_cumulative(nonplant, axis=1)
+    j, frac = _edge_position(t_straw, STRAW_RANGE, straw_bins)
+    below = np.take_along_axis(straw_edges, j, axis=1)
+    below += frac * (np.take_along_axis(straw_edges, j + 1, axis=1) - below)
+    nonplant_total = straw_edges[:, -1:]
+
+    planta = np.broadcast_to((total - nonplant_total) * (100.0 / total), t_straw.shape)
+    palha = (nonplant_total - below) * (100.0 / total)
+    return {"sens_planta": sens_values, "bias_palha": bias_values, "t_veg": t_veg, "t_straw": t_straw,
+            "planta_%": planta, "palha_%": palha, "solo_%": 100.0 - planta - palha}
+
+
+def session_sweep(session, sens_values=SENS_GRID, bias_values=BIAS_GRID):
+    """Superfície dos percentuais de uma SegmentationSession (ver sweep_percentages)."""
+    return sweep_percentages(session.joint_hist, session.t_veg_base, sens_values, bias_values)
+
+
+def estimate_percentages(cum_joint, t_veg_base, sens_planta=0.5, bias_palha=0.5):
+    """Percentuais estimados (antes da limpeza) de um ponto, no formato de calculate_percentages."""
+    surface = sweep_percentages(cum_joint, t_veg_base, sens_planta, bias_palha)
+    return {key: round(float(surface[key][0, 0]), 2) for key in ("planta_%", "palha_%", "solo_%")}
+
+
+def sweep_rows(surface):
+    """Linhas (colunas SWEEP_FIELDS) da superfície, para CSV/JSON Lines."""
+    rows = []
+    for i, sens in enumerate(surface["sens_planta"]):
+        for j, bias in enumerate(surface["bias_palha"]):
+            rows.append({"sens_planta": round(float(sens), 4), "bias_palha": round(float(bias), 4),
+                         "t_veg": round(float(surface["t_veg"][i]), 4),
+                         "t_straw": round(float(surface["t_straw"][i, j]), 4),
+                         **{key: round(float(surface[key][i, j]), 2) for key in ("planta_%", "palha_%", "solo_%")}})
+    return rows
@@ -0,0 +1,96 @@
+"""
+Limiares por histograma em NumPy puro (Otsu e percentil).
+
+otsu_threshold reproduz o threshold_otsu do scikit-image (mesmos 256 bins
+sobre [mín, máx], mesma fórmula e mesma precisão), sem o custo de importar
+o scikit-image, que passa a ser opcional.
+"""
+import numpy as np
+
+
+def otsu_from_histogram(counts, centers):
+    """
+    Otsu sobre um histograma (contagens e centros dos bins). Bins vazios nas
+    pontas são ignorados. Lança ValueError se restar menos de dois bins.
+    """
+    nonzero = np.flatnonzero(counts)
+    if nonzero.size == 0:
+        raise ValueError("Histograma vazio.")
+    lo, hi = nonzero[0], nonzero[-1] + 1
+    counts = np.asarray(counts[lo:hi], dtype=np.float32)
+    centers = np.asarray(centers[lo:hi])
+    if counts.size < 2:
+        raise ValueError("Histograma com um único valor.")
+
+    # Pesos e médias das duas classes para cada limiar possível
+    weight1 = np.cumsum(counts)
+    weight2 = np.cumsum(counts[::-1])[::-1]
+    mean1 = np.cumsum(counts * centers) / weight1
+    mean2 = (np.cumsum((counts * centers)[::-1]) / weight2[::-1])[::-1]
+    variance12 = weight1[:-1] * weight2[1:] * (mean1[:-1] - mean2[1:]) ** 2
+    return float(centers[np.argmax(variance12)])
+
+
+def otsu_threshold(values, nbins=256, weights=None):
+    """
+    Limiar de Otsu de um array (histograma de nbins bins entre o mínimo e o máximo).
+    weights: quantas vezes cada valor aparece (ex.: pixels por cor de uma paleta).
+    """
+    values = np.asarray(values).reshape(-1)
+    lo, hi = values.min(), values.max()
+    if lo == hi:
+        return float(lo)
+    return otsu_from_histogram(*value_histogram(values, lo, hi, nbins, weights))
+
+
+def value_histogram(values, lo, hi, nbins=256, weights=None):
+    """
+    Contagens e centros de nbins bins entre lo e hi. Com os mesmos lo/hi as
+    contagens de partes da imagem somam exatamente as da imagem inteira.
+    """
+    values = np.asarray(values).reshape(-1)
+    if weights is not None:
+        weights = np.asarray(weights).reshape(-1)
+    counts, edges = np.histogram(values, bins=nbins, range=(lo, hi), weights=weights)
+    return counts, (edges[:-1] + edges[1:]) / 2.0
+
+
+def histogram_percentile(counts, centers, q):
+    """Percentil (0–100) aproximado a partir de um histograma."""
+    total = counts.sum()
+    if total == 0:
+        return float(centers[len(centers) // 2])
+    cum = np.cumsum(counts)
+    return float(centers[np.searchsorted(cum, total * q / 100.0)])
+
+
+def histogram_otsu(counts, centers, fallback_q=50):
+    """Otsu sobre um histograma já montado; percentil fallback_q se não houver dois modos."""
+    try:
+        return otsu_from_histogram(counts, centers)
+    except ValueError:
+        return histogram_percentile(counts, centers, fallback_q)
+
+
+def histogram_otsu_rows(counts, centers, fallback_q=50):
+    """
+    histogram_otsu para cada linha de um array (linhas, bins) numa passada só.
+    Bins vazios nas pontas ficam fora da busca (mesmo resultado do corte em
+    otsu_from_histogram); linhas sem dois bins ocupados caem no percentil.
+    """
+    raw = np.asarray(counts)
+    counts = raw.astype(np.float32)
+    centers = np.asarray(centers)
+    weight1 = np.cumsum(counts, axis=1)
+    weight2 = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    moment = counts * centers
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean1 = np.cumsum(moment, axis=1) / weight1
+        mean2 = (np.cumsum(moment[:, ::-1], axis=1) / weight2[:, ::-1])[:, ::-1]
+        variance12 = weight1[:, :-1] * weight2[:, 1:] * (mean1[:, :-1] - mean2[:, 1:]) ** 2
+    valid = (weight1[:, :-1] > 0) & (weight2[:, 1:] > 0)
+    variance12[~valid] = -1
+    thresholds = centers[np.argmax(variance12, axis=1)].astype(np.float64)
+    for row in np.flatnonzero(~valid.any(axis=1)):
+        thresholds[row] = histogram_percentile(raw[row], centers, fallback_q)
+    return thresholds
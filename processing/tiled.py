@@ -0,0 +1,203 @@
+import collections
+import math
+import os
+
+import numpy as np
+
+from processing.indices import compute_all_indices, raw_index_bounds, merge_index_bounds
+from processing.postprocessing import apply_postprocessing, cleaning_halo
+from processing.session import (
+    HIST_BINS, VEG_RANGE, adjust_veg_threshold, bin_centers, classify_scores,
+    compute_straw_score, compute_veg_score, joint_histogram, straw_threshold_from_histogram,
+)
+from processing.thresholds import histogram_otsu
+from utils.metrics import CoverageAccumulator
+
+# Orçamento padrão de memória de trabalho por tile
+DEFAULT_MEMORY_BUDGET = 512 * 1024 ** 2
+# Bytes de trabalho por pixel do tile: canais float32 (12) + rascunhos (8) +
+# 5 índices float32 (20) + scores (8) + YCrCb/L (4) + máscaras e mapas (~12)
+BYTES_PER_PIXEL = 64
+MIN_TILE = 64
+
+
+# Formatos lidos por regiões, sem carregar a imagem inteira
+TILED_EXTENSIONS = (".npy", ".tif", ".tiff")
+
+
+class TiffWindows:
+    """
+    TIFF lido por regiões (tifffile): src[linhas, colunas] decodifica só os
+    tiles ou faixas do arquivo que cruzam a região e devolve BGR uint8, como
+    o cv2.imread. TIFF sem compressão é mapeado em memória. Os últimos
+    segmentos decodificados ficam guardados (as margens dos tiles vizinhos
+    releem os mesmos); o pico de memória fica na região pedida mais alguns
+    segmentos, então um TIFF de faixa única é lido inteiro na primeira região.
+    """
+    def __init__(self, path):
+        try:
+            import tifffile
+        except ImportError:
+            raise ValueError("Ler TIFF por tiles requer o pacote tifffile (pip install tifffile).") from None
+        self._tif = tifffile.TiffFile(path)
+        page = self._tif.pages[0]
+        if page.dtype != np.uint8 or page.samplesperpixel < 3 or page.planarconfig != 1:
+            self._tif.close()
+            raise ValueError(f"{path}: o modo por tiles lê TIFF RGB de 8 bits com canais intercalados.")
+        self.shape = (page.imagelength, page.imagewidth, 3)
+        self._page = page
+        self._memmap = tifffile.memmap(path) if page.is_memmappable else None
+        self._chunk = page.chunks[:2]
+        self._across = math.ceil(page.imagewidth / self._chunk[1])
+        self._segments = collections.OrderedDict()
+        self._keep = 2 * self._across + 2
+
+    def close(self):
+        self._memmap = None
+        self._tif.close()
+
+    def _segment(self, index):
+        seg = self._segments.get(index)
+        if seg is None:
+            page, fh = self._page, self._tif.filehandle
+            fh.seek(page.dataoffsets[index])
+            data = fh.read(page.databytecounts[index])
+            seg = page.decode(data, index, jpegtables=page.jpegtables)[0][0]
+            self._segments[index] = seg
+            if len(self._segments) > self._keep:
+                self._segments.popitem(last=False)
+        else:
+            self._segments.move_to_end(index)
+        return seg
+
+    def __getitem__(self, region):
+        rows, cols = region
+        y0, y1, _ = rows.indices(self.shape[0])
+        x0, x1, _ = cols.indices(self.shape[1])
+        if self._memmap is not None:
+            return self._memmap[y0:y1, x0:x1, 2::-1]
+        out = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        ch, cw = self._chunk
+        for ty in range(y0 // ch, (y1 - 1) // ch + 1):
+            for tx in range(x0 // cw, (x1 - 1) // cw + 1):
+                seg = self._segment(ty * self._across + tx)
+                sy, sx = ty * ch, tx * cw
+                ya, yb = max(y0, sy), min(y1, sy + seg.shape[0])
+                xa, xb = max(x0, sx), min(x1, sx + seg.shape[1])
+                # Tiles da borda vêm com o tamanho cheio: só a parte dentro da região é copiada
+                out[ya - y0:yb - y0, xa - x0:xb - x0] = seg[ya - sy:yb - sy, xa - sx:xb - sx, 2::-1]
+        return out
+
+
+def open_source(path):
+    """
+    Abre a imagem de origem sem carregá-la: .npy (H, W, 3) uint8 é mapeado em
+    memória e TIFF é lido por regiões (TiffWindows). Outros formatos não são
+    aceitos (JPEG e PNG não permitem ler só uma região): converta antes.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in TILED_EXTENSIONS:
+        raise ValueError(f"O modo por tiles lê só .npy (H, W, 3) e TIFF; converta {os.path.basename(path)}.")
+    if ext != ".npy":
+        return TiffWindows(path)
+    src = np.load(path, mmap_mode="r")
+    if src.ndim != 3 or src.shape[2] != 3 or src.dtype != np.uint8:
+        raise ValueError("Imagem inválida ou não colorida.")
+    return src
+
+
+def tile_size_for_budget(memory_budget, halo=0):
+    """Lado do tile (sem margem) que mantém o tile com margem dentro do orçamento."""
+    side = int(math.sqrt(memory_budget / BYTES_PER_PIXEL)) - 2 * halo
+    return max(MIN_TILE, side)
+
+
+def iter_tiles(shape, tile, halo=0):
+    """
+    Percorre a imagem em tiles. Devolve (interno, externo): as fatias do tile
+    e as da região lida com a margem `halo` (recortada nas bordas da imagem).
+    """
+    h, w = shape[:2]
+    for y0 in range(0, h, tile):
+        for x0 in range(0, w, tile):
+            y1, x1 = min(y0 + tile, h), min(x0 + tile, w)
+            inner = (slice(y0, y1), slice(x0, x1))
+            outer = (slice(max(0, y0 - halo), min(h, y1 + halo)),
+                     slice(max(0, x0 - halo), min(w, x1 + halo)))
+            yield inner, outer
+
+
+def _read(src, region):
+    return np.ascontiguousarray(src[region])
+
+
+def _tile_scores(tile, bounds):
+    indices = compute_all_indices(tile, bounds=bounds)
+    veg = compute_veg_score(indices)
+    straw = compute_straw_score(tile, indices["StrawIndex"])
+    return veg, straw
+
+
+def process_tiled(source, output, sens_planta=0.5, bias_palha=0.5, limpeza=1,
+                  memory_budget=DEFAULT_MEMORY_BUDGET, tile=None, coverage=None):
+    """
+    Segmentação por tiles para imagens maiores que a memória.
+
+    1ª passada: limites globais dos índices (normalização igual à da imagem inteira).
+    2ª passada: histograma conjunto veg x straw (somado entre tiles) → limiares de Otsu.
+    3ª passada: classificação e limpeza com margem, gravando o mapa de classes
+    num .npy mapeado em memória (`output`).
+
+    O pico de memória depende só de memory_budget, não do tamanho da imagem.
+    O limiar base de planta vem do histograma (diferença de até um bin, 1/512,
+    para o Otsu exato do caminho em memória).
+    source: caminho (.npy ou TIFF, ver open_source) ou array já aberto.
+    coverage: CoverageAccumulator opcional (ex.: grade) que recebe cada tile.
+    """
+    if isinstance(source, str):
+        src = open_source(source)
+        try:
+            return _process_tiled(src, output, sens_planta, bias_palha, limpeza, memory_budget, tile, coverage)
+        finally:
+            if isinstance(src, TiffWindows):
+                src.close()
+    return _process_tiled(source, output, sens_planta, bias_palha, limpeza, memory_budget, tile, coverage)
+
+
+def _process_tiled(src, output, sens_planta, bias_palha, limpeza, memory_budget, tile, coverage):
+    shape = src.shape[:2]
+    halo = cleaning_halo(limpeza)
+    tile = tile or tile_size_for_budget(memory_budget, halo)
+
+    bounds = None
+    for inner, _ in iter_tiles(shape, tile):
+        bounds = merge_index_bounds(bounds, raw_index_bounds(_read(src, inner)))
+
+    joint = np.zeros((HIST_BINS, HIST_BINS), dtype=np.int64)
+    for inner, _ in iter_tiles(shape, tile):
+        joint += joint_histogram(*_tile_scores(_read(src, inner), bounds))
+
+    t_veg_base = histogram_otsu(joint.sum(axis=1), bin_centers(VEG_RANGE), fallback_q=80)
+    t_veg = adjust_veg_threshold(t_veg_base, sens_planta)
+    t_straw = straw_threshold_from_histogram(np.cumsum(joint, axis=0), t_veg, bias_palha)
+
+    seg_out = np.lib.format.open_memmap(output, mode="w+", dtype=np.uint8, shape=shape)
+    coverage = coverage if coverage is not None else CoverageAccumulator()
+    for inner, outer in iter_tiles(shape, tile, halo):
+        veg, straw = _tile_scores(_read(src, outer), bounds)
+        seg_map = apply_postprocessing(classify_scores(veg, straw, t_veg, t_straw), level=limpeza)
+        # Recorta a margem: só o interior do tile é gravado
+        crop = (slice(inner[0].start - outer[0].start, inner[0].stop - outer[0].start),
+                slice(inner[1].start - outer[1].start, inner[1].stop - outer[1].start))
+        seg_out[inner] = seg_map[crop]
+        coverage.add(seg_map[crop], full_shape=shape, offset=(inner[0].start, inner[1].start))
+    seg_out.flush()
+
+    return {
+        "output": output,
+        "tile": tile,
+        "halo": halo,
+        "t_veg": t_veg,
+        "t_straw": t_straw,
+        "metrics": coverage.total(),
+    }
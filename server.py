@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from processing.service import (
+    BATCH_SIZE, QUEUE_SIZE, ClassificationService, ServiceError, ServiceOverloaded, ServiceUnavailable,
+)
+
+# Campos do pedido aceitos na query string (upload) ou no JSON
+PARAMS = {"sens_planta": float, "bias_palha": float, "limpeza": float, "scale": int}
+# Quanto o cliente deve esperar antes de tentar de novo quando a fila está cheia
+RETRY_AFTER_S = 1
+
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "sim", "png")
+
+
+def _content_length(value):
+    """Tamanho do corpo pelo cabeçalho Content-Length (ValueError se não for um inteiro >= 0)."""
+    try:
+        length = int(value)
+    except ValueError:
+        raise ValueError(f"Content-Length inválido: {value!r}.") from None
+    if length < 0:
+        raise ValueError(f"Content-Length inválido: {value!r}.")
+    return length
+
+
+def _inside(path, root):
+    """Caminho real de `path` se estiver dentro de `root` (PermissionError se não)."""
+    real = os.path.realpath(path if os.path.isabs(path) else os.path.join(root, path))
+    if os.path.commonpath([real, root]) != root:
+        raise PermissionError(f"Caminho fora da pasta liberada: {path}")
+    return real
+
+
+def make_handler(service, max_bytes, timeout, root=None):
+    """
+    Handler HTTP ligado ao serviço (ver o uso em main).
+    root: pasta liberada para os pedidos JSON com "caminho" (só arquivos
+    dentro dela); None desliga essa forma, e só o envio dos bytes é aceito.
+    """
+    root = os.path.realpath(root) if root is not None else None
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass  # os contadores ficam em /metrics
+
+        def _send(self, status, body, headers=()):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/health":
+                self._send(200, {"ok": True, "processos": service.workers, "pids": service.pids})
+            elif path == "/metrics":
+                self._send(200, {**service.stats.snapshot(), "em_fila": service.queued,
+                                 "em_execucao": service.running, "processos": service.workers})
+            else:
+                self._send(404, {"erro": f"Caminho desconhecido: {path}"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/classify":
+                self._send(404, {"erro": f"Caminho desconhecido: {url.path}"})
+                return
+            # Sem saber o tamanho o corpo não pode ser lido: a conexão fecha
+            header = self.headers.get("Content-Length")
+            if header is None:
+                self.close_connection = True
+                self._send(411, {"erro": "Pedido sem Content-Length."})
+                return
+            try:
+                length = _content_length(header)
+            except ValueError as exc:
+                self.close_connection = True
+                self._send(400, {"erro": str(exc)})
+                return
+            if length > max_bytes:
+                # O corpo não é lido: a conexão fecha em vez de ser reaproveitada
+                self.close_connection = True
+                self._send(413, {"erro": f"Imagem maior que {max_bytes // 1024 ** 2} MB."})
+                return
+            body = self.rfile.read(length)
+            try:
+                request = self._parse(url, body)
+            except PermissionError as exc:
+                self._send(403, {"erro": str(exc)})
+                return
+            except (ValueError, TypeError) as exc:
+                self._send(400, {"erro": str(exc)})
+                return
+            try:
+                future = service.submit(request)
+            except ServiceOverloaded as exc:
+                self._send(503, {"erro": str(exc)}, [("Retry-After", str(RETRY_AFTER_S))])
+                return
+            try:
+                self._send(200, future.result(timeout=timeout))
+            except TimeoutError:
+                self._send(504, {"erro": f"Sem resposta em {timeout} s."})
+            except ValueError as exc:
+                # Só o pedido em si (imagem ilegível, parâmetro inválido) é erro do cliente
+                self._send(400, {"erro": str(exc)})
+            except ServiceUnavailable as exc:
+                self._send(503, {"erro": str(exc)})
+            except ServiceError as exc:
+                self._send(500, {"erro": str(exc)})
+
+        def _parse(self, url, body):
+            """Pedido a partir do corpo: JSON com "caminho" ou os bytes da imagem (parâmetros na query)."""
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                fields = json.loads(body or b"{}")
+                if not isinstance(fields, dict) or not fields.get("caminho"):
+                    raise ValueError('JSON sem "caminho" (para enviar a imagem, use o corpo com os bytes).')
+                if root is None:
+                    raise PermissionError('Pedidos com "caminho" estão desligados (inicie o serviço com --root).')
+                request = {"caminho": _inside(str(fields["caminho"]), root), "mapa": _flag(fields.get("mapa", False))}
+            else:
+                if not body:
+                    raise ValueError("Pedido sem imagem.")
+                fields = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                request = {"imagem": body, "mapa": _flag(fields.get("mapa", False))}
+            for name, kind in PARAMS.items():
+                if name in fields:
+                    request[name] = kind(fields[name])
+            return request
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serviço HTTP local de classificação: %Planta, %Palha e %Solo por imagem enviada.")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço (padrão: só esta máquina)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="Processos aquecidos (padrão: núcleos da máquina)")
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE,
+                        help="Pedidos aguardando; com a fila cheia o serviço responde 503 (padrão: %(default)s)")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE,
+                        help="Máximo de pedidos enviados juntos a um processo (padrão: %(default)s)")
+    parser.add_argument("--max-mb", type=int, default=100, help="Tamanho máximo de uma imagem enviada, em MB")
+    parser.add_argument("--timeout", type=float, default=120, help="Tempo máximo por pedido, em segundos")
+    parser.add_argument("--root", metavar="PASTA", default=None,
+                        help='Aceita pedidos JSON com "caminho" de arquivos dentro desta pasta (padrão: desligado)')
+    args = parser.parse_args(argv)
+    if args.root is not None and not os.path.isdir(args.root):
+        parser.error(f"--root: {args.root} não é uma pasta.")
+
+    print("Aquecendo os processos...", flush=True)
+    with ClassificationService(args.workers, args.queue, args.batch) as service:
+        server = ThreadingHTTPServer((args.host, args.port),
+                                     make_handler(service, args.max_mb * 1024 ** 2, args.timeout, args.root))
+        server.daemon_threads = True
+        print(f"Servindo em http://{args.host}:{server.server_port} com {service.workers} processos "
+              f"(POST /classify, GET /metrics, GET /health)", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import time
+
+from processing.batch import ResultWriter
+from processing.stream import STREAM_FIELDS, stream_percentages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Classificação contínua de vídeo ou sequência de imagens: série temporal de %Planta, %Palha e %Solo.")
+    parser.add_argument("source", help="Vídeo, número da câmera ou pasta de imagens (em ordem de nome)")
+    parser.add_argument("-o", "--output", default="serie.csv",
+                        help="Série temporal: .csv ou .jsonl (padrão: serie.csv)")
+    parser.add_argument("--sens-planta", type=float, default=0.5, help="Sensibilidade da planta (0–1)")
+    parser.add_argument("--bias-palha", type=float, default=0.5, help="Viés da palha (0–1.5)")
+    parser.add_argument("--limpeza", type=float, default=1, help="Intensidade da limpeza (1–3)")
+    parser.add_argument("--skip", type=int, default=0, help="Quadros pulados entre dois processados")
+    parser.add_argument("--scale", type=int, default=1, choices=(1, 2, 4, 8),
+                        help="Processa em 1/SCALE da resolução")
+    parser.add_argument("--bits", type=int, default=6, help="Bits por canal da tabela de cores (1–7)")
+    parser.add_argument("--refresh", type=int, default=15, help="Recalcula os limiares a cada N quadros processados")
+    parser.add_argument("--smoothing", type=float, default=0.3,
+                        help="Peso da nova medida na suavização dos limiares (1 = sem suavização)")
+    parser.add_argument("--queue", type=int, default=8, help="Tamanho da fila de quadros lidos")
+    parser.add_argument("--drop", action="store_true",
+                        help="Fonte ao vivo: descarta os quadros mais antigos se o processamento atrasar")
+    parser.add_argument("--fps", type=float, default=None,
+                        help="Quadros por segundo da sequência de imagens (padrão: do vídeo, ou 1)")
+    parser.add_argument("--overwrite", action="store_true", help="Substitui o arquivo de saída, se já existir")
+    args = parser.parse_args(argv)
+
+    # A série é sempre nova: não acrescenta a uma série anterior nem a apaga sem pedido
+    if os.path.exists(args.output) and not args.overwrite:
+        parser.error(f"{args.output} já existe; use --overwrite para substituí-lo ou escolha outro -o.")
+    writer = ResultWriter(args.output, STREAM_FIELDS, append=False)
+    processed, dropped = 0, 0
+    start = time.perf_counter()
+    try:
+        for row in stream_percentages(args.source, args.sens_planta, args.bias_palha, args.limpeza,
+                                      bits=args.bits, refresh=args.refresh, smoothing=args.smoothing,
+                                      skip=args.skip, queue_size=args.queue, drop=args.drop,
+                                      scale=args.scale, fps=args.fps):
+            writer.write(row)
+            processed += 1
+            dropped = row["descartados"]
+            if processed % 100 == 0:
+                print(f"{processed} quadros ({processed / (time.perf_counter() - start):.1f} quadros/s)", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"{processed} quadros em {elapsed:.2f} s ({processed / elapsed if elapsed else 0:.1f} quadros/s); "
+          f"{dropped} descartados. Série gravada em {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
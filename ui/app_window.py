@@ -1,16 +1,26 @@
 import tkinter as tk
-from ui.canvas_view import CanvasView
-from ui.controls_frame import ControlsFrame
+from tkinter import filedialog, messagebox
 from tkinter import ttk
 import sv_ttk
+from utils import tracing
+
+# Intervalo de atualização da barra de status (ms) e etapas exibidas
+STATUS_INTERVAL_MS = 250
+STATUS_MAX_STAGES = 5
+# Atraso para montar o conteúdo: a janela é desenhada antes de importar OpenCV/NumPy/Pillow
+CONTENT_DELAY_MS = 20
 
 
 class AppWindow(tk.Tk):
     """
     Janela principal do software.
     Integra o CanvasView (visualização) e o ControlsFrame (controles).
+    Os dois (e as bibliotecas pesadas que importam) são montados logo depois
+    que a janela aparece, para o início não esperar pelos imports.
+    trace: começa com os tempos por etapa ligados (utils.tracing); também
+    podem ser ligados e desligados na barra de status.
     """
-    def __init__(self):
+    def __init__(self, trace=False):
         super().__init__()
         sv_ttk.set_theme("light") 
         self._is_dark = False
@@ -23,17 +33,46 @@ class AppWindow(tk.Tk):
         self.btn_theme.pack(side="right", padx=(0, 4))
 
         self.title("Motor: Easy IOP")
-        self.geometry("950x600")
+        self.geometry("950x630")
         self.resizable(False, False)
 
         #Canvas principal
         content = ttk.Frame(self)
         content.pack(fill="both", expand=True)
+        self.content = content
+        self.canvas_view = None
+        self.controls = None
+        self._loading_label = ttk.Label(content, text="Carregando…")
+        self._loading_label.pack(expand=True)
+
+        # Barra de status: tempos por etapa da última execução
+        status = ttk.Frame(self, padding=(10, 2))
+        status.pack(side="bottom", fill="x", before=content)
+        self.var_trace = tk.BooleanVar(value=trace)
+        self.var_memory = tk.BooleanVar(value=False)
+        ttk.Button(status, text="Salvar trace", command=self._save_trace).pack(side="right")
+        ttk.Checkbutton(status, text="Memória", variable=self.var_memory,
+                        command=self._toggle_tracing).pack(side="right", padx=6)
+        ttk.Checkbutton(status, text="Tempos", variable=self.var_trace,
+                        command=self._toggle_tracing).pack(side="right")
+        self.status_label = ttk.Label(status, text="", font=("Segoe UI", 8))
+        self.status_label.pack(side="left", fill="x")
+
+        self._toggle_tracing()
+        self._last_status = None
+        self._refresh_status()
+        self.after(CONTENT_DELAY_MS, self._build_content)
 
-        self.canvas_view = CanvasView(content)
+    def _build_content(self):
+        """Importa e monta a visualização e os controles (com a janela já visível)."""
+        from ui.canvas_view import CanvasView
+        from ui.controls_frame import ControlsFrame
+
+        self._loading_label.destroy()
+        self.canvas_view = CanvasView(self.content)
         self.canvas_view.pack(side="left", padx=10, pady=10)
 
-        self.controls = ControlsFrame(content, self.canvas_view)
+        self.controls = ControlsFrame(self.content, self.canvas_view)
         self.controls.pack(side="right", fill="y", padx=10, pady=10)
 
     def _toggle_theme(self):
@@ -46,4 +85,37 @@ class AppWindow(tk.Tk):
             sv_ttk.set_theme("light")
             self.btn_theme.config(text="🌙 Dark")
 
+    def _refresh_status(self):
+        """Mostra as etapas mais lentas da última execução (sem trabalho se nada mudou)."""
+        enabled = tracing.is_enabled()
+        timings = tracing.last_timings() if enabled else {}
+        allocations = tracing.last_allocations() if enabled else {}
+        snapshot = (timings, allocations)
+        if snapshot != self._last_status:
+            self._last_status = snapshot
+            slowest = sorted(timings.items(), key=lambda kv: kv[1], reverse=True)[:STATUS_MAX_STAGES]
+            parts = []
+            for name, ms in slowest:
+                text = f"{name} {ms:.1f} ms"
+                if name in allocations:
+                    text += f" ({allocations[name] / 1024 ** 2:.1f} MB)"
+                parts.append(text)
+            self.status_label.config(text="  |  ".join(parts))
+        self.after(STATUS_INTERVAL_MS, self._refresh_status)
+
+    def _toggle_tracing(self):
+        """
+        Liga/desliga os tempos por etapa e, com eles, a contagem de bytes
+        alocados por etapa (tracemalloc, mais lento).
+        """
+        tracing.disable()
+        if self.var_trace.get():
+            tracing.enable(track_memory=self.var_memory.get())
 
+    def _save_trace(self):
+        """Grava as etapas registradas no formato Chrome trace (chrome://tracing)."""
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Chrome trace", "*.json")])
+        if not path:
+            return
+        count = tracing.export_chrome_trace(path)
+        messagebox.showinfo("Trace", f"{count} eventos gravados em {path}.")
@@ -1,29 +1,87 @@
 import tkinter as tk
 from PIL import Image, ImageTk
-import cv2
-import numpy as np
+from ui.viewport import BACKGROUND, FrameBuffers, Viewport, ViewSource
+from utils.tracing import span, traced
 
-class CanvasView(tk.Label):
+# Tamanho inicial da área de exibição (largura, altura)
+VIEW_SIZE = (600, 400)
+# Zoom por passo da roda do mouse
+ZOOM_STEP = 1.25
+
+
+@traced("prepare_frame")
+def prepare_frame(img_bgr, size=VIEW_SIZE, copy=False):
     """
-    Exibe a imagem no formato PhotoImage dentro do Tkinter.
-    Atualiza em tempo real conforme o overlay muda.
+    Prepara uma imagem BGR (OpenCV) para exibição: monta os níveis reduzidos
+    usados pelo zoom. Não toca no Tk, então pode rodar na thread de processamento.
+    copy=True para imagens cujo buffer será reaproveitado (ex.: Renderer).
     """
-    def __init__(self, parent):
-        super().__init__(parent)
-        self.image_tk = None
+    return ViewSource(img_bgr, min_size=size, copy=copy)
+
+
+class CanvasView(tk.Canvas):
+    """
+    Exibe a imagem dentro do Tkinter com zoom (roda do mouse), deslocamento
+    (arrastar) e ajuste à área (duplo clique), mantendo a proporção.
+    Só a região visível é desenhada, na resolução da tela, num único
+    PhotoImage reaproveitado com paste a cada quadro.
+    """
+    def __init__(self, parent, size=VIEW_SIZE):
+        super().__init__(parent, width=size[0], height=size[1], highlightthickness=0,
+                         background="#%02x%02x%02x" % BACKGROUND)
+        self.view_size = tuple(size)
+        self.viewport = Viewport()
+        # Buffers dos quadros montados na thread de processamento (ver FrameBuffers)
+        self.frames = FrameBuffers()
+        self.source = None
         self.current_img = None
+        self.image_tk = None
+        self._image_item = None
+        self._drag = None
+
+        self.bind("<Configure>", self._on_resize)
+        self.bind("<MouseWheel>", lambda e: self._zoom(ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP, e))
+        self.bind("<Button-4>", lambda e: self._zoom(ZOOM_STEP, e))
+        self.bind("<Button-5>", lambda e: self._zoom(1 / ZOOM_STEP, e))
+        self.bind("<ButtonPress-1>", self._start_drag)
+        self.bind("<B1-Motion>", self._drag_to)
+        self.bind("<Double-Button-1>", lambda e: self.reset_view())
 
-    def display_image(self, img_bgr):
-        """Exibe imagem BGR (OpenCV) no canvas Tkinter."""
+    def display_image(self, img_bgr, reset_view=False):
+        """Exibe imagem BGR (OpenCV) no canvas Tkinter (reset_view: imagem inteira, sem zoom)."""
         if img_bgr is None:
             return
-        img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(np.uint8(img_rgb))
-        img_resized = img_pil.resize((600, 400))
-        self.image_tk = ImageTk.PhotoImage(img_resized)
-        self.configure(image=self.image_tk)
+        if reset_view:
+            self.viewport.reset()
+        self.show_frame(prepare_frame(img_bgr, self.view_size))
         self.current_img = img_bgr
 
+    def show_frame(self, frame):
+        """Exibe um quadro já preparado por prepare_frame (thread do Tk), mantendo o zoom."""
+        self.source = frame
+        self.frames.shown(frame)
+        self.redraw()
+
+    def reset_view(self):
+        """Volta a mostrar a imagem inteira (ao trocar de imagem ou com duplo clique)."""
+        self.viewport.reset()
+        self.redraw()
+
+    def redraw(self):
+        if self.source is None:
+            return
+        with span("viewport_render"):
+            frame = Image.fromarray(self.source.render(self.viewport, self.view_size))
+        with span("PhotoImage"):
+            if self.image_tk is None or (self.image_tk.width(), self.image_tk.height()) != self.view_size:
+                self.image_tk = ImageTk.PhotoImage(frame)
+                if self._image_item is None:
+                    self._image_item = self.create_image(0, 0, anchor="nw", image=self.image_tk)
+                else:
+                    self.itemconfigure(self._image_item, image=self.image_tk)
+            else:
+                self.image_tk.paste(frame)
+
     def update_overlay(self, overlay_bgr):
         """Atualiza o canvas com o overlay (imagem processada)."""
         self.display_image(overlay_bgr)
@@ -32,3 +90,26 @@ class CanvasView(tk.Label):
         """Alias para manter semântica quando vierem imagens geradas (overlay/mapa)."""
         self.display_image(img_bgr)
 
+    # --- Interação ---
+    def _on_resize(self, event):
+        size = (max(1, event.width), max(1, event.height))
+        if size != self.view_size:
+            self.view_size = size
+            self.redraw()
+
+    def _zoom(self, factor, event):
+        if self.source is None:
+            return
+        self.viewport.zoom_at(factor, event.x, event.y, self.source.shape, self.view_size)
+        self.redraw()
+
+    def _start_drag(self, event):
+        self._drag = (event.x, event.y)
+
+    def _drag_to(self, event):
+        if self.source is None or self._drag is None:
+            return
+        dx, dy = event.x - self._drag[0], event.y - self._drag[1]
+        self._drag = (event.x, event.y)
+        self.viewport.pan(dx, dy, self.source.shape, self.view_size)
+        self.redraw()
@@ -1,11 +1,22 @@
+import os
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import ttk
-import cv2
-import numpy as np
+from processing.arena import BufferArena
+from processing.export import render_result, save_label_map, write_image
 from processing.indices import compute_all_indices
-from processing.realtime_adjust import adjust_segmentation, create_overlay
-from utils.metrics import calculate_percentages
+from processing.parallel import BandPool
+from processing.pyramid import build_pyramid, preview_level, level_scale
+from processing.rendering import Renderer
+from processing.session import SegmentationSession, cached_session
+from processing.superpixels import SuperpixelSession
+from processing.sweep import session_sweep
+from ui.canvas_view import VIEW_SIZE
+from ui.sweep_panel import SweepPanel
+from ui.worker import ProcessingWorker, check_cancelled
+from utils.cache import ProductCache
+from utils.file_utils import load_image, load_preview
+from utils.metrics import compare_percentages
 
 
 class ControlsFrame(tk.Frame):
@@ -13,18 +24,44 @@ class ControlsFrame(tk.Frame):
     Frame lateral com botões e sliders de controle.
     Interage diretamente com o CanvasView e o backend.
     """
+    # Requisições que só valem para a imagem aberta (descartadas ao trocar de imagem);
+    # "save" e "labels" já guardam a sua sessão e terminam mesmo depois da troca
+    IMAGE_KEYS = ("load", "indices", "view", "sweep")
     def __init__(self, parent, canvas_view):
         super().__init__(parent, padx=10, pady=10)
         self.canvas_view = canvas_view
+        self.image_path = None
         self.img_original = None
+        self.img_preview = None
+        self.preview_scale = 1.0
         self.indices = None
+        self.session = None
+        self.session_preview = None
         self.seg_map = None
+        self.seg_map_preview = None
+        self.final_metrics = None
+        self._preview = None
+        self._loading = False
+        self._indices_requested = False
+        self.sweep_panel = None
+        # Resolução total por faixas de linhas em todos os núcleos
+        self.pool = BandPool()
+        # Buffers de renderização reaproveitados entre quadros (usado só no worker)
+        self.renderer = Renderer(pool=self.pool)
+        self._busy = set()
+        self.worker = ProcessingWorker(self, on_busy=lambda busy: self._set_busy(busy, "processamento"))
+        # Codificação e gravação dos arquivos: não seguram a prévia nem são canceladas ao trocar de imagem
+        self.export_worker = ProcessingWorker(self, on_busy=lambda busy: self._set_busy(busy, "gravação"))
+        # Índices e scores já calculados ficam no disco: reabrir uma imagem não recalcula
+        self.cache = ProductCache()
 
         # --- Botões principais ---
                 # --- Botões principais ---
         ttk.Button(self, text="📂 Upload Imagem", command=self.upload_image, width=20).pack(pady=5)
         ttk.Button(self, text="⚙️ Gerar Índices", command=self.generate_indices, width=20).pack(pady=5)
         ttk.Button(self, text="💾 Salvar Resultado", command=self.save_result, width=20).pack(pady=5)
+        ttk.Button(self, text="🗂️ Exportar Classes", command=self.export_labels, width=20).pack(pady=5)
+        ttk.Button(self, text="📈 Varredura", command=self.open_sweep, width=20).pack(pady=5)
 
 
         # --- Sliders ---
@@ -43,11 +80,19 @@ class ControlsFrame(tk.Frame):
         self.slider_limpeza = ttk.Scale(self, from_=1, to=3, value=1, orient="horizontal", command=lambda v: self.update_realtime())
         self.slider_limpeza.pack(fill="x")
 
+        # Ao soltar o slider roda a passada em resolução total
+        for slider in (self.slider_planta, self.slider_palha, self.slider_limpeza):
+            slider.bind("<ButtonRelease-1>", lambda e: self.refine_full_resolution())
+
 
         #Texto para métricas
         self.metrics_label = ttk.Label(self, text="Percentuais: ", justify="left")
         self.metrics_label.pack(pady=10)
 
+        # Indicador de processamento em segundo plano
+        self.progress = ttk.Progressbar(self, mode="indeterminate", length=150)
+        self.progress.pack(pady=(0, 5))
+
 
         #Alterção do modo de visualização:
         tk.Label(self, text="Modo de Visualização").pack(pady=(5, 0))
@@ -57,67 +102,222 @@ class ControlsFrame(tk.Frame):
         self.combo_view.pack(pady=3)
         self.combo_view.bind("<<ComboboxSelected>>", self.change_view_mode)
 
+        # Classificação por regiões: o arraste reclassifica milhares de regiões, não milhões de pixels
+        self.var_superpixels = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self, text="Superpixels", variable=self.var_superpixels,
+                        command=self._toggle_superpixels).pack(pady=3)
+
     def upload_image(self):
-        """Abre janela de seleção e carrega imagem."""
+        """
+        Abre janela de seleção e carrega imagem: primeiro uma decodificação
+        reduzida (exibida na hora) e, em segundo plano, a resolução total.
+        """
         file_path = filedialog.askopenfilename(filetypes=[("Imagens", "*.jpg *.png *.jpeg")])
         if not file_path:
             return
-        img = cv2.imread(file_path)
-        if img is None:
+        try:
+            img_quick, _ = load_preview(file_path, VIEW_SIZE)
+        except ValueError:
             return
-        self.img_original = img
+        # Descarta o que ainda estiver pendente da imagem anterior (gravações pedidas continuam)
+        for key in self.IMAGE_KEYS:
+            self.worker.cancel(key)
+        self.renderer.clear()
+        self.canvas_view.frames.clear()
+        self.image_path = file_path
+        self.img_original = None
+        self.img_preview = None
         self.indices = None
-        self.canvas_view.display_image(img)
+        self.session = None
+        self.session_preview = None
+        self._loading = True
+        self._indices_requested = False
+        self.canvas_view.display_image(img_quick, reset_view=True)
         self.metrics_label.config(text="Percentuais: ")
+        if self._sweep_open():
+            self.sweep_panel.clear()
 
         self.slider_planta.set(0.5)   # Sensibilidade da Planta
         self.slider_palha.set(0.5)    # Sensibilidade da Palha
         self.slider_limpeza.set(1)    # Limpeza
         self.seg_map = None
+        self.seg_map_preview = None
+        self._preview = None
+
+        def job(cancelled):
+            img = load_image(file_path)
+            check_cancelled(cancelled)
+            # Pirâmide montada uma vez: o nível reduzido atende o arraste dos sliders
+            pyramid = build_pyramid(img)
+            return img, preview_level(pyramid), level_scale(pyramid, len(pyramid) - 1)
+
+        def done(result):
+            self._loading = False
+            self.img_original, self.img_preview, self.preview_scale = result
+            if self._indices_requested:
+                self.generate_indices()
+
+        def failed(exc):
+            self._loading = False
+            self._show_error(exc)
+
+        self.worker.submit("load", job, done, on_error=failed)
 
     def generate_indices(self):
-        """Calcula índices da imagem carregada."""
+        """Calcula índices da imagem carregada (em segundo plano, ou do cache em disco)."""
         if self.img_original is None:
+            # Resolução total ainda carregando: calcula assim que chegar
+            self._indices_requested = self._loading
             return
-        self.indices = compute_all_indices(self.img_original)
-        seg_map, metrics = adjust_segmentation(
-            self.img_original, self.indices,
-            sens_planta=self.slider_planta.get(),
-            bias_palha=self.slider_palha.get(),
-            limpeza=self.slider_limpeza.get()
-        )
-        self.seg_map = seg_map
-        overlay = create_overlay(self.img_original, seg_map)
-        self.canvas_view.update_overlay(overlay)
-        self.update_metrics(metrics)
+        self._indices_requested = False
+        img, img_preview, cache, pool = self.img_original, self.img_preview, self.cache, self.pool
+        superpixels = self.var_superpixels.get()
+
+        def job(cancelled):
+            session = cached_session(img, cache, pool=pool)
+            check_cancelled(cancelled)
+            if superpixels:
+                # A prévia usa as mesmas regiões, entregues no tamanho reduzido
+                session = SuperpixelSession.build(session)
+                session_preview = session.view(img_preview.shape)
+            else:
+                session_preview = SegmentationSession(img_preview, compute_all_indices(img_preview))
+            # Uma arena por sessão: os movimentos de slider reaproveitam os buffers
+            session.arena, session_preview.arena = BufferArena(), BufferArena()
+            return session, session_preview
+
+        def done(result):
+            self.session, self.session_preview = result
+            self.refine_full_resolution()
+            self.update_sweep()
+
+        self.worker.submit("indices", job, done, on_error=self._show_error)
+
+    def _current_params(self):
+        return (self.slider_planta.get(), self.slider_palha.get(), self.slider_limpeza.get())
 
     def update_realtime(self, *args):
-        """Reprocessa a imagem em tempo real conforme sliders."""
-        if self.img_original is None or self.indices is None:
+        """Reprocessa a prévia (resolução reduzida) conforme os sliders."""
+        if self._sweep_open():
+            # Estimativa pelo histograma: instantânea, antes da prévia ficar pronta
+            self.sweep_panel.set_params(self.slider_planta.get(), self.slider_palha.get())
+        if self.img_preview is None or self.session_preview is None:
             return
-        seg_map, metrics = adjust_segmentation(
-            self.img_original, self.indices,
-            sens_planta=self.slider_planta.get(),
-            bias_palha=self.slider_palha.get(),
-            limpeza=self.slider_limpeza.get()
-        )
-        self.seg_map = seg_map
-        overlay = create_overlay(self.img_original, seg_map)
-        self.canvas_view.update_overlay(overlay)
-        self.update_metrics(metrics)
-        self.change_view_mode()
+        session, img, mode = self.session_preview, self.img_preview, self.view_mode.get()
+        params = self._current_params()
+        sens_planta, bias_palha, limpeza = params
+
+        # A limpeza é em pixels: acompanha a escala da prévia (por superpixels vale a da resolução total)
+        scale = 1.0 if isinstance(session, SuperpixelSession) else self.preview_scale
+
+        def job(cancelled):
+            seg_map, metrics = session.segment(sens_planta, bias_palha, limpeza * scale)
+            return seg_map, metrics, self._render_frame(img, seg_map, mode)
 
+        def done(result):
+            self.seg_map_preview, metrics, frame = result
+            self._preview = (params, metrics)
+            self.canvas_view.show_frame(frame)
+            self.update_metrics(metrics, final=False)
 
-    def update_metrics(self, metrics):
-        """Atualiza o texto dos percentuais."""
-        text = (f"Planta:  {metrics['planta_%']}%\n"
+        # Só a requisição mais recente da visualização é processada
+        self.worker.submit("view", job, done, on_error=self._show_error)
+
+    def refine_full_resolution(self):
+        """Passada em resolução total (ao soltar o slider, trocar a visualização ou salvar)."""
+        if self.img_original is None or self.session is None:
+            return
+        session, img, mode = self.session, self.img_original, self.view_mode.get()
+        params = self._current_params()
+
+        def job(cancelled):
+            # A sessão devolve do cache se os parâmetros não mudaram
+            seg_map, metrics = session.segment(*params)
+            check_cancelled(cancelled)
+            return seg_map, metrics, self._render_frame(img, seg_map, mode)
+
+        def done(result):
+            self.seg_map, self.final_metrics, frame = result
+            self.canvas_view.show_frame(frame)
+            self.update_metrics(self.final_metrics, final=True)
+            # Quanto a prévia com os mesmos parâmetros errou em relação ao final
+            if self._preview is not None and self._preview[0] == params:
+                error = compare_percentages(self._preview[1], self.final_metrics)
+                self.metrics_label.config(text=self.metrics_label.cget("text") + f"\nErro da prévia: {error['max']} p.p.")
+
+        self.worker.submit("view", job, done, on_error=self._show_error)
+
+    def open_sweep(self):
+        """Abre (ou traz para frente) a janela de varredura dos sliders."""
+        if self._sweep_open():
+            self.sweep_panel.lift()
+            return
+        self.sweep_panel = SweepPanel(self.winfo_toplevel(), on_pick=self._pick_params)
+        self.sweep_panel.set_params(self.slider_planta.get(), self.slider_palha.get())
+        self.update_sweep()
+
+    def _sweep_open(self):
+        return self.sweep_panel is not None and self.sweep_panel.winfo_exists()
+
+    def update_sweep(self):
+        """Recalcula a superfície da varredura da imagem atual (em segundo plano)."""
+        if not self._sweep_open() or self.session is None:
+            return
+        current = self.session
+        # A varredura é sempre sobre os pixels (também no modo por superpixels)
+        session = current.pixels if isinstance(current, SuperpixelSession) else current
+
+        def job(cancelled):
+            # Em resolução total: o histograma já está em cache depois da primeira segmentação
+            return session_sweep(session), session.joint_hist, session.t_veg_base
+
+        def done(result):
+            if self._sweep_open() and current is self.session:
+                self.sweep_panel.set_surface(*result)
+
+        self.worker.submit("sweep", job, done, on_error=self._show_error)
+
+    def _toggle_superpixels(self):
+        """Troca entre classificação por pixels e por superpixels (refaz as sessões)."""
+        if self.session is not None:
+            self.generate_indices()
+
+    def _pick_params(self, sens_planta, bias_palha, final):
+        """Sliders escolhidos no gráfico da varredura (final: botão solto)."""
+        self.slider_planta.set(sens_planta)
+        self.slider_palha.set(bias_palha)
+        self.update_realtime()
+        if final:
+            self.refine_full_resolution()
+
+    def _set_busy(self, busy, source):
+        """Liga/desliga o indicador enquanto algum dos workers (processamento, gravação) estiver ocupado."""
+        was_busy = bool(self._busy)
+        if busy:
+            self._busy.add(source)
+        else:
+            self._busy.discard(source)
+        if bool(self._busy) != was_busy:
+            if self._busy:
+                self.progress.start(12)
+            else:
+                self.progress.stop()
+
+    def _show_error(self, exc):
+        self.metrics_label.config(text=f"Erro no processamento:\n{exc}")
+
+    def update_metrics(self, metrics, final=True):
+        """Atualiza o texto dos percentuais (marcando se são da prévia ou finais)."""
+        title = "Percentuais (final):" if final else "Percentuais (prévia):"
+        text = (f"{title}\n"
+                f"Planta:  {metrics['planta_%']}%\n"
                 f"Palha:  {metrics['palha_%']}%\n"
                 f"Solo:  {metrics['solo_%']}%")
         self.metrics_label.config(text=text)
 
     def save_result(self):
         """Salva o resultado final (overlay ou mapa) acrescentando o rodapé."""
-        if self.seg_map is None or self.img_original is None:
+        if self.session is None or self.img_original is None:
             return
 
         file_path = filedialog.asksaveasfilename(
@@ -127,85 +327,72 @@ class ControlsFrame(tk.Frame):
         if not file_path:
             return
 
-        mode = self.view_mode.get()
-        if mode == "Original":
-            img_to_save = self.img_original.copy()
-        elif mode == "Mapa":
-            img_to_save = self.create_color_map(self.seg_map)
-        else:
-            img_to_save = create_overlay(self.img_original, self.seg_map)
+        session, img, mode = self.session, self.img_original, self.view_mode.get()
+        params = self._current_params()
 
-        metrics = calculate_percentages(self.seg_map)
-        final_img = self._compose_footer_image(img_to_save, metrics)
-        cv2.imwrite(file_path, final_img)
+        def job(cancelled):
+            # Sempre em resolução total, com os parâmetros do momento do clique
+            seg_map, metrics = session.segment(*params)
+            return render_result(img, seg_map, metrics, mode)
 
-    def _compose_footer_image(self, img_to_save, metrics):
-        """
-        Monta rodapé seguindo a estética solicitada sem alterar o processamento dos pixels.
-        """
-        h, w, _ = img_to_save.shape
-        footer_h = max(60, int(h * 0.08))
-        footer = np.full((footer_h, w, 3), 255, dtype=np.uint8)
-        final_img = np.vstack((img_to_save, footer))
-
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = max(0.6, round(w / 1600.0, 2))
-        thickness = max(1, int(font_scale * 2))
-
-        sections = [
-            ("PLANTA", metrics["planta_%"]),
-            ("PALHA", metrics["palha_%"]),
-            ("SOLO", metrics["solo_%"]),
-        ]
-        section_width = w // len(sections)
-        baseline_y = h + (footer_h + cv2.getTextSize("A", font, font_scale, thickness)[0][1]) // 2
-
-        for idx, (label, value) in enumerate(sections):
-            value_str = f"{value:.2f}".rstrip("0").rstrip(".")
-            text = f"{label}: {value_str} %"
-            text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
-            center_x = int((idx + 0.5) * section_width)
-            text_x = max(10, center_x - text_size[0] // 2)
-            cv2.putText(final_img, text, (text_x, baseline_y), font, font_scale, (0, 0, 0), thickness, cv2.LINE_AA)
-
-        watermark = "Thiagoscocco 2025"
-        wm_scale = max(0.5, round(font_scale * 0.55, 2))
-        wm_thickness = max(1, int(wm_scale * 2))
-        wm_size = cv2.getTextSize(watermark, font, wm_scale, wm_thickness)[0]
-        wm_x = max(10, w - wm_size[0] - int(w * 0.02))
-        wm_y = h + footer_h - int(footer_h * 0.2)
-        cv2.putText(final_img, watermark, (wm_x, wm_y), font, wm_scale, (90, 90, 90), wm_thickness, cv2.LINE_AA)
-
-        return final_img
+        def done(final_img):
+            # O quadro pronto é só deste pedido: a codificação segue no worker de gravação
+            self.export_worker.submit(("save", file_path), lambda cancelled: write_image(file_path, final_img),
+                                      lambda result: self._show_saved(file_path), on_error=self._show_error)
 
+        self.worker.submit(("save", file_path), job, done, on_error=self._show_error)
 
-    def change_view_mode(self, event=None):
-        """Atualiza a imagem exibida conforme o modo selecionado."""
-        if self.img_original is None or self.seg_map is None:
+    def export_labels(self):
+        """Exporta o mapa de classes em resolução total (PNG de 2 bits + JSON com parâmetros e percentuais)."""
+        if self.session is None:
             return
 
-        mode = self.view_mode.get()
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".png",
+            filetypes=[("Mapa de classes (PNG + JSON)", "*.png")]
+        )
+        if not file_path:
+            return
+
+        session, params, source = self.session, self._current_params(), self.image_path
+
+        def job(cancelled):
+            seg_map, metrics = session.segment(*params)
+            # Cópia: o mapa da sessão é um buffer da arena, sobrescrito no próximo movimento
+            return seg_map.copy(), metrics, session.thresholds(*params[:2])
+
+        def done(result):
+            seg_map, metrics, thresholds = result
+
+            def encode(cancelled):
+                save_label_map(file_path, seg_map, metrics, params, thresholds, source)
+            self.export_worker.submit(("labels", file_path), encode,
+                                      lambda result: self._show_saved(file_path), on_error=self._show_error)
+
+        self.worker.submit(("labels", file_path), job, done, on_error=self._show_error)
+
+    def _show_saved(self, file_path):
+        self.metrics_label.config(text=self.metrics_label.cget("text") + f"\nSalvo: {os.path.basename(file_path)}")
+
+    def change_view_mode(self, event=None):
+        """Atualiza a imagem exibida conforme o modo selecionado (em resolução total)."""
+        self.refine_full_resolution()
+
+    def _render_frame(self, img, seg_map, mode):
+        """
+        Quadro de exibição de img/seg_map conforme o modo (roda na thread de processamento).
+        O quadro e os seus níveis reduzidos (zoom) são escritos num conjunto de
+        buffers do canvas que não está na tela nem a caminho dela
+        (ui.viewport.FrameBuffers): uma soltura de slider em resolução total
+        não aloca nada do tamanho da imagem. A paleta e a mistura vão direto
+        no quadro (sem a cópia de um buffer do renderer).
+        """
+        frames = self.canvas_view.frames
+        slot = frames.take()
         if mode == "Original":
-            self.canvas_view.display_image(self.img_original)
-        elif mode == "Overlay":
-            from processing.realtime_adjust import create_overlay
-            overlay = create_overlay(self.img_original, self.seg_map)
-            self.canvas_view.update_overlay(overlay)
-        elif mode == "Mapa":
+            return frames.prepare(img, slot)
+        frame = frames.frame(slot, seg_map.shape)
+        if mode == "Mapa":
             # Cria imagem somente com as cores das classes
-            mapa = self.create_color_map(self.seg_map)
-            self.canvas_view.update_overlay(mapa)
-
-    def create_color_map(self, seg_map):
-        """Gera o mapa de classes colorido (sem imagem original)."""
-        color_map = {
-            0: (42, 42, 165),   # marrom (solo)
-            1: (0, 255, 255),   # amarelo (palha)
-            2: (0, 200, 0)      # verde (planta)
-        }
-        h, w = seg_map.shape
-        mapa = np.zeros((h, w, 3), np.uint8)
-        for cls, color in color_map.items():
-            mapa[seg_map == cls] = color
-        return mapa
-
+            return frames.prepare(self.renderer.class_map(seg_map, out=frame), slot)
+        return frames.prepare(self.renderer.overlay(img, seg_map, out=frame), slot)
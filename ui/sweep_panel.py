@@ -0,0 +1,151 @@
+import csv
+import tkinter as tk
+from tkinter import filedialog
+from tkinter import ttk
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+from processing.sweep import SWEEP_FIELDS, estimate_percentages, sweep_rows
+
+# Área do gráfico (largura, altura) e margens para os eixos (esquerda, topo, direita, base)
+PLOT_SIZE = (360, 240)
+PLOT_MARGIN = (44, 10, 12, 34)
+# Classe exibida → coluna da superfície
+PLOT_CLASSES = {"Planta": "planta_%", "Palha": "palha_%", "Solo": "solo_%"}
+
+
+class SweepPanel(tk.Toplevel):
+    """
+    Janela com a superfície planta/palha/solo (antes da limpeza) sobre toda a
+    grade de sensibilidade da planta x viés da palha (processing.sweep).
+    A cruz marca os sliders atuais e os percentuais estimados acompanham o
+    arraste na hora, sem esperar o processamento da prévia.
+    Clicar ou arrastar sobre o gráfico move os sliders: on_pick(sens, bias, final).
+    """
+    def __init__(self, parent, on_pick=None):
+        super().__init__(parent)
+        self.title("Varredura dos sliders")
+        self.resizable(False, False)
+        self.on_pick = on_pick
+        self.surface = None
+        self._cum_joint = None
+        self._t_veg_base = None
+        self._params = (0.5, 0.5)
+        self.image_tk = None
+
+        top = ttk.Frame(self, padding=(10, 8))
+        top.pack(fill="x")
+        ttk.Label(top, text="Classe:").pack(side="left")
+        self.var_class = tk.StringVar(value="Planta")
+        combo = ttk.Combobox(top, textvariable=self.var_class, state="readonly",
+                             values=list(PLOT_CLASSES), width=10)
+        combo.pack(side="left", padx=6)
+        combo.bind("<<ComboboxSelected>>", lambda e: self._draw())
+        ttk.Button(top, text="Exportar CSV", command=self.export_csv).pack(side="right")
+
+        left, top_m, right, bottom = PLOT_MARGIN
+        self.canvas = tk.Canvas(self, width=PLOT_SIZE[0] + left + right, height=PLOT_SIZE[1] + top_m + bottom,
+                                highlightthickness=0, background="white")
+        self.canvas.pack(padx=10)
+        self.canvas.bind("<ButtonPress-1>", lambda e: self._pick(e, final=False))
+        self.canvas.bind("<B1-Motion>", lambda e: self._pick(e, final=False))
+        self.canvas.bind("<ButtonRelease-1>", lambda e: self._pick(e, final=True))
+
+        self.estimate_label = ttk.Label(self, text="Gere os índices para calcular a varredura.",
+                                        justify="left", padding=(10, 6))
+        self.estimate_label.pack(fill="x")
+
+    def set_surface(self, surface, cum_joint, t_veg_base):
+        """Nova superfície (e o histograma de onde ela saiu, para as estimativas pontuais)."""
+        self.surface = surface
+        self._cum_joint = cum_joint
+        self._t_veg_base = t_veg_base
+        self._draw()
+        self.set_params(*self._params)
+
+    def clear(self):
+        """Sem imagem processada (ex.: ao carregar outra foto)."""
+        self.surface = None
+        self._cum_joint = None
+        self.canvas.delete("all")
+        self.estimate_label.config(text="Gere os índices para calcular a varredura.")
+
+    def set_params(self, sens_planta, bias_palha):
+        """Move a cruz e atualiza a estimativa para os sliders atuais."""
+        self._params = (sens_planta, bias_palha)
+        if self.surface is None:
+            return
+        self._draw_marker()
+        metrics = estimate_percentages(self._cum_joint, self._t_veg_base, sens_planta, bias_palha)
+        self.estimate_label.config(text=(
+            "Estimativa (antes da limpeza):\n"
+            f"Planta:  {metrics['planta_%']}%   Palha:  {metrics['palha_%']}%   Solo:  {metrics['solo_%']}%"))
+
+    # --- Desenho ---
+    def _axes(self):
+        sens, bias = self.surface["sens_planta"], self.surface["bias_palha"]
+        return (bias[0], bias[-1]), (sens[0], sens[-1])
+
+    def _to_screen(self, sens_planta, bias_palha):
+        (b0, b1), (s0, s1) = self._axes()
+        left, top = PLOT_MARGIN[:2]
+        x = left + (bias_palha - b0) / (b1 - b0) * PLOT_SIZE[0]
+        y = top + (1 - (sens_planta - s0) / (s1 - s0)) * PLOT_SIZE[1]
+        return x, y
+
+    def _draw(self):
+        if self.surface is None:
+            return
+        self.canvas.delete("all")
+        values = self.surface[PLOT_CLASSES[self.var_class.get()]]
+        # Sensibilidade cresce para cima: linha 0 da grade vai para a base
+        levels = np.clip(np.flipud(values) * 2.55, 0, 255).astype(np.uint8)
+        heat = cv2.applyColorMap(levels, cv2.COLORMAP_VIRIDIS)
+        heat = cv2.resize(heat, PLOT_SIZE, interpolation=cv2.INTER_NEAREST)
+        self.image_tk = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(heat, cv2.COLOR_BGR2RGB)))
+        left, top = PLOT_MARGIN[:2]
+        self.canvas.create_image(left, top, anchor="nw", image=self.image_tk)
+
+        (b0, b1), (s0, s1) = self._axes()
+        right, bottom = left + PLOT_SIZE[0], top + PLOT_SIZE[1]
+        self.canvas.create_rectangle(left, top, right, bottom, outline="#404040")
+        for value in np.linspace(b0, b1, 4):
+            x, _ = self._to_screen(s0, value)
+            self.canvas.create_text(x, bottom + 4, text=f"{value:.2f}", anchor="n", font=("Segoe UI", 8))
+        for value in np.linspace(s0, s1, 3):
+            _, y = self._to_screen(value, b0)
+            self.canvas.create_text(left - 4, y, text=f"{value:.2f}", anchor="e", font=("Segoe UI", 8))
+        self.canvas.create_text(left + PLOT_SIZE[0] / 2, bottom + 18, anchor="n", font=("Segoe UI", 8),
+                                text=f"Viés da palha  (cor: % {self.var_class.get()}, 0–100)")
+        self.canvas.create_text(10, top + PLOT_SIZE[1] / 2, text="Sens. planta", angle=90, font=("Segoe UI", 8))
+        self._draw_marker()
+
+    def _draw_marker(self):
+        self.canvas.delete("marker")
+        x, y = self._to_screen(*self._params)
+        left, top = PLOT_MARGIN[:2]
+        self.canvas.create_line(left, y, left + PLOT_SIZE[0], y, fill="white", dash=(3, 3), tags="marker")
+        self.canvas.create_line(x, top, x, top + PLOT_SIZE[1], fill="white", dash=(3, 3), tags="marker")
+        self.canvas.create_oval(x - 4, y - 4, x + 4, y + 4, outline="red", width=2, tags="marker")
+
+    # --- Interação ---
+    def _pick(self, event, final):
+        if self.surface is None or self.on_pick is None:
+            return
+        (b0, b1), (s0, s1) = self._axes()
+        left, top = PLOT_MARGIN[:2]
+        fx = min(max((event.x - left) / PLOT_SIZE[0], 0.0), 1.0)
+        fy = min(max((event.y - top) / PLOT_SIZE[1], 0.0), 1.0)
+        self.on_pick(s0 + (1 - fy) * (s1 - s0), b0 + fx * (b1 - b0), final)
+
+    def export_csv(self):
+        """Grava a superfície inteira (uma linha por ponto da grade)."""
+        if self.surface is None:
+            return
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=SWEEP_FIELDS)
+            writer.writeheader()
+            writer.writerows(sweep_rows(self.surface))
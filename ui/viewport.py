@@ -0,0 +1,176 @@
+"""
+Janela de visualização com zoom e deslocamento (sem Tk, testável à parte).
+
+O Viewport guarda o zoom (1 = imagem inteira cabendo na área) e o centro em
+frações da imagem, então vale igual para a prévia reduzida e para a
+resolução total. O ViewSource guarda os níveis reduzidos da imagem exibida
+e desenha só a região visível, na resolução da tela: o custo por quadro
+depende do tamanho da área de exibição, não do tamanho da imagem.
+"""
+import itertools
+import threading
+
+import cv2
+import numpy as np
+
+from processing.arena import BufferArena
+from processing.pyramid import DISPLAY_SIZE, build_pyramid
+
+# Ampliação máxima: pixels de tela por pixel da imagem original
+MAX_PIXEL_SCALE = 16.0
+# Fundo das faixas fora da imagem (RGB)
+BACKGROUND = (32, 32, 32)
+
+
+class Viewport:
+    """Zoom e centro da região visível, em coordenadas relativas à imagem."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Imagem inteira na área de exibição."""
+        self.zoom = 1.0
+        self.center = (0.5, 0.5)
+
+    @staticmethod
+    def fit_scale(shape, view_size):
+        h, w = shape[:2]
+        return min(view_size[0] / w, view_size[1] / h)
+
+    def scale(self, shape, view_size):
+        """Pixels de tela por pixel da imagem `shape`."""
+        return self.fit_scale(shape, view_size) * self.zoom
+
+    def origin(self, shape, view_size):
+        """Canto superior esquerdo da região visível, em pixels da imagem."""
+        h, w = shape[:2]
+        scale = self.scale(shape, view_size)
+        return (self.center[0] * w - view_size[0] / (2 * scale),
+                self.center[1] * h - view_size[1] / (2 * scale))
+
+    def _clamp(self, shape, view_size):
+        """Mantém a região visível dentro da imagem (centralizada no eixo em que sobra espaço)."""
+        h, w = shape[:2]
+        scale = self.scale(shape, view_size)
+        center = []
+        for c, size, view in ((self.center[0], w, view_size[0]), (self.center[1], h, view_size[1])):
+            half = view / (2 * scale * size)
+            center.append(0.5 if half >= 0.5 else min(max(c, half), 1 - half))
+        self.center = tuple(center)
+
+    def zoom_at(self, factor, x, y, shape, view_size):
+        """Multiplica o zoom por `factor` mantendo fixo o ponto da imagem sob (x, y) da tela."""
+        h, w = shape[:2]
+        scale = self.scale(shape, view_size)
+        ox, oy = self.origin(shape, view_size)
+        px, py = ox + x / scale, oy + y / scale
+        max_zoom = max(1.0, MAX_PIXEL_SCALE / self.fit_scale(shape, view_size))
+        self.zoom = min(max(self.zoom * factor, 1.0), max_zoom)
+        scale = self.scale(shape, view_size)
+        self.center = ((px - x / scale + view_size[0] / (2 * scale)) / w,
+                       (py - y / scale + view_size[1] / (2 * scale)) / h)
+        self._clamp(shape, view_size)
+
+    def pan(self, dx, dy, shape, view_size):
+        """Arrasta a imagem (dx, dy) pixels de tela."""
+        h, w = shape[:2]
+        scale = self.scale(shape, view_size)
+        self.center = (self.center[0] - dx / (scale * w), self.center[1] - dy / (scale * h))
+        self._clamp(shape, view_size)
+
+
+class ViewSource:
+    """
+    Imagem BGR pronta para exibição: nível 0 e os níveis reduzidos pela metade
+    até cobrir min_size. Montar os níveis custa uma passada na imagem (fora da
+    thread do Tk); render custa só os pixels da tela.
+    arena: BufferArena opcional onde ficam a cópia (copy=True) e os níveis
+    reduzidos, nos buffers <name>0, <name>1, ...; slot identifica o conjunto
+    de buffers usado (ver FrameBuffers).
+    """
+    def __init__(self, img_bgr, min_size=DISPLAY_SIZE, copy=False, arena=None, name="frame", slot=None):
+        if copy and arena is None:
+            img_bgr = img_bgr.copy()
+        elif copy:
+            buf = arena.get(f"{name}0", img_bgr.shape, img_bgr.dtype)
+            np.copyto(buf, img_bgr)
+            img_bgr = buf
+        self.levels = build_pyramid(img_bgr, min_size, arena, name)
+        self.shape = img_bgr.shape[:2]
+        self.slot = slot
+
+    def _level_for(self, ratio):
+        """Nível mais reduzido que ainda tem pelo menos um pixel por pixel de tela."""
+        w = self.shape[1]
+        best = 0
+        for k, level in enumerate(self.levels):
+            if w / level.shape[1] <= ratio:
+                best = k
+        return best
+
+    def render(self, viewport, view_size, background=BACKGROUND):
+        """Região visível do viewport como array RGB (altura, largura, 3) do tamanho da tela."""
+        scale = viewport.scale(self.shape, view_size)
+        level = self.levels[self._level_for(1.0 / scale)]
+        fx = self.shape[1] / level.shape[1]
+        fy = self.shape[0] / level.shape[0]
+        ox, oy = viewport.origin(self.shape, view_size)
+        # Tela → nível (centros de pixel): x_nível = (ox + (x + 0.5) / scale) / fx - 0.5
+        matrix = np.array([
+            [1.0 / (scale * fx), 0.0, (ox + 0.5 / scale) / fx - 0.5],
+            [0.0, 1.0 / (scale * fy), (oy + 0.5 / scale) / fy - 0.5],
+        ])
+        # Ampliando, vizinho mais próximo (pixels nítidos para inspecionar as classes)
+        interp = cv2.INTER_NEAREST if scale * fx > 1.0 else cv2.INTER_LINEAR
+        frame = cv2.warpAffine(level, matrix, tuple(view_size), flags=interp | cv2.WARP_INVERSE_MAP,
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=background[::-1])
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+
+
+class FrameBuffers:
+    """
+    Buffers reaproveitados dos quadros de exibição (quadro e níveis reduzidos),
+    em conjuntos numerados. O canvas relê o quadro exibido na thread do Tk a
+    cada zoom e arraste enquanto a thread de processamento monta o próximo:
+    um conjunto só é reescrito quando não está na tela nem entregue e ainda
+    a caminho dela. Em regime bastam três conjuntos (exibido, a caminho e o
+    que está sendo escrito); se faltar, um novo é criado.
+    """
+    def __init__(self):
+        self.arena = BufferArena()
+        self._lock = threading.Lock()
+        self._shown = None
+        self._queued = []   # conjuntos entregues pelo processamento, na ordem
+
+    def take(self):
+        """Reserva um conjunto livre para o próximo quadro (thread de processamento)."""
+        with self._lock:
+            busy = {self._shown, *self._queued}
+            slot = next(i for i in itertools.count() if i not in busy)
+            self._queued.append(slot)
+        return slot
+
+    def frame(self, slot, shape):
+        """Quadro BGR (uint8) do conjunto, com a forma (altura, largura) do mapa."""
+        return self.arena.get(f"frame{slot}_0", tuple(shape[:2]) + (3,))
+
+    def prepare(self, img_bgr, slot, min_size=DISPLAY_SIZE):
+        """ViewSource de img_bgr com os níveis reduzidos nos buffers do conjunto."""
+        return ViewSource(img_bgr, min_size, arena=self.arena, name=f"frame{slot}_", slot=slot)
+
+    def shown(self, source):
+        """
+        Registra o quadro exibido (thread do Tk). Os conjuntos entregues antes
+        dele não serão mais exibidos (o worker nunca entrega um quadro mais
+        velho que o atual) e voltam a ficar livres.
+        """
+        slot = getattr(source, "slot", None)
+        with self._lock:
+            self._shown = slot
+            if slot in self._queued:
+                del self._queued[:self._queued.index(slot) + 1]
+
+    def clear(self):
+        """Libera os buffers (ao trocar de imagem); o quadro exibido continua válido."""
+        with self._lock:
+            self.arena = BufferArena()
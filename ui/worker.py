@@ -0,0 +1,122 @@
+import queue
+import threading
+
+
+class Cancelled(Exception):
+    """Levantada por um job quando uma requisição mais nova o substituiu."""
+
+
+def check_cancelled(cancelled):
+    """Ponto de cancelamento entre etapas de um job."""
+    if cancelled():
+        raise Cancelled()
+
+
+class ProcessingWorker:
+    """
+    Executor em segundo plano para o processamento pesado da interface.
+
+    Cada requisição tem uma chave ("view", "save", ...). Para cada chave só a
+    requisição mais recente fica pendente: as anteriores são descartadas antes
+    de rodar, e o job pode se cancelar entre etapas consultando `cancelled()`.
+    Um job que termina mesmo já superado ainda é entregue se for mais novo que
+    o último entregue (durante o arraste sempre aparece o quadro mais recente).
+    Os resultados voltam para a thread do Tk por polling com after(), então
+    nenhum widget é tocado fora da thread principal.
+    """
+    def __init__(self, widget, on_busy=None, poll_ms=16):
+        self.widget = widget
+        self.on_busy = on_busy
+        self.poll_ms = poll_ms
+        self._cond = threading.Condition()
+        self._pending = {}        # chave → (geração, job, on_done, on_error)
+        self._generation = {}     # chave → última geração submetida
+        self._delivered = {}      # chave → última geração entregue
+        self._dropped = {}        # chave → gerações até aqui descartadas por cancel()
+        self._running = None
+        self._results = queue.Queue()
+        self._polling = False
+        self._busy = False
+        self._thread = threading.Thread(target=self._run, name="processing-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, job, on_done, on_error=None):
+        """Agenda job(cancelled) substituindo qualquer requisição pendente da mesma chave."""
+        with self._cond:
+            gen = self._generation.get(key, 0) + 1
+            self._generation[key] = gen
+            self._pending.pop(key, None)
+            self._pending[key] = (gen, job, on_done, on_error)
+            self._cond.notify()
+        self._set_busy(True)
+        self._schedule_poll()
+        return gen
+
+    def cancel(self, key=None):
+        """Descarta as requisições pendentes (de uma chave ou de todas)."""
+        with self._cond:
+            keys = [key] if key is not None else list(set(self._generation) | set(self._pending))
+            for k in keys:
+                # Avança a geração para que um job em execução também se cancele
+                self._generation[k] = self._generation.get(k, 0) + 1
+                self._dropped[k] = self._generation[k]
+                self._pending.pop(k, None)
+
+    @property
+    def busy(self):
+        with self._cond:
+            return bool(self._pending) or self._running is not None
+
+    def _is_current(self, key, gen):
+        with self._cond:
+            return self._generation.get(key) == gen
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key = next(iter(self._pending))
+                gen, job, on_done, on_error = self._pending.pop(key)
+                self._running = key
+            try:
+                result = job(lambda: not self._is_current(key, gen))
+                outcome = (key, gen, on_done, result)
+            except Cancelled:
+                outcome = None
+            except Exception as exc:
+                outcome = (key, gen, on_error, exc) if on_error is not None else None
+            # O resultado entra na fila antes de liberar o estado de ocupado
+            if outcome is not None:
+                self._results.put(outcome)
+            with self._cond:
+                self._running = None
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Entrega os resultados na thread do Tk (nunca um mais velho que o já exibido)."""
+        while True:
+            try:
+                key, gen, callback, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._cond:
+                floor = max(self._delivered.get(key, 0), self._dropped.get(key, 0))
+            if gen > floor:
+                self._delivered[key] = gen
+                callback(value)
+        if self.busy or not self._results.empty():
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+            self._set_busy(False)
+
+    def _set_busy(self, busy):
+        if busy != self._busy:
+            self._busy = busy
+            if self.on_busy is not None:
+                self.on_busy(busy)
@@ -0,0 +1,111 @@
+"""
+Cache persistente em disco, endereçado pelo conteúdo da imagem.
+
+Cada entrada é uma pasta <raiz>/<chave>/ com um .npy por array (lidos
+mapeados em memória) e um meta.json com os valores escalares. A chave é o
+hash dos pixels decodificados mais a versão do pipeline, então a mesma foto
+com outro nome ou caminho reaproveita a entrada, e uma mudança no cálculo
+invalida tudo. Ao passar do tamanho máximo, as entradas usadas há mais
+tempo são apagadas (LRU pela data de modificação do meta.json).
+O pipeline (processing.session.cached_session) guarda só os scores, o limiar
+base e o histograma conjunto; os índices não vão para o cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "easy_iop")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+META_FILE = "meta.json"
+
+
+def content_key(img, *parts):
+    """Hash dos pixels (com forma e tipo) e das partes extras (ex.: versão do pipeline)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((img.shape, str(img.dtype)) + parts).encode())
+    digest.update(np.ascontiguousarray(img).data)
+    return digest.hexdigest()
+
+
+class ProductCache:
+    """
+    Cache de arrays por chave, limitado a max_bytes no disco.
+    load devolve os arrays mapeados em memória (somente leitura) e os escalares.
+    """
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def load(self, key):
+        """(arrays, meta) da entrada, ou None se não existir."""
+        entry = self._entry(key)
+        meta_path = os.path.join(entry, META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = {name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+                      for name in meta.pop("arrays")}
+        except (OSError, ValueError, KeyError):
+            return None
+        # Marca como usada agora (ordem da remoção LRU)
+        os.utime(meta_path)
+        return arrays, meta
+
+    def store(self, key, arrays, meta=None):
+        """
+        Grava a entrada numa pasta temporária e a renomeia no fim, para que
+        leitores (ou outro processo gravando a mesma chave) nunca vejam uma
+        entrada pela metade.
+        """
+        entry = self._entry(key)
+        if os.path.exists(entry):
+            return
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(array))
+            with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+                json.dump(dict(meta or {}, arrays=list(arrays)), f)
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.exists(entry):
+                raise
+        self.evict()
+
+    def _entries(self):
+        """(modificação, tamanho, pasta) de cada entrada completa."""
+        entries = []
+        for name in os.listdir(self.root):
+            entry = self._entry(name)
+            meta_path = os.path.join(entry, META_FILE)
+            if name.startswith(".tmp-") or not os.path.exists(meta_path):
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry))
+            entries.append((os.path.getmtime(meta_path), size, entry))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Apaga as entradas usadas há mais tempo até caber em max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, entry in self._entries():
+            shutil.rmtree(entry, ignore_errors=True)
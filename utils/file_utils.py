@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+from PIL import Image
+
+# Fatores de redução que o decodificador aplica direto na DCT dos JPEGs
+# (sem decodificar a resolução total); outros formatos são decodificados e reduzidos.
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def image_size(path):
+    """(largura, altura) lidas só do cabeçalho do arquivo."""
+    with Image.open(path) as img:
+        return img.size
+
+
+def reduction_for_size(image_size, target_size):
+    """
+    Maior fator de REDUCED_FLAGS que ainda deixa a imagem >= target_size.
+    Compara lado maior com lado maior (o cv2 aplica a rotação do EXIF, o cabeçalho não).
+    """
+    (w, h), (tw, th) = sorted(image_size), sorted(target_size)
+    for factor in sorted(REDUCED_FLAGS, reverse=True):
+        if w // factor >= tw and h // factor >= th:
+            return factor
+    return 1
+
+
+def load_image(path, scale=1):
+    """
+    Carrega a imagem BGR reduzida por `scale` (1, 2, 4 ou 8).
+    Nos JPEGs a redução sai da própria decodificação: scale=4 decodifica
+    ~16x menos pixels. Lança ValueError se o arquivo não for uma imagem.
+    """
+    if scale not in REDUCED_FLAGS:
+        raise ValueError(f"Fator de redução inválido: {scale} (use 1, 2, 4 ou 8).")
+    img = cv2.imread(path, REDUCED_FLAGS[scale])
+    if img is None:
+        raise ValueError("Imagem inválida ou ilegível.")
+    return img
+
+
+def decode_image(data, scale=1):
+    """
+    Como load_image, a partir dos bytes do arquivo (ex.: recebidos pela rede).
+    """
+    if scale not in REDUCED_FLAGS:
+        raise ValueError(f"Fator de redução inválido: {scale} (use 1, 2, 4 ou 8).")
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), REDUCED_FLAGS[scale])
+    if img is None:
+        raise ValueError("Imagem inválida ou ilegível.")
+    return img
+
+
+def load_preview(path, target_size):
+    """
+    Decodificação rápida para exibir logo ao abrir: a menor redução que ainda
+    cobre target_size. Devolve (imagem, fator usado).
+    """
+    try:
+        factor = reduction_for_size(image_size(path), target_size)
+    except OSError:
+        factor = 1
+    return load_image(path, factor), factor
@@ -1,22 +1,135 @@
 import numpy as np
+from utils.tracing import traced
 
-def calculate_percentages(seg_map):
+N_CLASSES = 3  # 0 = solo, 1 = palha, 2 = planta
+# Linhas por bloco nas contagens por zona (limita os temporários das chaves)
+ROW_CHUNK = 512
+
+@traced("calculate_percentages")
+def calculate_percentages(seg_map, mask=None):
     """
     Calcula a porcentagem de pixels de cada classe:
     0 = solo, 1 = palha, 2 = planta.
+    mask: buffer bool do tamanho do mapa para as comparações (ver class_counts).
     """
     if seg_map is None or seg_map.size == 0:
         return {"planta_%": 0.0, "palha_%": 0.0, "solo_%": 0.0}
+    return percentages_from_counts(class_counts(seg_map, mask=mask)[0])
 
-    total = seg_map.size
-    counts = {
-        0: np.sum(seg_map == 0),
-        1: np.sum(seg_map == 1),
-        2: np.sum(seg_map == 2),
-    }
 
+def percentages_from_counts(counts):
+    """Porcentagens a partir das contagens por classe (soma de tiles/imagens)."""
+    total = int(np.sum(counts))
+    if total == 0:
+        return {"planta_%": 0.0, "palha_%": 0.0, "solo_%": 0.0}
     return {
         "solo_%": round((counts[0] / total) * 100, 2),
         "palha_%": round((counts[1] / total) * 100, 2),
         "planta_%": round((counts[2] / total) * 100, 2),
     }
+
+
+def class_counts(seg_map, zones=None, n_zones=None, mask=None):
+    """
+    Contagens por (zona, classe) numa passada só: np.bincount sobre a chave
+    zona * 3 + classe. O custo não depende do número de zonas.
+    zones: imagem de rótulos do mesmo tamanho (ids 0..n_zones-1) ou None
+    para a imagem inteira. Devolve um array (n_zones, 3).
+    mask: na imagem inteira, buffer bool do tamanho do mapa que recebe as
+    comparações (sem ele cada classe aloca uma máscara).
+    """
+    if zones is None:
+        # Imagem inteira: count_nonzero por classe é mais rápido que o bincount
+        return np.array([[np.count_nonzero(np.equal(seg_map, k, out=mask)) for k in range(N_CLASSES)]],
+                        dtype=np.int64)
+    if zones.shape != seg_map.shape:
+        raise ValueError("Mapa de zonas com tamanho diferente do mapa de classes.")
+    if n_zones is None:
+        n_zones = int(zones.max()) + 1
+    size = n_zones * N_CLASSES
+    counts = np.zeros(size, dtype=np.int64)
+    for y in range(0, seg_map.shape[0], ROW_CHUNK):
+        key = zones[y:y + ROW_CHUNK].astype(np.intp) * N_CLASSES
+        key += seg_map[y:y + ROW_CHUNK]
+        counts += np.bincount(key.ravel(), minlength=size)[:size]
+    return counts.reshape(n_zones, N_CLASSES)
+
+
+def grid_counts(seg_map, rows, cols, full_shape=None, offset=(0, 0)):
+    """
+    Contagens por célula de uma grade rows x cols (ids em ordem de linha).
+    Para um tile, full_shape é o tamanho da imagem inteira e offset=(y, x) a
+    posição do tile: as contagens caem nas células globais.
+    """
+    h, w = full_shape[:2] if full_shape is not None else seg_map.shape
+    oy, ox = offset
+    th, tw = seg_map.shape
+    cell_row = (np.arange(oy, oy + th) * rows // h).astype(np.intp)
+    cell_col = (np.arange(ox, ox + tw) * cols // w).astype(np.intp)
+    size = rows * cols * N_CLASSES
+    counts = np.zeros(size, dtype=np.int64)
+    for y in range(0, th, ROW_CHUNK):
+        key = cell_row[y:y + ROW_CHUNK, None] * (cols * N_CLASSES) + cell_col[None, :] * N_CLASSES
+        key += seg_map[y:y + ROW_CHUNK]
+        counts += np.bincount(key.ravel(), minlength=size)[:size]
+    return counts.reshape(rows * cols, N_CLASSES)
+
+
+class CoverageAccumulator:
+    """
+    Acumulador de contagens por zona e classe, somável entre tiles e imagens.
+    Zonas podem ser uma grade regular (grid=(linhas, colunas)) ou os ids de
+    uma imagem de rótulos (parcelas). Como as zonas cobrem a imagem, a
+    cobertura da imagem inteira sai da mesma passada (soma das zonas).
+    """
+    def __init__(self, n_zones=1, grid=None):
+        self.grid = grid
+        if grid is not None:
+            n_zones = grid[0] * grid[1]
+        self.counts = np.zeros((n_zones, N_CLASSES), dtype=np.int64)
+
+    def add(self, seg_map, zones=None, full_shape=None, offset=(0, 0)):
+        """Soma as contagens de um mapa (ou tile) ao acumulador."""
+        if self.grid is not None:
+            self.counts += grid_counts(seg_map, self.grid[0], self.grid[1], full_shape, offset)
+        elif zones is None:
+            self.counts[0] += class_counts(seg_map)[0]
+        else:
+            self.counts += class_counts(seg_map, zones, len(self.counts))
+        return self
+
+    def merge(self, other):
+        if other.counts.shape != self.counts.shape:
+            raise ValueError("Acumuladores com zonas diferentes.")
+        self.counts += other.counts
+        return self
+
+    def coverage(self):
+        """Percentual por zona como array (n_zones, 3) na ordem solo, palha, planta."""
+        totals = self.counts.sum(axis=1, keepdims=True)
+        return np.divide(self.counts * 100.0, totals, out=np.zeros(self.counts.shape), where=totals > 0)
+
+    def percentages(self):
+        """Percentuais por zona, no formato de calculate_percentages."""
+        return [percentages_from_counts(c) for c in self.counts]
+
+    def total(self):
+        """Percentuais da imagem inteira (soma de todas as zonas)."""
+        return percentages_from_counts(self.counts.sum(axis=0))
+
+
+def compare_percentages(preview, final):
+    """
+    Erro da estimativa de prévia em relação ao resultado final
+    (diferença absoluta em pontos percentuais por classe e o máximo).
+    """
+    diff = {key: round(abs(preview[key] - final[key]), 2) for key in ("planta_%", "palha_%", "solo_%")}
+    diff["max"] = max(diff.values())
+    return diff
+
+
+def label_agreement(seg_a, seg_b):
+    """Fração de pixels com a mesma classe em dois mapas do mesmo tamanho."""
+    if seg_a.shape != seg_b.shape:
+        raise ValueError("Mapas com tamanhos diferentes.")
+    return float(np.count_nonzero(seg_a == seg_b)) / seg_a.size
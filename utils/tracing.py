@@ -0,0 +1,172 @@
+"""
+Instrumentação leve das etapas do pipeline.
+
+Desligada (padrão), span() devolve um contexto vazio compartilhado e traced()
+só testa uma flag: custo praticamente nulo. Ligada, cada etapa vira um evento
+com início, duração e (opcionalmente) bytes alocados via tracemalloc, que
+pode ser exportado no formato Chrome trace (chrome://tracing / Perfetto).
+"""
+import collections
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Limite de eventos guardados (os mais antigos são descartados)
+MAX_EVENTS = 200_000
+
+_enabled = False
+_track_memory = False
+_events = collections.deque(maxlen=MAX_EVENTS)
+_last = {}                 # etapa → duração (ms) da execução mais recente
+_last_alloc = {}           # etapa → pico de bytes alocados na execução mais recente
+_local = threading.local()
+# Origem dos tempos: relógio de parede na importação (alinha eventos de processos diferentes)
+_t0 = time.perf_counter()
+_wall0 = time.time()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start", "mem_start", "child_peak")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.child_peak = 0
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if _track_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = current
+        else:
+            self.mem_start = None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        _local.stack.pop()
+        args = dict(self.args)
+        if self.mem_start is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self.child_peak)
+            args["alocado_bytes"] = current - self.mem_start
+            args["pico_bytes"] = peak - self.mem_start
+            _last_alloc[self.name] = args["pico_bytes"]
+            if _local.stack:
+                _local.stack[-1].child_peak = max(_local.stack[-1].child_peak, peak)
+        duration = end - self.start
+        _last[self.name] = duration * 1000.0
+        _events.append({
+            "name": self.name,
+            "ph": "X",
+            "ts": (_wall0 + self.start - _t0) * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+        return False
+
+
+def enable(track_memory=False):
+    """Liga o registro de eventos (track_memory liga também o tracemalloc)."""
+    global _enabled, _track_memory
+    _enabled = True
+    _track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled, _track_memory
+    _enabled = False
+    if _track_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _track_memory = False
+    _last_alloc.clear()
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, **args):
+    """Contexto que mede uma etapa: `with span("etapa"): ...`."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """Decorador que mede cada chamada da função como uma etapa."""
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def last_timings():
+    """Duração (ms) da execução mais recente de cada etapa."""
+    return dict(_last)
+
+
+def last_allocations():
+    """Pico de bytes alocados na execução mais recente de cada etapa (com track_memory)."""
+    return dict(_last_alloc)
+
+
+def drain():
+    """Tira e devolve os eventos registrados (ex.: para enviar de um processo ao pai)."""
+    events = []
+    while _events:
+        events.append(_events.popleft())
+    return events
+
+
+def extend(events):
+    """Acrescenta eventos vindos de outro processo."""
+    _events.extend(events)
+
+
+def clear():
+    _events.clear()
+    _last.clear()
+    _last_alloc.clear()
+
+
+def export_chrome_trace(path):
+    """Grava os eventos no formato Chrome trace (JSON) e devolve quantos foram gravados."""
+    events = list(_events)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)